@@ -0,0 +1,874 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import emoji
+import pandas as pd
+from dedup import FingerprintSet, drop_duplicate_rows, row_fingerprints
+from dictionary_replacer import DictionaryReplacer, replace_sequentially
+from Dictionaries_En import contractions_dict, english_dict, special_char_dict
+from emoji_handler import EmojiHandler, contains_emoji_character
+from english_text_preprocessor import EnglishTextPreprocessor
+from near_dedup import NearDuplicateFilter
+from output_writers import EXCEL_MAX_ROWS, OUTPUT_FORMATS, check_output_format, open_writer, write_excel
+from parallel import ParallelProcessor
+from profiling import StageProfiler, format_profile
+from row_filters import filter_rows, task_filters
+from persian_text_preprocessor import PERSIAN_WORD_PATTERN, SPELL_MIN_WORD_LENGTH, PersianTextPreprocessor
+from spelling import TOKEN_PATTERN
+from symspell import SymSpell
+from text_pipeline import new_pushdown_stats, new_tree_stats, new_unique_stats, run_stages
+
+TASKS = ["default", "translation", "sentiment", "ner", "topic_modeling", "spam_detection", "summarization"]
+
+
+def load_column(file_path, column, rows=None):
+    """
+    Load a text column from a CSV file, optionally truncated to the first `rows` rows.
+    """
+    df = pd.read_csv(file_path, nrows=rows)
+    if column not in df.columns:
+        raise ValueError(f"The specified column '{column}' is not in the dataset.")
+    return df[column]
+
+
+def time_call(func, repeat=1):
+    """
+    Run `func` `repeat` times and return the best wall time in seconds together with the last result.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def print_table(rows, headers):
+    """
+    Print a list of rows as a plain-text table.
+    """
+    widths = [max(len(str(value)) for value in [header] + [row[i] for row in rows]) for i, header in enumerate(headers)]
+    print("  ".join(str(header).ljust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+def benchmark_persian_fused(args):
+    """
+    Compare the stage-by-stage and the fused Persian pipelines for every task.
+    """
+    column = load_column(args.input, "Persian", args.rows)
+    rows = []
+    for task in TASKS:
+        preprocessor = PersianTextPreprocessor(task=task)
+        stagewise_time, stagewise = time_call(lambda: preprocessor.process_text(column, fused=False), args.repeat)
+        fused_time, fused = time_call(lambda: preprocessor.process_text(column, fused=True), args.repeat)
+        if not stagewise.equals(fused):
+            raise AssertionError(f"Fused output differs from the stage-by-stage output for task '{task}'.")
+        rows.append([task, len(column), f"{stagewise_time:.3f}", f"{fused_time:.3f}",
+                     f"{stagewise_time / fused_time:.2f}x"])
+    print_table(rows, ["task", "rows", "stagewise_s", "fused_s", "speedup"])
+
+
+def benchmark_persian_dictionaries(args):
+    """
+    Compare the compiled dictionary replacers with one re.sub per key on the Persian column.
+    """
+    column = load_column(args.input, "Persian", args.rows).str.lower()
+    preprocessor = PersianTextPreprocessor()
+    cases = [
+        ("alphabet_numbers", preprocessor.alphabet_numbers_replacer, [
+            preprocessor.sign_dict_fa_phase_one,
+            preprocessor.arabic_dict,
+            preprocessor.num_dict,
+            preprocessor.special_char_dict,
+        ]),
+        ("signs", preprocessor.signs_replacer, [preprocessor.sign_dict_fa_phase_two]),
+    ]
+    rows = []
+    for name, replacer, dictionaries in cases:
+        sequential_time, sequential = time_call(
+            lambda: column.apply(lambda text: replace_sequentially(text, dictionaries)), args.repeat)
+        compiled_time, compiled = time_call(lambda: column.apply(replacer.replace), args.repeat)
+        if not sequential.equals(compiled):
+            raise AssertionError(f"Compiled replacer output differs for '{name}'.")
+        rows.append([name, len(column), len(replacer.steps), f"{sequential_time:.3f}", f"{compiled_time:.3f}",
+                     f"{sequential_time / compiled_time:.1f}x"])
+    print_table(rows, ["dictionaries", "rows", "steps", "sequential_s", "compiled_s", "speedup"])
+
+
+def benchmark_english_dictionaries(args):
+    """
+    Compare the compiled English dictionary replacer with one str.replace per key.
+    """
+    column = load_column(args.input, "English", args.rows).str.lower()
+    dictionaries = [contractions_dict, english_dict, special_char_dict]
+
+    def ordered_replace(text):
+        for dictionary in dictionaries:
+            for key, value in dictionary.items():
+                text = text.replace(key, value)
+        return text
+
+    replacer = DictionaryReplacer(dictionaries)
+    bounded_replacer = DictionaryReplacer(dictionaries, word_boundary=[True, False, False])
+    ordered_time, ordered = time_call(lambda: column.apply(ordered_replace), args.repeat)
+    compiled_time, compiled = time_call(lambda: column.apply(replacer.replace), args.repeat)
+    bounded_time, _ = time_call(lambda: column.apply(bounded_replacer.replace), args.repeat)
+    if not ordered.equals(compiled):
+        raise AssertionError("Compiled replacer output differs from the ordered str.replace output.")
+
+    keys = sum(len(dictionary) for dictionary in dictionaries)
+    rows = [
+        ["ordered_replace", keys, f"{ordered_time:.3f}", f"{len(column) / ordered_time:.0f}", "1.0x"],
+        ["compiled", len(replacer.steps), f"{compiled_time:.3f}", f"{len(column) / compiled_time:.0f}",
+         f"{ordered_time / compiled_time:.1f}x"],
+        ["compiled_word_boundary", len(bounded_replacer.steps), f"{bounded_time:.3f}",
+         f"{len(column) / bounded_time:.0f}", f"{ordered_time / bounded_time:.1f}x"],
+    ]
+    print_table(rows, ["method", "steps", "seconds", "rows_per_s", "speedup"])
+
+
+def benchmark_english_lemmatization(args):
+    """
+    Compare row-by-row spaCy lemmatization with the batched nlp.pipe column stage.
+    """
+    preprocessor = EnglishTextPreprocessor(batch_size=args.batch_size, n_process=args.n_process)
+    column = load_column(args.input, "English", args.rows).apply(preprocessor.to_lower_case)
+    row_time, row_result = time_call(
+        lambda: column.apply(lambda x: " ".join(preprocessor.apply_lemmatization(x.split()))), args.repeat)
+    pipe_time, pipe_result = time_call(lambda: preprocessor.lemmatize_column(column), args.repeat)
+    if not row_result.equals(pipe_result):
+        raise AssertionError("Batched lemmatization differs from row-by-row lemmatization.")
+    rows = [
+        ["row_by_row", len(column), f"{row_time:.3f}", f"{len(column) / row_time:.0f}", "1.0x"],
+        [f"pipe(batch_size={args.batch_size}, n_process={args.n_process})", len(column), f"{pipe_time:.3f}",
+         f"{len(column) / pipe_time:.0f}", f"{row_time / pipe_time:.1f}x"],
+    ]
+    print_table(rows, ["method", "rows", "seconds", "rows_per_s", "speedup"])
+
+
+def benchmark_english_lemma_cache(args):
+    """
+    Compare the lemma cache in rule and lookup mode across cache sizes and report the hit rates.
+    """
+    column = load_column(args.input, "English", args.rows).str.lower()
+    rows = []
+    for mode in ["rule", "lookup"]:
+        for cache_size in [0, 1000, 100000]:
+            preprocessor = EnglishTextPreprocessor(batch_size=args.batch_size, n_process=args.n_process,
+                                                   lemmatize_mode=mode, lemma_cache_size=cache_size)
+            try:
+                elapsed, _ = time_call(lambda: preprocessor.lemmatize_column(column), 1)
+            except ValueError as e:
+                print(f"Skipping lookup mode: {e}")
+                break
+            info = preprocessor.lemma_cache.info()
+            rows.append([mode, cache_size, len(column), f"{elapsed:.3f}", f"{len(column) / elapsed:.0f}",
+                         f"{info['hit_rate']:.1%}", info["size"]])
+    print_table(rows, ["mode", "cache_size", "rows", "seconds", "rows_per_s", "hit_rate", "entries"])
+
+
+def benchmark_english_spelling(args):
+    """
+    Compare row-by-row spelling correction with the column stage over the unique vocabulary,
+    cold and with a warm on-disk cache.
+    """
+    column = load_column(args.input, "English", args.rows).str.lower()
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "spelling.sqlite")
+        preprocessor = EnglishTextPreprocessor(spelling_workers=args.workers, spelling_cache_path=cache_path)
+        row_time, row_result = time_call(lambda: column.apply(preprocessor.correct_spelling), 1)
+        cold_time, cold_result = time_call(lambda: preprocessor.correct_spelling_column(column), 1)
+        preprocessor.spelling_corrector.cache.close()
+        warm = EnglishTextPreprocessor(spelling_cache_path=cache_path)
+        warm_time, warm_result = time_call(lambda: warm.correct_spelling_column(column), 1)
+        warm.spelling_corrector.cache.close()
+    if not row_result.equals(cold_result) or not row_result.equals(warm_result):
+        raise AssertionError("Column spelling correction differs from row-by-row correction.")
+    rows = [
+        ["row_by_row", len(column), f"{row_time:.3f}", f"{len(column) / row_time:.0f}", "1.0x"],
+        [f"unique_vocabulary(workers={args.workers})", len(column), f"{cold_time:.3f}",
+         f"{len(column) / cold_time:.0f}", f"{row_time / cold_time:.1f}x"],
+        ["warm_disk_cache", len(column), f"{warm_time:.3f}", f"{len(column) / warm_time:.0f}",
+         f"{row_time / warm_time:.1f}x"],
+    ]
+    print_table(rows, ["method", "rows", "seconds", "rows_per_s", "speedup"])
+    print(f"Distinct corrections computed: {preprocessor.spelling_corrector.stats['computed']}")
+
+
+def benchmark_english_spelling_backends(args):
+    """
+    Compare pyspellchecker's correction with the SymSpell backend on the misspelled words of the
+    column, and report how often the two agree.
+    """
+    column = load_column(args.input, "English", args.rows).str.lower()
+    preprocessor = EnglishTextPreprocessor()
+    build_time, symspell = time_call(lambda: SymSpell.from_spellchecker(preprocessor.spellchecker), 1)
+    vocabulary = set()
+    for tokens in column.apply(TOKEN_PATTERN.findall):
+        vocabulary.update(tokens)
+    misspelled_words = sorted(word for word in vocabulary if word in preprocessor.spellchecker.unknown([word]))
+
+    pyspellchecker_time, expected = time_call(
+        lambda: [preprocessor.spellchecker.correction(word) for word in misspelled_words], 1)
+    symspell_time, corrected = time_call(lambda: [symspell.correction(word) for word in misspelled_words], 1)
+    words = max(len(misspelled_words), 1)
+    rows = [
+        ["pyspellchecker", len(misspelled_words), f"{pyspellchecker_time:.3f}",
+         f"{pyspellchecker_time / words * 1e3:.2f}", "1.0x"],
+        ["symspell", len(misspelled_words), f"{symspell_time:.3f}", f"{symspell_time / words * 1e3:.2f}",
+         f"{pyspellchecker_time / symspell_time:.1f}x"],
+    ]
+    print_table(rows, ["backend", "words", "seconds", "ms_per_word", "speedup"])
+    print(f"SymSpell index: {len(symspell.words)} words, {len(symspell.deletes)} deletes, built in {build_time:.1f}s")
+
+    disagreements = [(word, first, second) for word, first, second in zip(misspelled_words, expected, corrected)
+                     if first != second]
+    agreement = 1 - len(disagreements) / words
+    print(f"Agreement: {len(misspelled_words) - len(disagreements)}/{len(misspelled_words)} ({agreement:.1%})")
+    if disagreements:
+        print_table(disagreements[:20], ["word", "pyspellchecker", "symspell"])
+
+
+def benchmark_persian_spelling(args):
+    """
+    Build a Persian lexicon from the cleaned column and time the check_spell stage against
+    correcting every token of every row.
+    """
+    column = PersianTextPreprocessor(task="translation").process_text(load_column(args.input, "Persian", args.rows))
+    lexicon = {}
+    for text in column:
+        for word in text.split():
+            lexicon[word] = lexicon.get(word, 0) + 1
+    preprocessor = PersianTextPreprocessor(task="translation", spell_lexicon=lexicon)
+    engine = preprocessor.spell_engine
+
+    def correct_row(text):
+        tokens = text.split()
+        corrected = [
+            (engine.correction(token) or token) if (
+                len(token) >= SPELL_MIN_WORD_LENGTH
+                and token not in engine.words
+                and PERSIAN_WORD_PATTERN.fullmatch(token)
+            ) else token
+            for token in tokens
+        ]
+        return " ".join(corrected) if corrected != tokens else text
+
+    row_time, row_result = time_call(lambda: column.apply(correct_row), 1)
+    column_time, column_result = time_call(lambda: preprocessor.correct_spelling_column(column), 1)
+    if not row_result.equals(column_result):
+        raise AssertionError("Column spelling correction differs from row-by-row correction.")
+    rows = [
+        ["row_by_row", len(column), f"{row_time:.3f}", f"{len(column) / row_time:.0f}", "1.0x"],
+        ["unique_vocabulary", len(column), f"{column_time:.3f}", f"{len(column) / column_time:.0f}",
+         f"{row_time / column_time:.1f}x"],
+    ]
+    print_table(rows, ["method", "rows", "seconds", "rows_per_s", "speedup"])
+    changed = int((column_result != column).sum())
+    print(f"Lexicon: {len(engine.words)} words; distinct words corrected: "
+          f"{preprocessor.spelling_corrector.stats['computed']}; rows changed: {changed}")
+
+
+def benchmark_emoji(args):
+    """
+    Compare the compiled emoji handler with a per-codepoint lookup in emoji.EMOJI_DATA on both columns.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    handler = EmojiHandler(" EMOJI ")
+
+    def per_codepoint(text):
+        return "".join(char if char not in emoji.EMOJI_DATA else " EMOJI " for char in text)
+
+    rows = []
+    for name in ["English", "Persian"]:
+        column = df[name]
+        codepoint_time, _ = time_call(lambda: column.apply(per_codepoint), args.repeat)
+        handler_time, _ = time_call(lambda: column.apply(handler.replace), args.repeat)
+        with_emoji = int(column.apply(contains_emoji_character).sum())
+        rows.append([name, len(column), with_emoji, f"{codepoint_time:.3f}", f"{handler_time:.3f}",
+                     f"{codepoint_time / handler_time:.1f}x"])
+    print_table(rows, ["column", "rows", "rows_with_emoji", "per_codepoint_s", "compiled_s", "speedup"])
+
+
+def benchmark_parallel_scaling(args):
+    """
+    Measure the throughput of the translation pipelines with 1, 2, 4, ... worker processes. The
+    pools are started and warmed up before timing, so model loading is not included.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    rows = []
+    for name, processor_class in [("Persian", PersianTextPreprocessor), ("English", EnglishTextPreprocessor)]:
+        column = df[name]
+        baseline = None
+        expected = None
+        for workers in args.workers_list:
+            if workers == 1:
+                processor = processor_class(task="translation")
+            else:
+                processor = ParallelProcessor(processor_class, workers=workers, task="translation")
+                processor.process_column(column.iloc[:workers])
+            elapsed, result = time_call(lambda: processor.process_column(column), args.repeat)
+            if isinstance(processor, ParallelProcessor):
+                processor.close()
+            if expected is None:
+                expected = result
+            elif not expected.equals(result):
+                raise AssertionError(f"Parallel output differs with {workers} workers for {name}.")
+            baseline = baseline or elapsed
+            rows.append([name, workers, len(column), f"{elapsed:.3f}", f"{len(column) / elapsed:.0f}",
+                         f"{baseline / elapsed:.2f}x", f"{baseline / elapsed / workers:.0%}"])
+    print_table(rows, ["column", "workers", "rows", "seconds", "rows_per_s", "speedup", "efficiency"])
+    print(f"CPU cores available: {os.cpu_count()}")
+
+
+def benchmark_dedup(args):
+    """
+    Compare pandas drop_duplicates with the fingerprint set, on the whole file and on 10 chunks
+    deduplicated one after the other (with a memory limit small enough to force spills).
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    expected = df.drop_duplicates()
+    pandas_time, _ = time_call(lambda: df.drop_duplicates(), args.repeat)
+    rows = [["pandas drop_duplicates", len(df), len(expected), f"{pandas_time:.3f}",
+             f"{df.memory_usage(deep=True).sum() / 2 ** 20:.1f}"]]
+
+    chunksize = max(1, len(df) // 10)
+    for bits in (64, 128):
+        with tempfile.TemporaryDirectory() as spill_directory:
+            def chunked():
+                seen = FingerprintSet(bits=bits, memory_limit=len(df) * bits // 32, spill_directory=spill_directory,
+                                      initial_capacity=1024)
+                kept = [drop_duplicate_rows(df.iloc[start:start + chunksize], seen)
+                        for start in range(0, len(df), chunksize)]
+                return pd.concat(kept), seen
+
+            elapsed, (result, seen) = time_call(chunked, args.repeat)
+            table_bytes = seen.table.nbytes + sum(run.nbytes for run in seen.runs)
+        if not result.equals(expected):
+            raise AssertionError(f"Fingerprint deduplication ({bits} bits) differs from drop_duplicates.")
+        rows.append([f"fingerprints {bits} bits ({len(seen.runs)} runs)", len(df), len(result),
+                     f"{elapsed:.3f}", f"{table_bytes / 2 ** 20:.1f}"])
+    print_table(rows, ["method", "rows", "kept", "seconds", "state_mb"])
+    hashing_time, _ = time_call(lambda: row_fingerprints(df), args.repeat)
+    print(f"Hashing alone: {hashing_time:.3f}s")
+
+
+def benchmark_near_dedup(args):
+    """
+    Count and time the near-duplicate pairs removed by MinHash LSH after exact deduplication, for
+    a few similarity thresholds, streaming the data in 10 chunks.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows).drop_duplicates()
+    chunksize = max(1, len(df) // 10)
+    rows = []
+    for threshold in (0.7, 0.8, 0.9):
+        for shingle_type in ("char", "word"):
+            near_duplicates = NearDuplicateFilter(threshold=threshold, shingle_type=shingle_type)
+            start = time.perf_counter()
+            kept = sum(len(near_duplicates.filter(df.iloc[position:position + chunksize]))
+                       for position in range(0, len(df), chunksize))
+            elapsed = time.perf_counter() - start
+            rows.append([threshold, shingle_type, f"{near_duplicates.bands}x{near_duplicates.rows_per_band}",
+                         len(df), kept, f"{1 - kept / len(df):.1%}", f"{elapsed:.3f}", f"{len(df) / elapsed:.0f}"])
+    print_table(rows, ["threshold", "shingles", "bands", "rows", "kept", "dropped", "seconds", "rows_per_s"])
+
+
+def benchmark_row_filters(args):
+    """
+    Compare one filter pass per filter and column (a Python-level re.match per row, copying the
+    DataFrame every time) with the single-pass vectorized row filter.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    columns = ["English", "Persian"]
+    filters = task_filters("translation")
+
+    def one_pass_per_filter():
+        result = df
+        for row_filter in filters:
+            for column in columns:
+                mask = result[column].apply(
+                    lambda x: bool(row_filter.pattern.search(x)) if isinstance(x, str) else False)
+                result = result[~mask]
+        return result
+
+    sequential_time, expected = time_call(one_pass_per_filter, args.repeat)
+    stats = {}
+    single_time, result = time_call(lambda: filter_rows(df, columns, filters, stats), args.repeat)
+    if not result.equals(expected):
+        raise AssertionError("The single-pass row filter differs from the sequential filters.")
+    print_table([["one pass per filter", len(df), len(expected), f"{sequential_time:.3f}", "1.00x"],
+                 ["single pass", len(df), len(result), f"{single_time:.3f}", f"{sequential_time / single_time:.2f}x"]],
+                ["method", "rows", "kept", "seconds", "speedup"])
+    print_table([[key, removed // args.repeat] for key, removed in stats.items()], ["filter", "removed"])
+
+
+def benchmark_output_formats(args):
+    """
+    Time the writing of the input columns in every output format, in 10 chunks as the streaming
+    mode does, and report the file sizes. Formats whose optional dependency is missing are skipped.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)[["English", "Persian"]]
+    chunksize = max(1, len(df) // 10)
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for output_format in OUTPUT_FORMATS:
+            try:
+                check_output_format(output_format)
+            except ImportError as e:
+                print(f"Skipping {output_format}: {e}")
+                continue
+
+            def write():
+                with open_writer(os.path.join(directory, "cleaned"), output_format) as writer:
+                    for start in range(0, len(df), chunksize):
+                        writer.write(df.iloc[start:start + chunksize])
+                return writer.path
+
+            elapsed, path = time_call(write, args.repeat)
+            rows.append([output_format, len(df), f"{elapsed:.3f}", f"{len(df) / elapsed:.0f}",
+                         f"{os.path.getsize(path) / 2 ** 20:.2f}"])
+    print_table(rows, ["format", "rows", "seconds", "rows_per_s", "size_mb"])
+
+
+def _excel_write_case(input_path, rows, method, path, results):
+    # Runs in a fresh process, so that its peak resident set size only reflects this case.
+    df = pd.read_csv(input_path, nrows=min(rows, 100000))[["English", "Persian"]]
+    df = pd.concat([df] * -(-rows // len(df)), ignore_index=True).iloc[:rows]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    try:
+        if method == "to_excel":
+            df.to_excel(path, index=False, engine="openpyxl")
+        else:
+            write_excel(df, path)
+        error = ""
+    except ValueError as e:
+        error = str(e)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed, baseline, peak, error))
+
+
+def benchmark_excel(args):
+    """
+    Compare DataFrame.to_excel with the streaming write-only Excel writer for each size of
+    `--rows_list`: wall time and peak RSS of a fresh process, above the RSS it had before writing.
+    """
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.rows_list or [100000, 1000000, 5000000]:
+            for method in ("to_excel", "write_only"):
+                results = context.Queue()
+                process = context.Process(target=_excel_write_case, args=(
+                    args.input, size, method, os.path.join(directory, f"{method}_{size}.xlsx"), results))
+                process.start()
+                elapsed, baseline, peak, error = results.get()
+                process.join()
+                sheets = -(-size // (EXCEL_MAX_ROWS - 1))
+                rows.append([method, size, sheets if method == "write_only" else 1, f"{elapsed:.1f}",
+                             f"{peak / 1024:.0f}", f"{(peak - baseline) / 1024:.0f}", error[:40] or "ok"])
+    print_table(rows, ["method", "rows", "sheets", "seconds", "peak_rss_mb", "write_rss_mb", "status"])
+
+
+def benchmark_text_cache(args):
+    """
+    Time the translation pipelines of both columns without the text cache, with an empty cache
+    file (cold), with a filled file and a new preprocessor (warm, disk tier) and a second time with
+    the same preprocessor (hot, memory tier).
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    rows = []
+    for column, processor_class in [("English", EnglishTextPreprocessor), ("Persian", PersianTextPreprocessor)]:
+        texts = df[column]
+        uncached = processor_class(task="translation")
+        uncached_time, expected = time_call(lambda: uncached.process_column(texts), 1)
+        rows.append([column, "no cache", len(texts), f"{uncached_time:.3f}", "", "1.0x"])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "texts.sqlite")
+            for label in ("cold", "warm"):
+                preprocessor = processor_class(task="translation", text_cache_path=path)
+                elapsed, result = time_call(lambda: preprocessor.process_column(texts), 1)
+                if not result.equals(expected):
+                    raise AssertionError(f"Cached {column} output differs from the uncached output.")
+                rows.append([column, label, len(texts), f"{elapsed:.3f}",
+                             f"{preprocessor.text_cache.info()['hit_rate']:.1%}", f"{uncached_time / elapsed:.1f}x"])
+            preprocessor.text_cache.stats = {"memory_hits": 0, "disk_hits": 0, "computed": 0}
+            elapsed, _ = time_call(lambda: preprocessor.process_column(texts), args.repeat)
+            rows.append([column, "hot", len(texts), f"{elapsed:.3f}",
+                         f"{preprocessor.text_cache.info()['hit_rate']:.1%}", f"{uncached_time / elapsed:.1f}x"])
+            preprocessor.text_cache.close()
+    print_table(rows, ["column", "cache", "rows", "seconds", "hit_rate", "speedup"])
+
+
+def benchmark_profile(args):
+    """
+    Profile the stages of the translation pipelines of both columns, and compare the time of a
+    profiled run with the usual fused run.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    profilers = {}
+    rows = []
+    for column, processor_class in [("English", EnglishTextPreprocessor), ("Persian", PersianTextPreprocessor)]:
+        preprocessor = processor_class(task="translation")
+        fused_time, expected = time_call(lambda: preprocessor.process_column(df[column]), args.repeat)
+        profilers[column] = StageProfiler()
+        profiled_time, result = time_call(
+            lambda: preprocessor.process_column(df[column], profiler=profilers[column]), 1)
+        if not result.equals(expected):
+            raise AssertionError(f"Profiled {column} output differs from the fused output.")
+        rows.append([column, len(df), f"{fused_time:.3f}", f"{profiled_time:.3f}"])
+    print(format_profile(profilers))
+    print()
+    print_table(rows, ["column", "rows", "fused_s", "profiled_s"])
+
+
+def benchmark_unique_values(args):
+    """
+    Compare cleaning every row with cleaning only the distinct values of each column and mapping
+    them back through the factorized codes, for every task.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    rows = []
+    for column, processor_class in [("English", EnglishTextPreprocessor), ("Persian", PersianTextPreprocessor)]:
+        for task in TASKS:
+            whole = processor_class(task=task, min_duplicate_ratio=None)
+            unique = processor_class(task=task, min_duplicate_ratio=0)
+            # Warm-up, so that models loaded on first use are not part of the timings.
+            whole.process_column(df[column].iloc[:10])
+            unique.process_column(df[column].iloc[:10])
+            whole_time, expected = time_call(lambda: whole.process_column(df[column]), args.repeat)
+            unique.unique_stats = new_unique_stats()
+            unique_time, result = time_call(lambda: unique.process_column(df[column]), args.repeat)
+            if not result.equals(expected):
+                raise AssertionError(f"Distinct-value output differs for {column}, task '{task}'.")
+            stats = unique.unique_stats
+            rows.append([column, task, len(df), f"{1 - stats['unique_rows'] / stats['rows']:.1%}",
+                         f"{whole_time:.3f}", f"{unique_time:.3f}", f"{whole_time / unique_time:.1f}x"])
+    print_table(rows, ["column", "task", "rows", "duplicates", "all_rows_s", "distinct_s", "speedup"])
+
+
+def benchmark_pushdown(args):
+    """
+    Compare cleaning every row and filtering afterwards with letting the rows the task's filters
+    drop skip the costly stages, for every task. The filtered outputs must be identical.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    rows = []
+    for column, processor_class in [("English", EnglishTextPreprocessor), ("Persian", PersianTextPreprocessor)]:
+        for task in TASKS:
+            filters = task_filters(task)
+            preprocessor = processor_class(task=task)
+            # Warm-up, so that models loaded on first use are not part of the timings.
+            preprocessor.process_column(df[column].iloc[:10])
+            full_time, expected = time_call(lambda: preprocessor.process_column(df[column]), args.repeat)
+            preprocessor.pushdown_stats = new_pushdown_stats()
+            pushdown_time, result = time_call(
+                lambda: preprocessor.process_column(df[column], row_filters=filters), args.repeat)
+            expected = filter_rows(expected.to_frame(), [column], filters)[column]
+            result = filter_rows(result.to_frame(), [column], filters)[column]
+            if not result.astype(object).equals(expected.astype(object)):
+                raise AssertionError(f"Filtered output differs with pushdown for {column}, task '{task}'.")
+            stats = preprocessor.pushdown_stats
+            skipped = stats["skipped"] // args.repeat
+            rows.append([column, task, len(df), skipped, ", ".join(stats["stages"]) or "-",
+                         f"{full_time:.3f}", f"{pushdown_time:.3f}", f"{full_time / pushdown_time:.2f}x"])
+    print_table(rows, ["column", "task", "rows", "rows_skipped", "stages_skipped", "full_s", "pushdown_s", "speedup"])
+
+
+def benchmark_planner(args):
+    """
+    Compare running every stage of each task with the plan that drops the redundant passes
+    (repeated lowercasing and whitespace cleanup). The outputs must be identical.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    rows = []
+    for column, processor_class in [("English", EnglishTextPreprocessor), ("Persian", PersianTextPreprocessor)]:
+        for task in TASKS:
+            preprocessor = processor_class(task=task)
+            stages = preprocessor.build_stages(optimize=False)
+            planned = preprocessor.build_stages()
+            # Warm-up, so that models loaded on first use are not part of the timings.
+            run_stages(df[column].iloc[:10], stages)
+            full_time, expected = time_call(lambda: run_stages(df[column], stages), args.repeat)
+            planned_time, result = time_call(lambda: run_stages(df[column], planned), args.repeat)
+            if not result.equals(expected):
+                raise AssertionError(f"Planned output differs for {column}, task '{task}'.")
+            kept = {stage.name for stage in planned}
+            removed = [stage.name for stage in stages if stage.name not in kept]
+            rows.append([column, task, len(df), f"{len(stages)} -> {len(planned)}", ", ".join(removed) or "-",
+                         f"{full_time:.3f}", f"{planned_time:.3f}", f"{full_time / planned_time:.2f}x"])
+    print_table(rows, ["column", "task", "rows", "stages", "removed", "all_stages_s", "planned_s", "speedup"])
+
+
+def benchmark_multi_task(args):
+    """
+    Compare cleaning a column once per task with `process_tasks`, which runs the stages shared by
+    the task configurations once. The outputs must be identical.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    rows = []
+    for column, processor_class in [("English", EnglishTextPreprocessor), ("Persian", PersianTextPreprocessor)]:
+        # Distinct values are not factorized, so that both runs clean every row.
+        preprocessors = {task: processor_class(task=task, min_duplicate_ratio=None) for task in TASKS}
+        shared = processor_class(min_duplicate_ratio=None)
+        # Warm-up, so that models loaded on first use are not part of the timings.
+        for preprocessor in preprocessors.values():
+            preprocessor.process_column(df[column].iloc[:10])
+        shared.process_tasks(df[column].iloc[:10], TASKS)
+        separate_time, expected = time_call(
+            lambda: {task: preprocessor.process_column(df[column]) for task, preprocessor in preprocessors.items()},
+            args.repeat)
+        shared.tree_stats = new_tree_stats()
+        shared_time, result = time_call(lambda: shared.process_tasks(df[column], TASKS), args.repeat)
+        for task in TASKS:
+            if not result[task].equals(expected[task]):
+                raise AssertionError(f"Multi-task output differs for {column}, task '{task}'.")
+        stats = shared.tree_stats
+        runs = stats["stage_runs"] // args.repeat
+        rows.append([column, len(TASKS), len(df), f"{runs + stats['stage_runs_saved'] // args.repeat} -> {runs}",
+                     f"{separate_time:.3f}", f"{shared_time:.3f}", f"{separate_time / shared_time:.2f}x"])
+    print_table(rows, ["column", "tasks", "rows", "stage_runs", "separate_s", "shared_s", "speedup"])
+
+
+def benchmark_stage_cache(args):
+    """
+    Time the default task without the stage cache, with an empty cache (which writes the column
+    after every stage), rerun with `remove_stopwords` turned off (which resumes from the last stage
+    before it) and rerun unchanged. The outputs must be identical to uncached runs.
+    """
+    df = pd.read_csv(args.input, nrows=args.rows)
+    late_change = {"remove_stopwords": False}
+    rows = []
+    for column, processor_class in [("English", EnglishTextPreprocessor), ("Persian", PersianTextPreprocessor)]:
+        def build(stage_cache_path=None, changes=None):
+            preprocessor = processor_class(task="default", stage_cache_path=stage_cache_path)
+            preprocessor.current_task_config = dict(preprocessor.current_task_config, **(changes or {}))
+            return preprocessor
+
+        # Outputs of uncached runs of both configurations.
+        expected = {False: build().process_column(df[column]),
+                    True: build(changes=late_change).process_column(df[column])}
+        with tempfile.TemporaryDirectory() as directory:
+            for case, stage_cache_path, changed in [("uncached", None, False), ("cold", directory, False),
+                                                    ("late_change", directory, True), ("unchanged", directory, True)]:
+                preprocessor = build(stage_cache_path, late_change if changed else None)
+                # Warm-up, so that models loaded on first use are not part of the timings; its
+                # rows are another input, so it does not fill the cache for the timed run.
+                preprocessor.process_column(df[column].iloc[:10])
+                stats = preprocessor.stage_cache.stats if preprocessor.stage_cache is not None else {}
+                reused = stats.get("stages_reused", 0)
+                seconds, result = time_call(lambda: preprocessor.process_column(df[column]))
+                if not result.equals(expected[changed]):
+                    raise AssertionError(f"Stage cache output differs for {column}, case '{case}'.")
+                rows.append([column, case, len(df), stats.get("stages_reused", 0) - reused, f"{seconds:.3f}"])
+    print_table(rows, ["column", "case", "rows", "stages_reused", "seconds"])
+
+
+def _slice_column(input_path, column, rows):
+    # The first `rows` rows of the column, repeating the file when it is shorter.
+    texts = pd.read_csv(input_path, nrows=rows)[column]
+    return pd.concat([texts] * -(-rows // len(texts)), ignore_index=True).iloc[:rows]
+
+
+def _scaling_case(input_path, language, task, rows, repeat, results):
+    # Runs in a fresh process, so that the models loaded and the peak RSS only reflect this case.
+    column = _slice_column(input_path, language, rows)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    processor_class = EnglishTextPreprocessor if language == "English" else PersianTextPreprocessor
+    start = time.perf_counter()
+    preprocessor = processor_class(task=task)
+    # Warm-up on a few rows, so that models loaded on first use are not part of the timings.
+    preprocessor.process_column(column.iloc[:10])
+    load_seconds = time.perf_counter() - start
+    seconds, _ = time_call(lambda: preprocessor.process_column(column), repeat)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put({
+        "language": language,
+        "task": task,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_s": rows / seconds,
+        "us_per_row": seconds / rows * 1e6,
+        "load_seconds": load_seconds,
+        "peak_rss_mb": peak / 1024,
+        "rss_growth_mb": (peak - baseline) / 1024,
+    })
+
+
+# Run by a new interpreter for each case of the startup suite, so that nothing is imported yet:
+# importing the preprocessor, creating it and cleaning one row pay every model the task loads.
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+import pandas as pd
+from {module} import {class_name} as processor_class
+imported = time.perf_counter()
+preprocessor = processor_class(task={task!r})
+created = time.perf_counter()
+preprocessor.process_column(pd.Series(["Hello, this is a short test. سلام، این یک آزمایش است."]))
+done = time.perf_counter()
+print(json.dumps({{"import_s": imported - start, "init_s": created - imported, "first_row_s": done - created,
+                  "total_s": done - start,
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def _startup_case(language, task):
+    module, class_name = {
+        "English": ("english_text_preprocessor", "EnglishTextPreprocessor"),
+        "Persian": ("persian_text_preprocessor", "PersianTextPreprocessor"),
+    }[language]
+    script = STARTUP_SCRIPT.format(module=module, class_name=class_name, task=task)
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", script], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return dict(json.loads(output.strip().splitlines()[-1]), language=language, task=task)
+
+
+def run_in_fresh_process(target, *args):
+    """
+    Run `target(*args, results)` in a new spawned process and return what it put in `results`.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=target, args=args + (results,))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def compare_with_baseline(records, baseline_path, key_fields, value_field, higher_is_better=True):
+    """
+    Add the ratio to a baseline JSON report (written with --json by an earlier run) to every record
+    that has a match in it, as "vs_baseline": above 1 is faster, below 1 is a regression.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {tuple(record[field] for field in key_fields): record for record in json.load(f)["results"]}
+    for record in records:
+        previous = baseline.get(tuple(record[field] for field in key_fields))
+        if previous is not None and previous[value_field] and record[value_field]:
+            ratio = record[value_field] / previous[value_field]
+            record["vs_baseline"] = ratio if higher_is_better else 1 / ratio
+
+
+def save_results(args, records):
+    """
+    Write the records of a suite to `--json`, with enough context to compare runs over time.
+    """
+    if not args.json:
+        return
+    report = {
+        "suite": args.suite,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "input": args.input,
+        "repeat": args.repeat,
+        "results": records,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.json}")
+
+
+def benchmark_scaling(args):
+    """
+    Time every task of both preprocessors on the first 1k, 10k and 100k rows of the input (or
+    `--rows_list`), each case in a fresh process: rows per second, microseconds per row and peak RSS.
+    """
+    records = []
+    for language in ("English", "Persian"):
+        for task in TASKS:
+            for rows in args.rows_list or [1000, 10000, 100000]:
+                records.append(run_in_fresh_process(_scaling_case, args.input, language, task, rows, args.repeat))
+    if args.baseline:
+        compare_with_baseline(records, args.baseline, ["language", "task", "rows"], "rows_per_s")
+    print_table([[record["language"], record["task"], record["rows"], f"{record['rows_per_s']:.0f}",
+                  f"{record['us_per_row']:.1f}", f"{record['load_seconds']:.2f}", f"{record['peak_rss_mb']:.0f}",
+                  f"{record['vs_baseline']:.2f}x" if "vs_baseline" in record else "-"] for record in records],
+                ["language", "task", "rows", "rows_per_s", "us_per_row", "load_s", "peak_rss_mb", "vs_baseline"])
+    save_results(args, records)
+
+
+def benchmark_startup(args):
+    """
+    Time importing and creating each preprocessor and cleaning its first row, for every task, in a
+    new interpreter: the cost of the models a task loads.
+    """
+    records = [_startup_case(language, task) for language in ("English", "Persian") for task in TASKS]
+    if args.baseline:
+        compare_with_baseline(records, args.baseline, ["language", "task"], "total_s", higher_is_better=False)
+    print_table([[record["language"], record["task"], f"{record['import_s']:.2f}", f"{record['init_s']:.2f}",
+                  f"{record['first_row_s']:.2f}", f"{record['total_s']:.2f}", f"{record['peak_rss_mb']:.0f}",
+                  f"{record['vs_baseline']:.2f}x" if "vs_baseline" in record else "-"] for record in records],
+                ["language", "task", "import_s", "init_s", "first_row_s", "total_s", "peak_rss_mb", "vs_baseline"])
+    save_results(args, records)
+
+
+SUITES = {
+    "persian_fused": benchmark_persian_fused,
+    "persian_dictionaries": benchmark_persian_dictionaries,
+    "english_dictionaries": benchmark_english_dictionaries,
+    "english_lemmatization": benchmark_english_lemmatization,
+    "english_lemma_cache": benchmark_english_lemma_cache,
+    "english_spelling": benchmark_english_spelling,
+    "english_spelling_backends": benchmark_english_spelling_backends,
+    "persian_spelling": benchmark_persian_spelling,
+    "emoji": benchmark_emoji,
+    "parallel_scaling": benchmark_parallel_scaling,
+    "dedup": benchmark_dedup,
+    "near_dedup": benchmark_near_dedup,
+    "row_filters": benchmark_row_filters,
+    "output_formats": benchmark_output_formats,
+    "excel": benchmark_excel,
+    "text_cache": benchmark_text_cache,
+    "profile": benchmark_profile,
+    "scaling": benchmark_scaling,
+    "unique_values": benchmark_unique_values,
+    "pushdown": benchmark_pushdown,
+    "planner": benchmark_planner,
+    "multi_task": benchmark_multi_task,
+    "stage_cache": benchmark_stage_cache,
+    "startup": benchmark_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing pipelines.")
+    parser.add_argument("--suite", type=str, required=True, choices=sorted(SUITES),
+                        help="Benchmark suite to run.")
+    parser.add_argument("--input", type=str, default="translation_data.csv", help="Path to the input CSV file.")
+    parser.add_argument("--rows", type=int, default=None, help="Number of input rows to use (default: all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs; the best one is reported.")
+    parser.add_argument("--batch_size", type=int, default=1000, help="Batch size for spaCy's nlp.pipe.")
+    parser.add_argument("--n_process", type=int, default=1, help="Number of processes for spaCy's nlp.pipe.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes for spelling correction.")
+    parser.add_argument("--workers_list", type=lambda value: [int(item) for item in value.split(",")],
+                        default=[1, 2, 4, 8, 16], help="Comma-separated worker counts for parallel_scaling.")
+    parser.add_argument("--rows_list", type=lambda value: [int(item) for item in value.split(",")],
+                        default=None, help="Comma-separated row counts for excel (default 100000,1000000,5000000) "
+                                           "and scaling (default 1000,10000,100000).")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Write the results of the scaling and startup suites to this JSON file.")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="JSON results of an earlier scaling or startup run to compare with.")
+    args = parser.parse_args()
+
+    SUITES[args.suite](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+from output_writers import write_excel
 
 
 class WordCharacterCount:
@@ -14,13 +15,14 @@ class WordCharacterCount:
 
     def save_data_to_file(self, df, filename, file_type="csv"):
         """
-        Save a DataFrame to a file (CSV or Excel) in the specified output directory.
+        Save a DataFrame to a file (CSV or Excel) in the specified output directory. Excel files
+        are streamed row by row and split into several sheets beyond Excel's row limit.
         """
         filepath = os.path.join(self.output_directory, f"{filename}.{file_type}")
         if file_type == "csv":
             df.to_csv(filepath, index=False, encoding="utf-8")
         elif file_type == "xlsx":
-            df.to_excel(filepath, index=False, engine="openpyxl")
+            write_excel(df, filepath)
         else:
             raise ValueError("Unsupported file type. Use 'csv' or 'xlsx'.")
         print(f"Saved {file_type.upper()} file to {filepath}")
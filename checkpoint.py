@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+
+def fsync_directory(directory):
+    """
+    Flush a directory entry to disk, so that a file created or renamed in it survives a crash.
+    """
+    descriptor = os.open(directory or ".", os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def fsync_file(path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def write_json_atomic(path, data):
+    """
+    Replace the JSON file at `path` atomically: the new content is written and flushed to a
+    temporary file that is then renamed over `path`, so a crash leaves either the old or the new file.
+    """
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+    fsync_directory(os.path.dirname(path))
+
+
+def save_npy_durably(path, array):
+    """
+    Write a numpy array to `path` and flush it to disk.
+    """
+    with open(path, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+    fsync_directory(os.path.dirname(path))
+
+
+def config_hash(config):
+    """
+    Hash a JSON-serializable configuration, independently of the order of its keys.
+    """
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def input_identity(path):
+    """
+    Describe an input file by its absolute path, size and modification time, so that a checkpoint
+    is not resumed against a file that changed in the meantime.
+    """
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class Checkpoint:
+    """
+    Durable progress of a chunked run.
+
+    After every chunk, the outputs are flushed to disk, the deduplication state is checkpointed
+    into a subdirectory, and then `manifest.json` is replaced atomically with the number of
+    chunks done, the byte size of each output file and the counters of the run. The manifest
+    only ever describes work that is already on disk, so a crash at any point can be resumed
+    from it.
+
+    Args:
+        directory (str): Directory of the manifest and of the deduplication state.
+        config (dict): Everything that determines the output (task, options, input file, ...).
+            A checkpoint is only resumed by a run with the same configuration.
+    """
+
+    def __init__(self, directory, config):
+        self.directory = directory
+        self.config_hash = config_hash(config)
+        self.manifest_path = os.path.join(directory, "manifest.json")
+
+    def state_directory(self, name):
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        """
+        Return the progress recorded by the manifest, or None if there is no checkpoint.
+        """
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["config_hash"] != self.config_hash:
+            raise ValueError(f"The checkpoint in {self.directory} was written with another configuration or "
+                             f"input file; remove it or run without --resume.")
+        return manifest["progress"]
+
+    def save(self, **progress):
+        os.makedirs(self.directory, exist_ok=True)
+        write_json_atomic(self.manifest_path, {"config_hash": self.config_hash, "progress": progress})
+
+    def reset(self):
+        """
+        Delete the checkpoint, e.g. before a fresh run or once a run has completed.
+        """
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
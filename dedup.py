@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from checkpoint import save_npy_durably, write_json_atomic
+
+EMPTY = np.uint64(0)
+# Delta files a checkpointed set may accumulate before they are merged into one.
+MAX_DELTAS = 64
+
+
+def row_fingerprints(df, bits=64):
+    """
+    Compute a blake2b fingerprint of every row of a DataFrame (or Series).
+
+    Args:
+        df (pd.DataFrame or pd.Series): Rows to fingerprint; the values of a row are joined with a
+            separator that does not occur in cleaned text, and missing values hash alike.
+        bits (int): 64 or 128.
+
+    Returns:
+        np.ndarray: uint64 array of shape (rows,) for 64 bits, or (rows, 2) for 128 bits.
+    """
+    if bits not in (64, 128):
+        raise ValueError("bits must be 64 or 128.")
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    digest_size = bits // 8
+    digests = b"".join(
+        hashlib.blake2b(
+            "\x1f".join("\x00" if pd.isna(value) else str(value) for value in row).encode("utf-8"),
+            digest_size=digest_size,
+        ).digest()
+        for row in df.itertuples(index=False, name=None)
+    )
+    fingerprints = np.frombuffer(digests, dtype="<u8").copy()
+    if bits == 128:
+        fingerprints = fingerprints.reshape(-1, 2)
+    # 0 marks an empty slot of the hash table.
+    fingerprints[fingerprints == EMPTY] = 1
+    return fingerprints
+
+
+class FingerprintSet:
+    """
+    Exact set of row fingerprints, for deduplication across chunks and input files.
+
+    Fingerprints are kept in a numpy open-addressing hash table (8 or 16 bytes per row instead of
+    the row's Python strings). When the table would use more than `memory_limit` bytes, its
+    contents are sorted and written to a run file in `spill_directory`, and the table starts
+    empty again. Membership is checked against the table and, by binary search, against every
+    memory-mapped run.
+
+    Args:
+        bits (int): Fingerprint size, 64 or 128. With 64 bits the probability of any false
+            duplicate among n rows is about n^2 / 2^65 (~3e-6 for 10 million rows).
+        memory_limit (int): Maximum size of the in-memory table in bytes.
+        spill_directory (str): Directory of the run files; required before the first spill.
+    """
+
+    def __init__(self, bits=64, memory_limit=256 * 2 ** 20, spill_directory=None, initial_capacity=2 ** 16):
+        if bits not in (64, 128):
+            raise ValueError("bits must be 64 or 128.")
+        self.bits = bits
+        self.memory_limit = memory_limit
+        self.spill_directory = spill_directory
+        self.initial_capacity = initial_capacity
+        self.runs = []
+        self.run_paths = []
+        self.spilled = 0
+        # Checkpoint bookkeeping: the fingerprints inserted since the last checkpoint, the delta
+        # files holding the in-memory fingerprints of earlier checkpoints, and the delta files a
+        # spill made redundant (deleted once the next checkpoint no longer lists them).
+        self.tracking = False
+        self.pending = []
+        self.delta_paths = []
+        self.obsolete_paths = []
+        self.checkpoints = 0
+        self._reset_table(initial_capacity)
+
+    @property
+    def width(self):
+        return self.bits // 64
+
+    def __len__(self):
+        return self.count + self.spilled
+
+    def _reset_table(self, capacity):
+        self.table = np.zeros((capacity, self.width), dtype=np.uint64)
+        self.count = 0
+
+    def _as_rows(self, fingerprints):
+        return np.asarray(fingerprints, dtype=np.uint64).reshape(-1, self.width)
+
+    def _slots(self, fingerprints):
+        return (fingerprints[:, 0] & np.uint64(len(self.table) - 1)).astype(np.int64)
+
+    def _lookup(self, fingerprints):
+        """
+        Probe the table for every fingerprint. Returns whether each one is present and the slot
+        where the probe ended (its slot, or the first empty slot of its probe sequence).
+        """
+        slots = self._slots(fingerprints)
+        found = np.zeros(len(fingerprints), dtype=bool)
+        pending = np.arange(len(fingerprints))
+        mask = len(self.table) - 1
+        while len(pending):
+            stored = self.table[slots[pending]]
+            empty = stored[:, 0] == EMPTY
+            match = (stored == fingerprints[pending]).all(axis=1)
+            found[pending[match]] = True
+            pending = pending[~(empty | match)]
+            slots[pending] = (slots[pending] + 1) & mask
+        return found, slots
+
+    def _insert(self, fingerprints):
+        # `fingerprints` are distinct and absent from the table.
+        if (self.count + len(fingerprints)) * 2 > len(self.table):
+            self._grow(self.count + len(fingerprints))
+        _, slots = self._lookup(fingerprints)
+        mask = len(self.table) - 1
+        pending = np.arange(len(fingerprints))
+        while len(pending):
+            occupied = self.table[slots[pending], 0] != EMPTY
+            while occupied.any():
+                moving = pending[occupied]
+                slots[moving] = (slots[moving] + 1) & mask
+                occupied = self.table[slots[pending], 0] != EMPTY
+            # Several fingerprints can end on the same empty slot: the first one takes it and the
+            # others probe further on the next round.
+            _, first = np.unique(slots[pending], return_index=True)
+            winners = pending[first]
+            self.table[slots[winners]] = fingerprints[winners]
+            pending = np.setdiff1d(pending, winners, assume_unique=True)
+        self.count += len(fingerprints)
+
+    def _grow(self, needed):
+        capacity = len(self.table)
+        while needed * 2 > capacity:
+            capacity *= 2
+        stored = self.table[self.table[:, 0] != EMPTY]
+        self._reset_table(capacity)
+        if len(stored):
+            self._insert(stored)
+
+    def _in_runs(self, fingerprints):
+        present = np.zeros(len(fingerprints), dtype=bool)
+        keys = self._sort_keys(fingerprints)
+        for run in self.runs:
+            positions = np.searchsorted(run, keys)
+            inside = positions < len(run)
+            present[inside] |= run[positions[inside]] == keys[inside]
+        return present
+
+    def _sort_keys(self, fingerprints):
+        if self.width == 1:
+            return fingerprints[:, 0].copy()
+        return np.ascontiguousarray(fingerprints).view([("high", "<u8"), ("low", "<u8")]).reshape(-1)
+
+    def spill(self):
+        """
+        Write the in-memory fingerprints to a sorted run file and empty the table.
+        """
+        if self.spill_directory is None:
+            raise ValueError("FingerprintSet needs a spill_directory once memory_limit is exceeded.")
+        os.makedirs(self.spill_directory, exist_ok=True)
+        stored = self.table[self.table[:, 0] != EMPTY]
+        run = np.sort(self._sort_keys(stored))
+        path = os.path.join(self.spill_directory, f"run_{len(self.run_paths):05d}.npy")
+        save_npy_durably(path, run)
+        self.run_paths.append(path)
+        self.runs.append(np.load(path, mmap_mode="r"))
+        self.spilled += len(run)
+        self._reset_table(self.initial_capacity)
+        # The run holds every fingerprint of the table, so the deltas are no longer needed.
+        self.obsolete_paths.extend(self.delta_paths)
+        self.delta_paths = []
+        self.pending = []
+
+    def contains(self, fingerprints):
+        fingerprints = self._as_rows(fingerprints)
+        found, _ = self._lookup(fingerprints)
+        if self.runs:
+            found |= self._in_runs(fingerprints)
+        return found
+
+    def add(self, fingerprints):
+        """
+        Add fingerprints and report which ones were new.
+
+        Returns:
+            np.ndarray: Boolean mask, True for the first occurrence of a fingerprint that was not
+            in the set (so a later repeat within the same batch is False as well).
+        """
+        fingerprints = self._as_rows(fingerprints)
+        new = np.zeros(len(fingerprints), dtype=bool)
+        if not len(fingerprints):
+            return new
+        _, first = np.unique(self._sort_keys(fingerprints), return_index=True)
+        first.sort()
+        candidates = first[~self.contains(fingerprints[first])]
+        if not len(candidates):
+            return new
+        # The table is kept at most half full; spill before it would outgrow the memory limit.
+        if self.count and (self.count + len(candidates)) * 2 * self.width * 8 > self.memory_limit:
+            self.spill()
+        self._insert(fingerprints[candidates])
+        if self.tracking:
+            self.pending.append(fingerprints[candidates])
+        new[candidates] = True
+        return new
+
+    def save(self, directory):
+        """
+        Persist the set to `directory` (the in-memory table is spilled as one more run), so that a
+        later run over other input files can continue deduplicating against it. Runs spilled to
+        another directory are moved into `directory`.
+        """
+        if self.spill_directory is None:
+            self.spill_directory = directory
+        if self.count:
+            self.spill()
+        os.makedirs(directory, exist_ok=True)
+        for index, path in enumerate(self.run_paths):
+            if os.path.dirname(os.path.abspath(path)) != os.path.abspath(directory):
+                target = os.path.join(directory, f"run_{index:05d}.npy")
+                shutil.move(path, target)
+                self.run_paths[index] = target
+                self.runs[index] = np.load(target, mmap_mode="r")
+        manifest = {
+            "bits": self.bits,
+            "runs": [os.path.relpath(path, directory) for path in self.run_paths],
+        }
+        write_json_atomic(os.path.join(directory, "fingerprints.json"), manifest)
+
+    def checkpoint(self, directory):
+        """
+        Record the set durably in `directory` without emptying the table: only the fingerprints
+        added since the previous checkpoint are written, as one small delta file. `load` restores
+        the set as of the last checkpoint.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if self.tracking and len(self.delta_paths) < MAX_DELTAS:
+            new = np.concatenate(self.pending) if self.pending else np.empty((0, self.width), dtype=np.uint64)
+        else:
+            # First checkpoint, or too many small deltas: write the whole table as a single delta.
+            new = self.table[self.table[:, 0] != EMPTY]
+            self.obsolete_paths.extend(self.delta_paths)
+            self.delta_paths = []
+            self.tracking = True
+        self.pending = []
+        if len(new):
+            path = os.path.join(directory, f"delta_{self.checkpoints:06d}.npy")
+            save_npy_durably(path, new)
+            self.delta_paths.append(path)
+            self.checkpoints += 1
+        manifest = {
+            "bits": self.bits,
+            "runs": [os.path.relpath(path, directory) for path in self.run_paths],
+            "deltas": [os.path.relpath(path, directory) for path in self.delta_paths],
+            "checkpoints": self.checkpoints,
+        }
+        write_json_atomic(os.path.join(directory, "fingerprints.json"), manifest)
+        for path in self.obsolete_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.obsolete_paths = []
+
+    @classmethod
+    def load(cls, directory, memory_limit=256 * 2 ** 20):
+        with open(os.path.join(directory, "fingerprints.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        fingerprint_set = cls(bits=manifest["bits"], memory_limit=memory_limit, spill_directory=directory)
+        for relative_path in manifest["runs"]:
+            path = os.path.normpath(os.path.join(directory, relative_path))
+            run = np.load(path, mmap_mode="r")
+            fingerprint_set.run_paths.append(path)
+            fingerprint_set.runs.append(run)
+            fingerprint_set.spilled += len(run)
+        # A checkpoint also lists the delta files of the fingerprints that were still in memory.
+        for relative_path in manifest.get("deltas", []):
+            path = os.path.normpath(os.path.join(directory, relative_path))
+            fingerprint_set._insert(fingerprint_set._as_rows(np.load(path)))
+            fingerprint_set.delta_paths.append(path)
+        if "checkpoints" in manifest:
+            fingerprint_set.tracking = True
+            fingerprint_set.checkpoints = manifest["checkpoints"]
+        return fingerprint_set
+
+
+def drop_duplicate_rows(df, seen, subset=None):
+    """
+    Drop the rows of `df` whose fingerprint is already in `seen` (or repeats within `df`) and add
+    the remaining ones to it; the equivalent of `drop_duplicates` across several DataFrames.
+    """
+    fingerprints = row_fingerprints(df if subset is None else df[subset], bits=seen.bits)
+    return df[seen.add(fingerprints)]
@@ -0,0 +1,306 @@
+import re
+
+WORD_CHARACTER_PATTERN = re.compile(r"\w")
+
+
+def _is_word(character):
+    return bool(WORD_CHARACTER_PATTERN.match(character))
+
+
+def _overlaps(first, second):
+    """
+    Check whether a proper suffix of `first` is a proper prefix of `second`.
+    """
+    return any(first.endswith(second[:size]) for size in range(1, min(len(first), len(second))))
+
+
+def _creates(value, key):
+    """
+    Check whether inserting `value` into a text can produce a new occurrence of `key`.
+    """
+    return key in value or value in key or _overlaps(value, key) or _overlaps(key, value)
+
+
+def _same_edges(key, value):
+    """
+    Check whether replacing `key` with `value` keeps the word/non-word kind of both edges, so the
+    replacement cannot change whether a neighbouring key sits on a word boundary.
+    """
+    return (
+        value != ""
+        and _is_word(key[0]) == _is_word(value[0])
+        and _is_word(key[-1]) == _is_word(value[-1])
+    )
+
+
+def _interferes(first, second):
+    """
+    Check whether swapping the order of two replacements can change the result.
+    """
+    first_key, first_value, first_bounded = first
+    second_key, second_value, second_bounded = second
+    return (
+        first_key in second_key
+        or second_key in first_key
+        or _overlaps(first_key, second_key)
+        or _overlaps(second_key, first_key)
+        or _creates(first_value, second_key)
+        or _creates(second_value, first_key)
+        or (second_bounded and not _same_edges(first_key, first_value))
+        or (first_bounded and not _same_edges(second_key, second_value))
+    )
+
+
+def _trie_pattern(keys):
+    """
+    Build a regular expression matching the longest of `keys` at a position, with the
+    alternatives nested as a trie so that a failed match is abandoned after its first character.
+    """
+    trie = {}
+    for key in keys:
+        node = trie
+        for character in key:
+            node = node.setdefault(character, {})
+        node[""] = {}
+
+    def build(node):
+        branches = []
+        characters = []
+        for character in sorted(character for character in node if character):
+            child = build(node[character])
+            if child is None:
+                characters.append(re.escape(character))
+            else:
+                branches.append(re.escape(character) + child)
+        if characters:
+            branches.append(characters[0] if len(characters) == 1 else "[" + "".join(characters) + "]")
+        if not branches:
+            return None
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+def _compose(replacements):
+    """
+    Compose a run of single-character replacements into a map from each character to its final text.
+    """
+    composed = {}
+    for character in {key for key, _, _ in replacements}:
+        result = character
+        for key, value, _ in replacements:
+            result = result.replace(key, value)
+        if result != character:
+            composed[character] = result
+    return composed
+
+
+def _bounded_pattern(key):
+    pattern = re.escape(key)
+    if _is_word(key[0]):
+        pattern = r"(?<!\w)" + pattern
+    if _is_word(key[-1]):
+        pattern = pattern + r"(?!\w)"
+    return pattern
+
+
+def replace_sequentially(text, dictionaries, word_boundary=None):
+    """
+    Reference implementation: one regular expression substitution per key, in dictionary order.
+    """
+    word_boundary = word_boundary or [False] * len(dictionaries)
+    for dictionary, bounded in zip(dictionaries, word_boundary):
+        for key, value in dictionary.items():
+            pattern = _bounded_pattern(key) if bounded else re.escape(key)
+            text = re.sub(pattern, value, text)
+    return text
+
+
+class DictionaryReplacer:
+    """
+    Replace the keys of an ordered list of dictionaries with their values.
+
+    The result is the same as calling `re.sub(re.escape(key), value, text)` for every key of every
+    dictionary in order, including chained mappings where a value is replaced again by a later key.
+    The dictionaries are compiled once into a short list of steps:
+
+    - single-character keys are composed into one `str.translate` table;
+    - multi-character keys where no replacement can create or hide a match of a later key are
+      merged into one longest-match regular expression, nested as a trie;
+    - a key is moved ahead of the replacements it commutes with so that it can join an earlier
+      table or expression.
+
+    Before the first expression runs, one scan of the text finds which keys occur in it, and the
+    expressions without a matching key are skipped. The scan is repeated only after a step has
+    changed the text.
+
+    Args:
+        dictionaries (list): Ordered list of dictionaries mapping a key to its replacement.
+        word_boundary (list): Optional list of booleans, one per dictionary. Keys of a dictionary
+            flagged True only match when they are not part of a longer word (e.g. "cant" in
+            "significant" is left alone).
+    """
+
+    def __init__(self, dictionaries, word_boundary=None):
+        word_boundary = word_boundary or [False] * len(dictionaries)
+        if len(word_boundary) != len(dictionaries):
+            raise ValueError("word_boundary must have one entry per dictionary.")
+
+        self.segments = []
+        for dictionary, bounded in zip(dictionaries, word_boundary):
+            for key, value in dictionary.items():
+                if not key:
+                    raise ValueError("Dictionary keys must be non-empty strings.")
+                if "\\" in value:
+                    raise ValueError(f"Replacement value {value!r} contains a backslash.")
+                self._add((key, value, bounded and (_is_word(key[0]) or _is_word(key[-1]))))
+
+        self.steps = [self._compile(kind, replacements) for kind, replacements in self.segments]
+
+        scanned_keys = set()
+        for keys, _ in self.steps:
+            scanned_keys.update(keys or ())
+        self.scan_pattern = re.compile("(?=(" + _trie_pattern(scanned_keys) + "))") if scanned_keys else None
+        self.prefixes = {key: {other for other in scanned_keys if key.startswith(other)} for key in scanned_keys}
+        # Whether a step can insert text that forms a key of a later expression. Only then does a
+        # change made by the step require a new scan; otherwise the keys found earlier remain a
+        # superset of the keys present.
+        self.may_create = []
+        for position, (kind, replacements) in enumerate(self.segments):
+            later_keys = set()
+            for keys, _ in self.steps[position + 1:]:
+                later_keys.update(keys or ())
+            if kind == "character":
+                inserted = _compose(replacements).values()
+            else:
+                inserted = [value for _, value, _ in replacements]
+            self.may_create.append(any(
+                value == "" or any(_creates(value, key) for key in later_keys) for value in inserted
+            ))
+        # Index of the next step that does not depend on the scan, used to skip a whole run of
+        # expressions when the text contains none of the keys.
+        self.next_unscanned = [len(self.steps)] * len(self.steps)
+        for position in range(len(self.steps) - 2, -1, -1):
+            following_keys, _ = self.steps[position + 1]
+            self.next_unscanned[position] = (
+                position + 1 if following_keys is None else self.next_unscanned[position + 1]
+            )
+
+    def _add(self, replacement):
+        key, _, bounded = replacement
+        kind = "character" if len(key) == 1 and not bounded else "string"
+        target = None
+        position = len(self.segments) - 1
+        # Walk back over the segments this replacement commutes with and join the latest segment
+        # of the same kind that accepts it.
+        while position >= 0:
+            segment_kind, replacements = self.segments[position]
+            if segment_kind == kind and (kind == "character" or self._can_join(replacements, replacement)):
+                target = position
+                break
+            if any(_interferes(replacement, other) for other in replacements):
+                break
+            position -= 1
+
+        if target is None:
+            self.segments.append((kind, [replacement]))
+        else:
+            self.segments[target][1].append(replacement)
+
+    @staticmethod
+    def _can_join(group, replacement):
+        # `key` runs after every key already in the group. A single longest-match scan gives the
+        # same result as the sequential replacements if no earlier replacement can create or
+        # hide a match of `key`.
+        key, _, bounded = replacement
+        for other_key, other_value, _ in group:
+            if other_value == "" or _creates(other_value, key):
+                return False
+            if other_key in key:
+                # The shorter key runs first and would hide matches of the longer one.
+                return False
+            if _overlaps(key, other_key):
+                # `key` can start before `other_key` and run into it; the scan would keep `key`,
+                # the sequential replacement keeps `other_key`.
+                return False
+            if bounded and not _same_edges(other_key, other_value):
+                return False
+        return True
+
+    @staticmethod
+    def _compile(kind, replacements):
+        if kind == "character":
+            table = {ord(character): result for character, result in _compose(replacements).items()}
+            return None, lambda text: text.translate(table)
+
+        mapping = {key: value for key, value, _ in replacements}
+        if len(replacements) == 1 and not replacements[0][2]:
+            key, value, _ = replacements[0]
+            return None, lambda text: text.replace(key, value)
+
+        if any(bounded for _, _, bounded in replacements):
+            # Longest first, so the first alternative that satisfies its boundaries is the longest one.
+            ordered = sorted(replacements, key=lambda replacement: len(replacement[0]), reverse=True)
+            pattern = "|".join(_bounded_pattern(key) if bounded else re.escape(key) for key, _, bounded in ordered)
+        else:
+            pattern = _trie_pattern(mapping)
+        pattern = re.compile(pattern)
+        return frozenset(mapping), lambda text: pattern.sub(lambda match: mapping[match.group(0)], text)
+
+    def find_keys(self, text):
+        """
+        Return the set of scanned keys occurring anywhere in `text`, including overlapping ones.
+        """
+        found = set()
+        for key in self.scan_pattern.findall(text):
+            found.update(self.prefixes[key])
+        return found
+
+    def replace(self, text):
+        present = None
+        position = 0
+        while position < len(self.steps):
+            keys, step = self.steps[position]
+            if keys is not None:
+                if present is None:
+                    present = self.find_keys(text)
+                if not present:
+                    position = self.next_unscanned[position]
+                    continue
+                if present.isdisjoint(keys):
+                    position += 1
+                    continue
+            result = step(text)
+            if result != text:
+                text = result
+                if self.may_create[position]:
+                    present = None
+            position += 1
+        return text
+
+    __call__ = replace
+
+    def replacements(self):
+        for _, replacements in self.segments:
+            yield from replacements
+
+    def keeps_lowercase(self):
+        """
+        Whether a lowercase text stays lowercase: every value inserted is lowercase.
+        """
+        return all(value == value.lower() for _, value, _ in self.replacements())
+
+    def ignores_spacing(self):
+        """
+        Whether texts that only differ in their runs of whitespace are replaced into texts that only
+        differ in their runs of whitespace: no key contains whitespace, except keys made of
+        whitespace only that are replaced with whitespace.
+        """
+        return all(
+            not any(character.isspace() for character in key)
+            or (key.isspace() and value != "" and value.isspace())
+            for key, value, _ in self.replacements()
+        )
@@ -0,0 +1,184 @@
+import re
+import emoji
+
+EMOJI_SENTIMENT_MAP = {
+    # Positive Emojis
+    "😊": "positive",
+    "😂": "positive",
+    "😄": "positive",
+    "😁": "positive",
+    "😎": "positive",
+    "😍": "positive",
+    "😘": "positive",
+    "😇": "positive",
+    "🥳": "positive",
+    "🤩": "positive",
+    "😌": "positive",
+    "👏": "positive",
+    "👍": "positive",
+    "💪": "positive",
+    "🌟": "positive",
+    "❤️": "positive",
+    "💕": "positive",
+    "🎉": "positive",
+
+    # Negative Emojis
+    "😢": "negative",
+    "😭": "negative",
+    "😔": "negative",
+    "😞": "negative",
+    "😡": "negative",
+    "😠": "negative",
+    "🤬": "negative",
+    "😩": "negative",
+    "😱": "negative",
+    "🙁": "negative",
+    "😣": "negative",
+    "💔": "negative",
+    "👎": "negative",
+    "😤": "negative",
+
+    # Neutral Emojis
+    "😐": "neutral",
+    "😑": "neutral",
+    "😶": "neutral",
+    "🙄": "neutral",
+    "🤔": "neutral",
+    "🤨": "neutral",
+    "😕": "neutral",
+    "🤝": "neutral",
+    "✋": "neutral",
+    "👌": "neutral",
+    "💬": "neutral",
+    "🤷": "neutral",
+    "🙃": "neutral",
+}
+
+# Variation selector 16 and the five skin tone modifiers, ignored when looking up a sentiment label
+# so that e.g. "❤" and "❤️" or "👍" and "👍🏽" get the same label.
+SENTIMENT_KEY_TABLE = str.maketrans("", "", "\ufe0f\U0001F3FB\U0001F3FC\U0001F3FD\U0001F3FE\U0001F3FF")
+
+
+def _character_class(characters):
+    """
+    Build a regular expression character class from a set of characters, merging runs of
+    consecutive codepoints into ranges so that the class stays short.
+    """
+    codepoints = sorted(ord(character) for character in characters)
+    ranges = []
+    for codepoint in codepoints:
+        if ranges and codepoint == ranges[-1][1] + 1:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+    return "[" + "".join(
+        re.escape(chr(first)) if first == last else f"{re.escape(chr(first))}-{re.escape(chr(last))}"
+        for first, last in ranges
+    ) + "]"
+
+
+# Lengths of the emoji starting with each character, longest first. Multi-codepoint sequences
+# (variation selectors, skin tones, keycaps, ZWJ sequences) are matched as a whole.
+def _emoji_lengths():
+    lengths = {}
+    for key in emoji.EMOJI_DATA:
+        lengths.setdefault(key[0], set()).add(len(key))
+    return {character: sorted(sizes, reverse=True) for character, sizes in lengths.items()}
+
+
+EMOJI_LENGTHS = _emoji_lengths()
+EMOJI_START_PATTERN = re.compile(_character_class(EMOJI_LENGTHS))
+
+# Every emoji contains at least one of these non-ASCII codepoints (keycaps start with an ASCII
+# character but continue with U+20E3), so a text without any of them has no emoji.
+EMOJI_CHARACTERS = frozenset(
+    character for key in emoji.EMOJI_DATA for character in key if not character.isascii()
+)
+
+
+def contains_emoji_character(text):
+    """
+    Cheap prefilter: False when `text` cannot contain an emoji.
+    """
+    return not text.isascii() and not EMOJI_CHARACTERS.isdisjoint(text)
+
+
+def find_emoji(text):
+    """
+    Yield the (start, end) span of every emoji in `text`, taking the longest emoji at each position.
+    """
+    position = 0
+    for match in EMOJI_START_PATTERN.finditer(text):
+        start = match.start()
+        if start < position:
+            continue
+        for length in EMOJI_LENGTHS[text[start]]:
+            if text[start:start + length] in emoji.EMOJI_DATA:
+                position = start + length
+                yield start, position
+                break
+
+
+def substitute_emoji(text, replace):
+    """
+    Replace every emoji of `text` with `replace(emoji)`.
+    """
+    if not contains_emoji_character(text):
+        return text
+    pieces = []
+    position = 0
+    for start, end in find_emoji(text):
+        pieces.append(text[position:start])
+        pieces.append(replace(text[start:end]))
+        position = end
+    if not pieces:
+        return text
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+class EmojiHandler:
+    """
+    Remove or replace the emoji of a text.
+
+    Args:
+        replacement (str): Text substituted for every emoji by the "replace" strategy.
+        sentiment_map (dict): Emoji -> sentiment label used by the "sentiment" strategy. Variation
+            selectors and skin tone modifiers are ignored in the lookup.
+        default_sentiment (str): Label of the emoji missing from `sentiment_map`; None removes them.
+    """
+
+    def __init__(self, replacement, sentiment_map=None, default_sentiment=None):
+        self.replacement = replacement
+        self.default_sentiment = default_sentiment
+        self.sentiment_map = {
+            key.translate(SENTIMENT_KEY_TABLE): label for key, label in (sentiment_map or {}).items()
+        }
+        self.strategies = {
+            "remove": self.remove,
+            "replace": self.replace,
+            "sentiment": self.sentiment,
+        }
+
+    def remove(self, text):
+        return substitute_emoji(text, lambda _: "")
+
+    def replace(self, text):
+        return substitute_emoji(text, lambda _: self.replacement)
+
+    def sentiment(self, text):
+        return substitute_emoji(text, self._sentiment_label)
+
+    def _sentiment_label(self, emoji_text):
+        label = self.sentiment_map.get(emoji_text.translate(SENTIMENT_KEY_TABLE), self.default_sentiment)
+        return f" {label} " if label else ""
+
+    def handle(self, text, strategy):
+        """
+        Apply a strategy ("remove", "replace" or "sentiment") to a text. Non-string values and
+        unknown strategies are returned unchanged.
+        """
+        if not isinstance(text, str):
+            return text
+        handler = self.strategies.get(strategy)
+        return handler(text) if handler else text
@@ -1,8 +1,7 @@
 import re
 import unicodedata
-import emoji
-from spellchecker import SpellChecker
-import spacy
+from functools import partial
+import pandas as pd
 
 from Dictionaries_En import (
     english_dict,
@@ -11,19 +10,69 @@ from Dictionaries_En import (
     special_char_dict,
     month_dict,
 )
+from caching import LRUCache
+from dictionary_replacer import DictionaryReplacer
+from emoji_handler import EMOJI_SENTIMENT_MAP, EmojiHandler
+from spelling import TOKEN_PATTERN, SpellingCorrector, dictionary_version
+from stage_cache import StageCache
+from symspell import SymSpell
+from text_cache import TextCache, cache_namespace, dictionary_items
+from text_pipeline import (LOWERCASE, MIN_DUPLICATE_RATIO, SINGLE_SPACES, Stage, new_pushdown_stats, new_tree_stats,
+                           new_unique_stats, plan_stages, run_on_unique_values, run_stage_tree,
+                           run_stages_with_pushdown)
+
+# spaCy components the rule-based lemmatizer needs: token vectors, POS tags and the lemmatizer.
+LEMMATIZER_COMPONENTS = ("tok2vec", "tagger", "morphologizer", "attribute_ruler", "lemmatizer")
 
 
 class EnglishTextPreprocessor:
-    def __init__(self, task="default"):
-        self.spellchecker = SpellChecker()
+    def __init__(self, task="default", contractions_word_boundary=False, batch_size=1000, n_process=1,
+                 lemmatize_mode="rule", lemma_cache_size=100000, spelling_workers=1, spelling_cache_path=None,
+                 spelling_backend="pyspellchecker", symspell_index_path=None, text_cache_path=None,
+                 text_cache_size=100000, text_cache_max_entries=None, min_duplicate_ratio=MIN_DUPLICATE_RATIO,
+                 stage_cache_path=None):
+        # The spellchecker, the spelling engine and the spaCy pipeline are loaded on first use (see
+        # the properties below), so a task whose stages need none of them starts without loading them.
+        if spelling_backend not in ("pyspellchecker", "symspell"):
+            raise ValueError("spelling_backend must be 'pyspellchecker' or 'symspell'.")
+        self.spelling_backend = spelling_backend
+        self.symspell_index_path = symspell_index_path
+        self.spelling_workers = spelling_workers
+        self.spelling_cache_path = spelling_cache_path
+        self._spellchecker = None
+        self._spelling_engine = None
+        self._spelling_corrector = None
+        self._nlp = None
+        self._stopwords = None
         self.english_dict = english_dict
         self.contractions_dict = contractions_dict
         self.sign_dict_en = sign_dict_en
         self.special_char_dict = special_char_dict
         self.month_dict = month_dict
-
-        self.nlp = spacy.load("en_core_web_sm")
-        self.stopwords = self.nlp.Defaults.stop_words
+        self.emoji_handler = EmojiHandler(" EMOJI ", sentiment_map=EMOJI_SENTIMENT_MAP)
+        # With contractions_word_boundary=True, contractions only match whole words, so "cant" in
+        # "significant" is left alone. The default keeps the plain substring replacement.
+        self.contractions_word_boundary = contractions_word_boundary
+        self.dictionary_replacer = DictionaryReplacer(
+            [
+                self.contractions_dict,
+                self.english_dict,
+                # self.sign_dict_en,
+                self.special_char_dict
+            ],
+            word_boundary=[contractions_word_boundary, False, False],
+        )
+
+        # Batching options for the column-level lemmatization stage (nlp.pipe).
+        self.batch_size = batch_size
+        self.n_process = n_process
+        # Lemmatization mode of the column stage: "rule" (POS-aware, same result as the spaCy
+        # pipeline) or "lookup" (word-level lookup table, no tagger).
+        if lemmatize_mode not in ("rule", "lookup"):
+            raise ValueError("lemmatize_mode must be 'rule' or 'lookup'.")
+        self.lemmatize_mode = lemmatize_mode
+        self.lemma_cache = LRUCache(maxsize=lemma_cache_size)
+        self.lemma_lookup_table = None
 
         self.task_config = {
             "default": {
@@ -132,7 +181,80 @@ class EnglishTextPreprocessor:
                 "clean_extra_spaces": True,
             },
         }
+        self.task = task
         self.current_task_config = self.task_config.get(task, self.task_config["default"])
+        # Optional cache of cleaned rows shared between runs (sqlite at `text_cache_path`), see TextCache.
+        self.text_cache = None
+        self.text_cache_namespace = None
+        # Columns with at least this share of duplicate rows only clean their distinct values
+        # (None disables it); `unique_stats` counts the rows skipped and the time saved.
+        self.min_duplicate_ratio = min_duplicate_ratio
+        self.unique_stats = new_unique_stats()
+        # Rows that skipped the costly stages because a row filter drops them anyway.
+        self.pushdown_stats = new_pushdown_stats()
+        # Stage runs shared between the tasks of `process_tasks`.
+        self.tree_stats = new_tree_stats()
+        if text_cache_path is not None:
+            self.text_cache = TextCache(text_cache_path, memory_size=text_cache_size,
+                                        max_entries=text_cache_max_entries)
+        # Optional cache of the column after every stage (Parquet files in `stage_cache_path`), so a
+        # rerun with a changed configuration resumes from the deepest stage it shares, see StageCache.
+        self.stage_cache = StageCache(stage_cache_path) if stage_cache_path is not None else None
+
+    @property
+    def spellchecker(self):
+        if self._spellchecker is None:
+            from spellchecker import SpellChecker
+            self._spellchecker = SpellChecker()
+        return self._spellchecker
+
+    @property
+    def spelling_engine(self):
+        # Engine proposing the corrections: pyspellchecker itself, or a symmetric-delete index built
+        # from the same word frequency list (loaded from / saved to `symspell_index_path`).
+        # Unknown words are always detected with pyspellchecker.
+        if self._spelling_engine is None:
+            if self.spelling_backend == "symspell":
+                self._spelling_engine = SymSpell.load_or_build(self.spellchecker, self.symspell_index_path)
+            else:
+                self._spelling_engine = self.spellchecker
+        return self._spelling_engine
+
+    @property
+    def spelling_corrector(self):
+        # The column-level spelling stage corrects each unknown word of a column once, on
+        # `spelling_workers` processes, and keeps the corrections in `spelling_cache_path` (sqlite).
+        if self._spelling_corrector is None:
+            self._spelling_corrector = SpellingCorrector(
+                self.spelling_engine, workers=self.spelling_workers, cache_path=self.spelling_cache_path
+            )
+        return self._spelling_corrector
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            import spacy
+            self._nlp = spacy.load("en_core_web_sm")
+        return self._nlp
+
+    @property
+    def stopwords(self):
+        # The stop words of en_core_web_sm are those of the English language defaults, which are
+        # available without loading the model.
+        if self._stopwords is None:
+            if self._nlp is not None:
+                self._stopwords = self._nlp.Defaults.stop_words
+            else:
+                from spacy.lang.en import English
+                self._stopwords = English.Defaults.stop_words
+        return self._stopwords
+
+    def uses_spacy(self, config=None):
+        """
+        Whether the stages of a task configuration need the spaCy pipeline.
+        """
+        config = config or self.current_task_config
+        return bool(config["apply_lemmatization"] or config.get("apply_stemming", False))
 
     def to_lower_case(self, text):
         return text.lower() if isinstance(text, str) else text
@@ -155,104 +277,52 @@ class EnglishTextPreprocessor:
 
     def correct_spelling(self, text):
         corrected_text = []
-        tokens = re.findall(r"[\w']+|[.,!?;]", text)
+        tokens = TOKEN_PATTERN.findall(text)
         misspelled_words = self.spellchecker.unknown(tokens)
 
         for token in tokens:
             if token in misspelled_words:
-                corrected_text.append(self.spellchecker.correction(token))
+                # Words without any candidate are kept as they are.
+                corrected_text.append(self.spelling_engine.correction(token) or token)
             else:
                 corrected_text.append(token)
 
         return " ".join(corrected_text).replace(" ", " ")
 
+    def correct_spelling_column(self, column):
+        """
+        Correct the spelling of a whole column, looking up each distinct unknown word only once.
+
+        The rows are tokenized, the misspelled words are collected from the vocabulary of the
+        column and corrected by `self.spelling_corrector` (cached in memory and optionally on disk),
+        and the corrections are mapped back. The result is the same as `correct_spelling` per row.
+        """
+        tokenized = column.apply(TOKEN_PATTERN.findall)
+        vocabulary = set()
+        for tokens in tokenized:
+            vocabulary.update(tokens)
+        misspelled_words = [word for word in vocabulary if word in self.spellchecker.unknown([word])]
+        corrections = self.spelling_corrector.correct(misspelled_words)
+        return tokenized.apply(lambda tokens: " ".join(corrections.get(token) or token for token in tokens))
+
     def handle_emojis(self, text, strategy):
-        if not isinstance(text, str):
-            return text
-
-        emoji_sentiment_map = {
-            # Positive Emojis
-            "😊": "positive",
-            "😂": "positive",
-            "😄": "positive",
-            "😁": "positive",
-            "😎": "positive",
-            "😍": "positive",
-            "😘": "positive",
-            "😇": "positive",
-            "🥳": "positive",
-            "🤩": "positive",
-            "😌": "positive",
-            "👏": "positive",
-            "👍": "positive",
-            "💪": "positive",
-            "🌟": "positive",
-            "❤️": "positive",
-            "💕": "positive",
-            "🎉": "positive",
-
-            # Negative Emojis
-            "😢": "negative",
-            "😭": "negative",
-            "😔": "negative",
-            "😞": "negative",
-            "😡": "negative",
-            "😠": "negative",
-            "🤬": "negative",
-            "😩": "negative",
-            "😱": "negative",
-            "🙁": "negative",
-            "😣": "negative",
-            "💔": "negative",
-            "👎": "negative",
-            "😤": "negative",
-
-            # Neutral Emojis
-            "😐": "neutral",
-            "😑": "neutral",
-            "😶": "neutral",
-            "🙄": "neutral",
-            "🤔": "neutral",
-            "🤨": "neutral",
-            "😕": "neutral",
-            "🤝": "neutral",
-            "✋": "neutral",
-            "👌": "neutral",
-            "💬": "neutral",
-            "🤷": "neutral",
-            "🙃": "neutral",
-        }
-        def remove_emojis(text):
-            return ''.join(char for char in text if char not in emoji.EMOJI_DATA)
-
-        def replace_emojis(text):
-            return ''.join(char if char not in emoji.EMOJI_DATA else " EMOJI " for char in text)
-
-        def sentiment_emojis(text):
-            result = []
-            for char in text:
-                if char in emoji_sentiment_map:
-                    result.append(f" {emoji_sentiment_map[char]} ")
-                elif char not in emoji.EMOJI_DATA:
-                    result.append(char)
-            return ''.join(result)
-        emoji_strategies = {
-            "remove": remove_emojis,
-            "replace": replace_emojis,
-            "sentiment": sentiment_emojis,
-        }
-        result = emoji_strategies.get(strategy, lambda x: x)(text)
-        return result
+        return self.emoji_handler.handle(text, strategy)
 
     def remove_url_and_html(self, text):
+        return self.clean_extra_spaces(self.remove_url_and_html_patterns(text))
+
+    def remove_url_and_html_patterns(self, text):
         text = re.sub(r"http[s]?://\S+", "", text)  # Remove URLs
         text = re.sub(r"<.*?>", "", text)  # Remove HTML tags
-        return self.clean_extra_spaces(text)
+        return text
 
     def remove_elements(self, text):
+        return self.clean_extra_spaces(self.remove_element_patterns(text))
+
+    def remove_element_patterns(self, text):
         text = re.sub(r"@\w+", "", text)  # Remove mentions
         text = re.sub(r"#\w+", "", text)  # Remove hashtags
-        return self.clean_extra_spaces(text)
+        return text
 
     def clean_punctuation(self, text):
         return re.sub(r"[^\w\s]", "", text)
@@ -263,7 +333,10 @@ class EnglishTextPreprocessor:
         text =  re.sub(r'\s+', ' ', text).strip()
         return text
 
-    def apply_dictionaries(self, text, dictionaries):
+    def apply_dictionaries(self, text, dictionaries=None):
+        if dictionaries is None:
+            return self.dictionary_replacer.replace(text)
+
         for dictionary in dictionaries:
             for key, value in dictionary.items():
                 text = text.replace(key, value)
@@ -287,56 +360,242 @@ class EnglishTextPreprocessor:
         doc = self.nlp(" ".join(tokens))
         return [token.lemma_ for token in doc]
 
-    def process_column(self, column):
-        config = self.current_task_config
-
+    def lemmatize_column(self, column):
+        """
+        Lemmatize a whole column by streaming it through spaCy in batches.
+
+        With `lemmatize_mode="rule"` every pipeline component the lemmatizer does not depend on
+        (parser, NER, ...) is disabled, the rows are tagged in batches of `self.batch_size` on
+        `self.n_process` processes, and lemmas are looked up in `self.lemma_cache` by
+        (word, POS, morphology) before falling back to the spaCy lemmatizer. The result is the same
+        as calling `apply_lemmatization` on the split tokens of each row.
+
+        With `lemmatize_mode="lookup"` the rows are only tokenized and each word is mapped through
+        spaCy's lemma lookup table, without running the tagger.
+        """
+        texts = (" ".join(text.split()) for text in column)
+        if self.lemmatize_mode == "lookup":
+            lemmas = [
+                " ".join(self.lookup_lemma(token.text) for token in doc)
+                for doc in self.nlp.tokenizer.pipe(texts, batch_size=self.batch_size)
+            ]
+        else:
+            tagging_components = [name for name in LEMMATIZER_COMPONENTS if name != "lemmatizer"]
+            disabled = [name for name in self.nlp.pipe_names if name not in tagging_components]
+            docs = self.nlp.pipe(texts, batch_size=self.batch_size, n_process=self.n_process, disable=disabled)
+            lemmas = [" ".join(self.rule_lemma(token) for token in doc) for doc in docs]
+        return pd.Series(lemmas, index=column.index, name=column.name, dtype=object)
+
+    def rule_lemma(self, token):
+        lemmatizer = self.nlp.get_pipe("lemmatizer")
+        if token.lemma != 0 and not lemmatizer.overwrite:
+            # Already set by the attribute ruler, which the lemmatizer would not overwrite either.
+            return token.lemma_
+        key = (token.orth, token.pos, token.morph.key)
+        lemma = self.lemma_cache.get(key)
+        if lemma is None:
+            lemma = lemmatizer.lemmatize(token)[0]
+            self.lemma_cache.put(key, lemma)
+        return lemma
+
+    def lookup_lemma(self, word):
+        lemma = self.lemma_cache.get(word)
+        if lemma is None:
+            if self.lemma_lookup_table is None:
+                try:
+                    from spacy.lookups import load_lookups
+                    self.lemma_lookup_table = load_lookups("en", ["lemma_lookup"]).get_table("lemma_lookup")
+                except ValueError as e:
+                    raise ValueError(
+                        "lemmatize_mode='lookup' needs spaCy's lookup tables: pip install spacy-lookups-data"
+                    ) from e
+            lemma = self.lemma_lookup_table.get(word, word)
+            self.lemma_cache.put(word, lemma)
+        return lemma
+
+    def build_stages(self, config=None, optimize=True):
+        """
+        Build the ordered list of stages enabled by a task configuration.
+
+        Stages that end by collapsing whitespace are split into their own work and a
+        "<stage>_spaces" stage, and each stage declares the normal forms it preserves and
+        commutes with. With `optimize`, `plan_stages` then drops the passes that cannot change the
+        result, e.g. the whitespace cleanup of remove_url_html that remove_elements redoes.
+        """
+        if config is None:
+            config = self.current_task_config
+
+        # Whitespace is neither created from nor turned into other characters by lowercasing and
+        # Unicode normalization, and the patterns of these stages do not contain whitespace.
+        spacing = (SINGLE_SPACES,)
+
+        def spaces_stage(name="clean_extra_spaces"):
+            return Stage(name, self.clean_extra_spaces, keeps_filters=("only_numbers", "brackets"),
+                         normal_form=SINGLE_SPACES, preserves=(LOWERCASE,), commutes_with=(LOWERCASE,))
+
+        stages = []
         if config["lowercase"]:
-            column = column.apply(self.to_lower_case)
+            stages.append(Stage("lowercase", self.to_lower_case, normal_form=LOWERCASE, preserves=spacing,
+                                commutes_with=spacing))
 
         if config["remove_url_html"]:
-            column = column.apply(self.remove_url_and_html)
+            # "." does not match a newline, so HTML tags spanning lines depend on the spacing.
+            stages.append(Stage("remove_url_html", self.remove_url_and_html_patterns, preserves=(LOWERCASE,)))
+            stages.append(spaces_stage("remove_url_html_spaces"))
 
         if config["apply_normalization"]:
-            column = column.apply(self.normalize_unicode)
+            stages.append(Stage("apply_normalization", self.normalize_unicode, commutes_with=spacing))
 
         if config["remove_elements"]:
-            column = column.apply(self.remove_elements)
+            stages.append(Stage("remove_elements", self.remove_element_patterns, preserves=(LOWERCASE,),
+                                commutes_with=spacing))
+            stages.append(spaces_stage("remove_elements_spaces"))
 
         handle_emojis_strategy = config.get("handle_emojis")
         if handle_emojis_strategy:
-            column = column.apply(lambda x: self.handle_emojis(x, handle_emojis_strategy))
+            # Emoji contain no whitespace; only the "replace" strategy inserts capitals.
+            stages.append(Stage("handle_emojis", partial(self.handle_emojis, strategy=handle_emojis_strategy),
+                                preserves=() if handle_emojis_strategy == "replace" else (LOWERCASE,),
+                                commutes_with=spacing, key=f"handle_emojis:{handle_emojis_strategy}"))
 
         if config["apply_dictionary_replacements"]:
-            dictionaries = [
-                    self.contractions_dict,
-                    self.english_dict,
-                    # self.sign_dict_en,
-                    self.special_char_dict
-            ]
-            column = column.apply(lambda x: self.apply_dictionaries(x, dictionaries))
+            stages.append(Stage("apply_dictionary_replacements", self.apply_dictionaries,
+                                preserves=(LOWERCASE,) if self.dictionary_replacer.keeps_lowercase() else (),
+                                commutes_with=spacing if self.dictionary_replacer.ignores_spacing() else ()))
 
         if config["clean_punctuation"]:
-            column = column.apply(self.clean_punctuation)
+            stages.append(Stage("clean_punctuation", self.clean_punctuation, preserves=(LOWERCASE,),
+                                commutes_with=spacing))
 
         if config["remove_accents"]:
-            column = column.apply(self.remove_accents)
+            stages.append(Stage("remove_accents", self.remove_accents, commutes_with=spacing))
 
+        # `keeps_filters` lists the row filters a stage cannot make a matching row escape, so the
+        # rows they match can skip the stages from spelling on (see run_stages_with_pushdown).
+        # pyspellchecker never reports a number as unknown, so numbers are left as they are.
+        # The following stages tokenize the text first, so its spacing does not matter to them.
         if config["correct_spelling"]:
-            column = column.apply(self.correct_spelling)
+            stages.append(Stage("correct_spelling", self.correct_spelling_column, column_level=True,
+                                keeps_filters=("only_numbers",), commutes_with=spacing))
 
         if config["remove_stopwords"]:
-            column = column.apply(lambda x: " ".join(self.remove_stopwords(x.split())))
-
+            numeric_stopwords = any(word.isdigit() for word in self.stopwords)
+            stages.append(Stage("remove_stopwords", lambda x: " ".join(self.remove_stopwords(x.split())),
+                                keeps_filters=() if numeric_stopwords else ("only_numbers",),
+                                preserves=(LOWERCASE,), commutes_with=spacing))
+
+        # Stemming is implemented with spaCy lemmas as well, so both use the batched column stage.
+        # The rule lemmatizer keeps numbers as they are; the lookup table is not checked.
+        lemma_filters = ("only_numbers",) if self.lemmatize_mode == "rule" else ()
         if config.get("apply_stemming", False):
-            column = column.apply(lambda x: " ".join(self.apply_stemming(x.split())))
+            stages.append(Stage("apply_stemming", self.lemmatize_column, column_level=True,
+                                keeps_filters=lemma_filters, commutes_with=spacing))
 
         if config["apply_lemmatization"]:
-            column = column.apply(lambda x: " ".join(self.apply_lemmatization(x.split())))
+            stages.append(Stage("apply_lemmatization", self.lemmatize_column, column_level=True,
+                                keeps_filters=lemma_filters, commutes_with=spacing))
 
         if config["clean_extra_spaces"]:
-            column = column.apply(self.clean_extra_spaces)
-
-        if config["lowercase"] and self.current_task_config != self.task_config["ner"]:
-            column = column.apply(self.to_lower_case)
-
-        return column
+            stages.append(spaces_stage())
+
+        if config["lowercase"] and config != self.task_config["ner"]:
+            stages.append(Stage("final_lowercase", self.to_lower_case, keeps_filters=("only_numbers", "brackets"),
+                                normal_form=LOWERCASE, preserves=spacing, commutes_with=spacing))
+
+        return plan_stages(stages) if optimize else stages
+
+    def cache_namespace(self):
+        """
+        Version of the cleaned text for the text cache: the task configuration and options, the
+        dictionaries, the spaCy pipeline and the spelling dictionary.
+        """
+        if self.text_cache_namespace is None:
+            config = self.current_task_config
+            # Only the resources the task uses are part of the version, and only they are loaded.
+            model = None
+            if self.uses_spacy(config):
+                import spacy
+                model = [spacy.__version__, self.nlp.meta.get("name"), self.nlp.meta.get("version")]
+            self.text_cache_namespace = cache_namespace(
+                type(self).__name__, self.task, config, self.lemmatize_mode,
+                self.contractions_word_boundary,
+                [dictionary_items(dictionary) for dictionary in (
+                    self.contractions_dict, self.english_dict, self.special_char_dict)],
+                sorted(self.stopwords) if config["remove_stopwords"] else None,
+                model,
+                dictionary_version(self.spelling_engine) if config["correct_spelling"] else None,
+            )
+        return self.text_cache_namespace
+
+    def stage_cache_namespace(self):
+        """
+        Version of what every stage depends on, for the stage cache: the options and dictionaries.
+        The task configuration is not part of it, since the keys of the stage cache cover the
+        configuration prefix up to each stage.
+        """
+        return cache_namespace(
+            type(self).__name__, self.contractions_word_boundary,
+            [dictionary_items(dictionary) for dictionary in (
+                self.contractions_dict, self.english_dict, self.special_char_dict)],
+        )
+
+    def stage_version(self, stage):
+        """
+        Version of the resources a stage depends on besides those of `stage_cache_namespace`, for
+        the keys of the stage cache. Only the resources of the stages that need them are loaded.
+        """
+        if stage.name == "remove_stopwords":
+            return sorted(self.stopwords)
+        if stage.name in ("apply_stemming", "apply_lemmatization"):
+            import spacy
+            return [self.lemmatize_mode, spacy.__version__, self.nlp.meta.get("name"), self.nlp.meta.get("version")]
+        if stage.name == "correct_spelling":
+            return dictionary_version(self.spelling_engine)
+        return None
+
+    def process_column(self, column, fused=True, profiler=None, row_filters=()):
+        """
+        Clean a column with the stages of the task.
+
+        Args:
+            row_filters (list): RowFilter objects the caller applies to the cleaned column. The rows
+                they will drop may skip the costly stages and come back partially cleaned, as
+                PrefilteredText; pass none to get every row fully cleaned.
+        """
+        def run(texts):
+            if self.stage_cache is not None:
+                # The stage outputs are cached fully cleaned, so row filters are not pushed down.
+                return self.stage_cache.run(texts, self.build_stages(), self.stage_cache_namespace(),
+                                            self.stage_version, profiler=profiler)
+            return run_stages_with_pushdown(texts, self.build_stages(), row_filters, fused=fused,
+                                            profiler=profiler, stats=self.pushdown_stats)
+
+        def clean(texts):
+            if self.text_cache is not None:
+                # A profiler only sees the texts missing from the cache.
+                return self.text_cache.map(texts, self.cache_namespace(), run)
+            return run(texts)
+
+        # A repetitive column is cleaned through its distinct values, see run_on_unique_values.
+        return run_on_unique_values(column, clean, self.min_duplicate_ratio, self.unique_stats)
+
+    def process_tasks(self, column, tasks, fused=True):
+        """
+        Clean a column with the stages of several tasks at once.
+
+        The stages the pipelines of the tasks start with in common run once, and the column only
+        branches where their configurations diverge (see run_stage_tree). The text cache and row
+        filters are not used here, since both are specific to a single task.
+
+        Args:
+            tasks (list): Names of tasks of `task_config`.
+
+        Returns:
+            dict: The cleaned column of every task.
+        """
+        pipelines = {task: self.build_stages(self.task_config.get(task, self.task_config["default"])) for task in tasks}
+
+        def clean(texts):
+            return run_stage_tree(texts, pipelines, fused=fused, stats=self.tree_stats)
+
+        return run_on_unique_values(column, clean, self.min_duplicate_ratio, self.unique_stats)
@@ -1,61 +1,207 @@
 import os
 import pandas as pd
-import re
 import argparse
+import tempfile
 from persian_text_preprocessor import PersianTextPreprocessor
+from checkpoint import Checkpoint, input_identity
+from dedup import FingerprintSet, drop_duplicate_rows
 from english_text_preprocessor import EnglishTextPreprocessor
+from near_dedup import NearDuplicateFilter
+from output_writers import OUTPUT_FORMATS, is_resumable, open_writers
+from parallel import ParallelProcessor
+from profiling import StageProfiler, format_profile, save_profile
+from row_filters import filter_rows, task_filters
+from text_pipeline import MIN_DUPLICATE_RATIO
 
 output_directory = "DataSource"
 
 
-def remove_rows_with_only_signs(df, column_name):
+def task_processor_classes(task, column=None):
     """
-    Remove rows where the specified column contains only signs or symbols.
+    Return the preprocessor class cleaning each input column of a task, keyed by the column.
     """
-    signs_and_symbols = r'^[^\w\u0600-\u06FF]+$'
-    mask = df[column_name].apply(lambda x: bool(re.match(signs_and_symbols, str(x))) if isinstance(x, str) else False)
-    return df[~mask]
+    if task == "translation":
+        return {'English': EnglishTextPreprocessor, 'Persian': PersianTextPreprocessor}
+    if task in ['ner', 'sentiment']:
+        return {column: PersianTextPreprocessor}
+    return {column: EnglishTextPreprocessor}
+
+
+def build_processors(task, column=None, english_options=None, persian_options=None, workers=1):
+    """
+    Create the preprocessors a task needs, keyed by the input column they clean.
+
+    `english_options` and `persian_options` are extra keyword arguments for EnglishTextPreprocessor
+    and PersianTextPreprocessor (e.g. the spelling cache path or the Persian spelling lexicon).
+    With `workers` > 1 every preprocessor runs in its own pool of worker processes.
+    """
+    def build(processor_class):
+        options = english_options if processor_class is EnglishTextPreprocessor else persian_options
+        options = dict(options or {}, task=task)
+        if workers > 1:
+            return ParallelProcessor(processor_class, workers=workers, **options)
+        return processor_class(**options)
+
+    return {name: build(processor_class) for name, processor_class in task_processor_classes(task, column).items()}
+
+
+def clean_task_columns(df, tasks, column=None, english_options=None, persian_options=None):
+    """
+    Clean the input columns of several tasks at once.
+
+    The tasks cleaning the same column with the same preprocessor share one preprocessor, whose
+    `process_tasks` runs the stages their pipelines have in common once and only branches where
+    their configurations diverge.
+
+    Returns:
+        tuple: The cleaned columns of every task (a dictionary of Series keyed by the input column,
+        for the `cleaned` argument of `process_text_data`), and the preprocessors keyed by
+        "<column> (<task>, ...)" for the statistics.
+    """
+    groups = {}
+    for task in tasks:
+        for name, processor_class in task_processor_classes(task, column).items():
+            if name not in df.columns:
+                raise ValueError(f"The specified column '{name}' is not in the dataset.")
+            groups.setdefault((name, processor_class), []).append(task)
+
+    cleaned = {task: {} for task in tasks}
+    processors = {}
+    for (name, processor_class), group in groups.items():
+        options = english_options if processor_class is EnglishTextPreprocessor else persian_options
+        processor = processor_class(**dict(options or {}, task=group[0]))
+        for task, result in processor.process_tasks(df[name], group).items():
+            cleaned[task][name] = result
+        processors[f"{name} ({', '.join(group)})"] = processor
+    return cleaned, processors
+
+
+def close_processors(processors):
+    for processor in processors.values():
+        if isinstance(processor, ParallelProcessor):
+            processor.close()
+        elif processor.text_cache is not None:
+            processor.text_cache.close()
+
+
+def print_unique_stats(processors):
+    """
+    Print the share of duplicate rows of each cleaned column and the time saved by cleaning only
+    its distinct values. Nothing is printed for a ParallelProcessor, whose workers keep the counters.
+    """
+    for column, processor in processors.items():
+        if isinstance(processor, ParallelProcessor) or not processor.unique_stats["rows"]:
+            continue
+        stats = processor.unique_stats
+        print(f"Distinct values ({column}): {stats['unique_rows']} of {stats['rows']} rows "
+              f"({1 - stats['unique_rows'] / stats['rows']:.1%} duplicates), cleaned in {stats['seconds']:.2f}s, "
+              f"about {stats['seconds_saved']:.2f}s saved")
+
+
+def print_pushdown_stats(processors):
+    """
+    Print the rows of each cleaned column that skipped the costly stages because a row filter
+    drops them anyway. Worker processes keep their own counters, so nothing is printed for a
+    ParallelProcessor.
+    """
+    for column, processor in processors.items():
+        if isinstance(processor, ParallelProcessor) or not processor.pushdown_stats["skipped"]:
+            continue
+        stats = processor.pushdown_stats
+        filters = ", ".join(f"{name}: {count}" for name, count in stats["filters"].items())
+        print(f"Filter pushdown ({column}): {stats['skipped']} of {stats['rows']} rows skipped "
+              f"{', '.join(stats['stages'])} ({filters})")
 
 
-def remove_rows_with_only_numbers(df, column_name):
+def print_tree_stats(processors):
     """
-    Remove rows where the specified column contains only numbers.
+    Print the stage runs each preprocessor shared between the tasks of a multi-task run.
     """
-    numbers_pattern = r'^\d+$'  # Matches cells that contain only digits
-    mask = df[column_name].apply(lambda x: bool(re.match(numbers_pattern, str(x))) if isinstance(x, str) else False)
-    return df[~mask]
+    for column, processor in processors.items():
+        stats = processor.tree_stats
+        if not stats["stage_runs_saved"]:
+            continue
+        print(f"Shared stages ({column}): {stats['stage_runs']} stage runs instead of "
+              f"{stats['stage_runs'] + stats['stage_runs_saved']}")
 
 
-def delete_records_with_brackets(df, column_name):
+def print_text_cache_stats(processors):
     """
-    Remove rows where the specified column contains text within brackets.
+    Print the hit rate of the text cache of each preprocessor. Worker processes keep their own
+    counters, so nothing is printed for a ParallelProcessor.
     """
-    pattern = re.compile(r'\[.*?\]')
-    return df[~df[column_name].str.contains(pattern, na=False)]
+    for column, processor in processors.items():
+        if isinstance(processor, ParallelProcessor) or processor.text_cache is None:
+            continue
+        info = processor.text_cache.info()
+        print(f"Text cache ({column}): {info['hit_rate']:.1%} hit rate, {info['memory_hits']} memory hits, "
+              f"{info['disk_hits']} disk hits, {info['computed']} texts cleaned")
 
 
-def process_text_data(df, task, column=None):
+def print_stage_cache_stats(processors):
+    """
+    Print the stages each preprocessor loaded from the stage cache instead of running them. Worker
+    processes keep their own counters, so nothing is printed for a ParallelProcessor.
+    """
+    for column, processor in processors.items():
+        if isinstance(processor, ParallelProcessor) or processor.stage_cache is None:
+            continue
+        info = processor.stage_cache.info()
+        print(f"Stage cache ({column}): {info['stages_reused']} stage runs reused, {info['stages_run']} run, "
+              f"{info['files_written']} files written")
+
+
+def drop_duplicates(df, subset, seen=None):
+    """
+    Drop duplicate rows. With a FingerprintSet `seen`, rows already seen in earlier calls (chunks
+    or input files) are dropped too.
+    """
+    if seen is None:
+        return df.drop_duplicates(subset=subset)
+    return drop_duplicate_rows(df, seen, subset=subset)
+
+
+def process_text_data(df, task, column=None, english_options=None, persian_options=None, processors=None,
+                      workers=1, seen=None, near_duplicates=None, filter_stats=None, profilers=None, cleaned=None):
     """
     Process text data for a specific task.
+
+    `processors` are the preprocessors returned by `build_processors`; pass them to reuse the loaded
+    models across calls (e.g. one call per chunk). Otherwise they are created from `english_options`
+    and `persian_options`. `seen` is an optional FingerprintSet deduplicating across calls, and
+    `near_duplicates` an optional NearDuplicateFilter dropping the rows similar to a row kept before.
+    The rows removed by each of the task's row filters are added up in the `filter_stats` dictionary.
+    With a `profilers` dictionary, the stages cleaning each column are profiled by a StageProfiler
+    stored in it under the column name. The row filters are passed to the preprocessors too, so
+    the rows they drop can skip the costly stages. The columns already cleaned for the task (see
+    `clean_task_columns`) can be passed as `cleaned`, keyed by the input column; they are then
+    only filtered and deduplicated.
     """
+    def profiler(name):
+        if profilers is None:
+            return None
+        return profilers.setdefault(name, StageProfiler())
+
+    def clean(name):
+        if cleaned is not None:
+            return cleaned[name]
+        return processors[name].process_column(df[name], profiler=profiler(name), row_filters=task_filters(task))
+
     if task == "translation":
         if not {'English', 'Persian'}.issubset(df.columns):
             raise ValueError("Translation task requires both 'English' and 'Persian' columns.")
-        persian_processor = PersianTextPreprocessor(task=task)
-        english_processor = EnglishTextPreprocessor(task=task)
+        if cleaned is None:
+            processors = processors or build_processors(task, column, english_options, persian_options, workers)
 
         # Process English and Persian columns
-        df['Cleaned_English'] = english_processor.process_column(df['English'])
-        df['Cleaned_Persian'] = persian_processor.process_text(df['Persian'])
+        df['Cleaned_English'] = clean('English')
+        df['Cleaned_Persian'] = clean('Persian')
 
         # Remove unwanted rows
-        df = remove_rows_with_only_numbers(df, 'Cleaned_English')
-        df = remove_rows_with_only_numbers(df, 'Cleaned_Persian')
-        df = delete_records_with_brackets(df, 'Cleaned_English')
-        df = delete_records_with_brackets(df, 'Cleaned_Persian')
-        df = remove_rows_with_only_signs(df, 'Cleaned_English')
-        df = remove_rows_with_only_signs(df, 'Cleaned_Persian')
-        df = df.drop_duplicates(subset=['Cleaned_English', 'Cleaned_Persian'])
+        df = filter_rows(df, ['Cleaned_English', 'Cleaned_Persian'], task_filters(task), filter_stats)
+        df = drop_duplicates(df, ['Cleaned_English', 'Cleaned_Persian'], seen)
+        if near_duplicates is not None:
+            df = near_duplicates.filter(df, subset=['Cleaned_English', 'Cleaned_Persian'])
 
         # Keep only cleaned columns
         df_final = df[['Cleaned_English', 'Cleaned_Persian']]
@@ -65,38 +211,262 @@ def process_text_data(df, task, column=None):
         if column not in df.columns:
             raise ValueError(f"The specified column '{column}' is not in the dataset.")
 
-        processor = PersianTextPreprocessor(task=task) if task in ['ner', 'sentiment'] else EnglishTextPreprocessor(
-            task=task)
-        df[f'Cleaned_{column}'] = processor.process_column(df[column])
+        if cleaned is None:
+            processors = processors or build_processors(task, column, english_options, persian_options, workers)
+        df[f'Cleaned_{column}'] = clean(column)
 
-        df = remove_rows_with_only_numbers(df, f'Cleaned_{column}')
-        df = delete_records_with_brackets(df, f'Cleaned_{column}')
-        df = remove_rows_with_only_signs(df, f'Cleaned_{column}')
-        df = df.drop_duplicates(subset=[f'Cleaned_{column}'])
+        df = filter_rows(df, [f'Cleaned_{column}'], task_filters(task), filter_stats)
+        df = drop_duplicates(df, [f'Cleaned_{column}'], seen)
+        if near_duplicates is not None:
+            df = near_duplicates.filter(df, subset=[f'Cleaned_{column}'])
 
         df_final = df[[f'Cleaned_{column}']]
         df_final.columns = [column]
         return df_final
 
 
-def save_cleaned_data(df, save_path):
+def save_cleaned_data(df, save_path, output_formats=("csv",), compression="snappy"):
     """
-    Save the cleaned data to a specified file path. Creates the directory if it doesn't exist.
+    Save the cleaned data to a specified file path (without extension) in each of the output
+    formats (csv, parquet, jsonl, arrow, xlsx). Creates the directory if it doesn't exist.
     """
     try:
-        # Extract directory from save_path and create it if it doesn't exist
-        output_dir = os.path.dirname(save_path)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        for writer in open_writers(save_path, output_formats, compression):
+            with writer:
+                writer.write(df)
+            print(f"Cleaned data saved to {writer.path} ({len(df)} rows)")
+    except Exception as e:
+        print(f"Error saving data: {e}")
+
+
+def open_fingerprint_set(state_directory=None, memory_limit=256 * 2 ** 20, bits=64, spill_directory=None):
+    """
+    Load the FingerprintSet saved in `state_directory`, or create an empty one.
+    """
+    if state_directory and os.path.exists(os.path.join(state_directory, "fingerprints.json")):
+        seen = FingerprintSet.load(state_directory, memory_limit=memory_limit)
+        if seen.bits != bits:
+            raise ValueError(f"The deduplication state in {state_directory} uses {seen.bits}-bit fingerprints.")
+        return seen
+    return FingerprintSet(bits=bits, memory_limit=memory_limit, spill_directory=state_directory or spill_directory)
 
-        # Save the data in both Excel and CSV formats
-        df.to_excel(f'{save_path}.xlsx', index=False)
-        df.to_csv(f'{save_path}.csv', index=False, encoding='utf-8')
 
-        print(df)
-        print(f"Cleaned data saved to {save_path}")
+def open_near_duplicate_filter(threshold, num_perm=128, shingle_type="char", state_directory=None,
+                               memory_limit=256 * 2 ** 20, spill_directory=None):
+    """
+    Load the NearDuplicateFilter saved in `state_directory`, or create an empty one.
+    """
+    if state_directory and os.path.exists(os.path.join(state_directory, "minhash.json")):
+        near_duplicates = NearDuplicateFilter.load(state_directory, memory_limit=memory_limit)
+        if (near_duplicates.threshold, near_duplicates.num_perm, near_duplicates.shingle_type) != (
+                threshold, num_perm, shingle_type):
+            raise ValueError(f"The near-duplicate state in {state_directory} was built with other MinHash settings.")
+        return near_duplicates
+    keys = FingerprintSet(memory_limit=memory_limit, spill_directory=state_directory or spill_directory)
+    return NearDuplicateFilter(threshold=threshold, num_perm=num_perm, shingle_type=shingle_type, keys=keys)
+
+
+def print_filter_stats(filter_stats):
+    """
+    Print the number of rows removed by each row filter.
+    """
+    if not filter_stats:
+        return
+    print("Rows removed by filter:")
+    for key, removed in filter_stats.items():
+        print(f"  {key}: {removed}")
+
+
+def open_checkpoint(args, save_path, english_options, persian_options):
+    """
+    Create the Checkpoint of a chunked run from the command line arguments, and return it with the
+    progress to resume from (None for a fresh run, whose stale checkpoint is removed). Runs
+    writing Parquet, Arrow or Excel files are not checkpointed, since those files cannot be
+    continued once interrupted.
+    """
+    if not all(is_resumable(output_format) for output_format in args.output_format):
+        if args.resume:
+            raise ValueError("--resume only supports csv and jsonl outputs.")
+        return None, None
+    config = {
+        "task": args.task,
+        "column": args.column,
+        "input": input_identity(args.input),
+        "chunksize": args.chunksize,
+        "output_format": args.output_format,
+        "english_options": english_options,
+        "persian_options": persian_options,
+        "dedup_state": args.dedup_state,
+        "fingerprint_bits": args.fingerprint_bits,
+        "near_dedup": [args.near_dedup_threshold, args.minhash_permutations, args.shingle_type],
+    }
+    checkpoint = Checkpoint(args.checkpoint_dir or f"{save_path}_checkpoint", config)
+    progress = checkpoint.load() if args.resume else None
+    if progress is None:
+        if args.resume:
+            print(f"No checkpoint found in {checkpoint.directory}; starting from the first chunk.")
+        checkpoint.reset()
+    return checkpoint, progress
+
+
+def process_in_chunks(input_path, task, save_path, chunksize, column=None, english_options=None,
+                      persian_options=None, workers=1, seen=None, near_duplicates=None, filter_stats=None,
+                      output_formats=("csv",), compression="snappy", checkpoint=None, progress=None,
+                      profilers=None):
+    """
+    Stream the input CSV in chunks of `chunksize` rows: clean and filter each chunk and append it
+    to the output file of each format in `output_formats`, so memory does not grow with the size
+    of the input.
+
+    Rows are deduplicated across chunks as well, through the fingerprints of the cleaned rows in
+    `seen` (a FingerprintSet; by default a 64-bit one spilling to a temporary directory), so only
+    the first occurrence of a row is kept, like `drop_duplicates` on the whole dataset. A
+    NearDuplicateFilter `near_duplicates` also drops the rows similar to a row of an earlier chunk.
+
+    With a Checkpoint, the progress is recorded durably after every chunk. Passing the `progress`
+    it returned by `Checkpoint.load` (and `seen` and `near_duplicates` restored from its state
+    directories) resumes an interrupted run: the finished chunks are skipped and the outputs are
+    continued, giving the same files as an uninterrupted run.
+    """
+    if checkpoint is not None and not all(is_resumable(output_format) for output_format in output_formats):
+        raise ValueError("Only csv and jsonl outputs can be checkpointed.")
+    spill_directory = None
+    if seen is None:
+        if checkpoint is not None:
+            seen_directory = checkpoint.state_directory("seen")
+            seen = FingerprintSet.load(seen_directory) if progress else FingerprintSet(spill_directory=seen_directory)
+        else:
+            spill_directory = tempfile.TemporaryDirectory()
+            seen = FingerprintSet(spill_directory=spill_directory.name)
+    if filter_stats is None:
+        filter_stats = {}
+
+    progress = progress or {}
+    chunks_done = progress.get("chunks", 0)
+    rows_read = progress.get("rows_read", 0)
+    rows_written = progress.get("rows_written", 0)
+    filter_stats.update(progress.get("filter_stats", {}))
+    writers = open_writers(save_path, output_formats, compression)
+    for output_format, writer in zip(output_formats, writers):
+        if output_format in progress.get("outputs", {}):
+            writer.resume(progress["outputs"][output_format], rows_written)
+    if chunks_done:
+        print(f"Resuming after chunk {chunks_done - 1}: {rows_read} rows read, {rows_written} rows written")
+
+    processors = build_processors(task, column, english_options, persian_options, workers)
+    try:
+        for chunk_index, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+            if chunk_index < chunks_done:
+                continue
+            rows_read += len(chunk)
+            cleaned = process_text_data(chunk, task, column=column, processors=processors, seen=seen,
+                                        near_duplicates=near_duplicates, filter_stats=filter_stats,
+                                        profilers=profilers)
+            for writer in writers:
+                writer.write(cleaned)
+            rows_written += len(cleaned)
+            if checkpoint is not None:
+                # Outputs and deduplication state first: the manifest must only describe work on disk.
+                outputs = {output_format: writer.sync() for output_format, writer in zip(output_formats, writers)}
+                seen.checkpoint(checkpoint.state_directory("seen"))
+                if near_duplicates is not None:
+                    near_duplicates.checkpoint(checkpoint.state_directory("near_duplicates"))
+                checkpoint.save(chunks=chunk_index + 1, rows_read=rows_read, rows_written=rows_written,
+                                outputs=outputs, filter_stats=filter_stats)
+            print(f"Chunk {chunk_index}: {rows_read} rows read, {rows_written} rows written")
+    finally:
+        # Parquet and Arrow files are only readable once their footer is written.
+        for writer in writers:
+            writer.close()
+    print_unique_stats(processors)
+    print_pushdown_stats(processors)
+    print_text_cache_stats(processors)
+    print_stage_cache_stats(processors)
+    close_processors(processors)
+    if spill_directory is not None:
+        spill_directory.cleanup()
+
+    for writer in writers:
+        print(f"Cleaned data saved to {writer.path}")
+
+
+def preprocessor_options(args):
+    """
+    Return the keyword arguments of EnglishTextPreprocessor and PersianTextPreprocessor given by the
+    command line arguments.
+    """
+    english_options = {
+        "spelling_cache_path": args.spelling_cache,
+        "spelling_workers": args.spelling_workers,
+        "spelling_backend": args.spelling_backend,
+        "symspell_index_path": args.symspell_index,
+    }
+    persian_options = {"spell_lexicon": args.persian_lexicon}
+    min_duplicate_ratio = args.min_duplicate_ratio if args.min_duplicate_ratio >= 0 else None
+    english_options["min_duplicate_ratio"] = min_duplicate_ratio
+    persian_options["min_duplicate_ratio"] = min_duplicate_ratio
+    if args.text_cache:
+        text_cache_options = {
+            "text_cache_path": args.text_cache,
+            "text_cache_size": args.text_cache_memory,
+            "text_cache_max_entries": args.text_cache_max_entries,
+        }
+        english_options.update(text_cache_options)
+        persian_options.update(text_cache_options)
+    if args.stage_cache:
+        english_options["stage_cache_path"] = args.stage_cache
+        persian_options["stage_cache_path"] = args.stage_cache
+    return english_options, persian_options
+
+
+def process_several_tasks(args, tasks):
+    """
+    Run several tasks over the whole input file at once, writing one output per task
+    (cleaned_data_<task>). The stages the tasks share are computed once, see `clean_task_columns`.
+    """
+    for option, unsupported in [("--chunksize", args.chunksize), ("--resume", args.resume),
+                                ("--workers", args.workers > 1), ("--dedup_state", args.dedup_state),
+                                ("--profile", args.profile), ("--text_cache", args.text_cache),
+                                ("--stage_cache", args.stage_cache)]:
+        if unsupported:
+            print(f"Error: {option} is not supported with several tasks.")
+            return
+    english_options, persian_options = preprocessor_options(args)
+
+    try:
+        df = pd.read_csv(args.input)
     except Exception as e:
-        print(f"Error saving data: {e}")
+        print(f"Error loading input file: {e}")
+        return
+
+    print("Loaded data:")
+    print(df)
+
+    with tempfile.TemporaryDirectory() as spill_directory:
+        try:
+            cleaned, processors = clean_task_columns(df, tasks, args.column, english_options, persian_options)
+            print_unique_stats(processors)
+            print_tree_stats(processors)
+            close_processors(processors)
+            for task in tasks:
+                near_duplicates = None
+                if args.near_dedup_threshold is not None:
+                    near_duplicates = open_near_duplicate_filter(
+                        args.near_dedup_threshold, args.minhash_permutations, args.shingle_type,
+                        memory_limit=args.dedup_memory_mb * 2 ** 20,
+                        spill_directory=os.path.join(spill_directory, f"near_duplicates_{task}"))
+                filter_stats = {}
+                # A shallow copy, so that the cleaned columns of a task are not added to the input.
+                cleaned_df = process_text_data(df.copy(deep=False), task, column=args.column,
+                                               near_duplicates=near_duplicates, filter_stats=filter_stats,
+                                               cleaned=cleaned[task])
+                print(f"Task {task}:")
+                print_filter_stats(filter_stats)
+                save_cleaned_data(cleaned_df, os.path.join(args.output, f"cleaned_data_{task}"), args.output_format,
+                                  args.compression)
+        except Exception as e:
+            print(f"Error during processing: {e}")
+            return
 
 
 def main():
@@ -104,32 +474,169 @@ def main():
     Main function to process data based on a specific task.
     """
     parser = argparse.ArgumentParser(description="Process translation tasks.")
-    parser.add_argument("--task", type=str, required=True,
+    parser.add_argument("--task", type=str, nargs="+", required=True,
                         choices=["default", "translation", "sentiment", "ner", "topic_modeling", "spam_detection",
                                  "summarization"],
-                        help="Task configuration to use for processing.")
+                        help="Task configuration(s) to use for processing. With several tasks, the stages their "
+                             "configurations share run once and one output is written per task.")
     parser.add_argument("--input", type=str, required=True, help="Path to the input CSV file.")
     parser.add_argument("--column", type=str,
                         help="Column name to process (if task doesn't require both English and Persian).")
     parser.add_argument("--output", type=str, default=output_directory, help="Directory to save the cleaned data.")
+    parser.add_argument("--output_format", "--output-format", type=str, nargs="+", default=["csv"],
+                        choices=OUTPUT_FORMATS,
+                        help="Output file format(s): csv (default), parquet, jsonl, arrow or xlsx. Parquet and "
+                             "Arrow need pyarrow.")
+    parser.add_argument("--compression", type=str, default="snappy",
+                        choices=["snappy", "zstd", "gzip", "brotli", "lz4", "none"],
+                        help="Compression codec of the Parquet output.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the input in chunks of this many rows and append each one to the output files.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted --chunksize run from its last checkpoint.")
+    parser.add_argument("--checkpoint_dir", type=str, default=None,
+                        help="Directory of the checkpoint of a --chunksize run (default: next to the output).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes running the preprocessors (default: 1, no pool).")
+    parser.add_argument("--dedup_state", type=str, default=None,
+                        help="Directory keeping the fingerprints of the rows written so far, to deduplicate "
+                             "across runs over several input files.")
+    parser.add_argument("--dedup_memory_mb", type=int, default=256,
+                        help="Memory for deduplication fingerprints before they are spilled to disk.")
+    parser.add_argument("--fingerprint_bits", type=int, default=64, choices=[64, 128],
+                        help="Size of the row fingerprints used for deduplication.")
+    parser.add_argument("--near_dedup_threshold", type=float, default=None,
+                        help="Also drop rows whose estimated Jaccard similarity to a kept row exceeds this "
+                             "threshold (MinHash LSH; e.g. 0.8). Disabled by default.")
+    parser.add_argument("--minhash_permutations", type=int, default=128,
+                        help="Number of MinHash permutations for near-duplicate detection.")
+    parser.add_argument("--shingle_type", type=str, default="char", choices=["char", "word"],
+                        help="Shingles compared by near-duplicate detection: 5-character or single-word.")
+    parser.add_argument("--spelling_cache", type=str, default=None,
+                        help="Path of a sqlite file caching English spelling corrections between runs.")
+    parser.add_argument("--spelling_workers", type=int, default=1,
+                        help="Number of worker processes for English spelling correction.")
+    parser.add_argument("--spelling_backend", type=str, default="pyspellchecker", choices=["pyspellchecker", "symspell"],
+                        help="Engine proposing English spelling corrections.")
+    parser.add_argument("--symspell_index", type=str, default=None,
+                        help="Path where the SymSpell index is saved and loaded from.")
+    parser.add_argument("--persian_lexicon", type=str, default=None,
+                        help="Word frequency CSV (Word, Frequency) enabling the Persian spelling stage.")
+    parser.add_argument("--min_duplicate_ratio", type=float, default=MIN_DUPLICATE_RATIO,
+                        help="Clean only the distinct values of a column whose share of duplicate rows is at least "
+                             f"this (default {MIN_DUPLICATE_RATIO}); a negative value disables it.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every preprocessing stage (time, rows changed, characters, slowest rows); "
+                             "prints a summary table and writes a JSON report.")
+    parser.add_argument("--profile_output", type=str, default=None,
+                        help="Path of the JSON profile report (default: cleaned_data_<task>_profile.json next to "
+                             "the output).")
+    parser.add_argument("--text_cache", type=str, default=None,
+                        help="Path of a sqlite file caching the cleaned text of every row between runs, so rows "
+                             "seen before are not cleaned again.")
+    parser.add_argument("--text_cache_memory", type=int, default=100000,
+                        help="Entries of the in-memory tier in front of the text cache file.")
+    parser.add_argument("--text_cache_max_entries", type=int, default=None,
+                        help="Maximum entries of the text cache file; the least recently used are evicted.")
+    parser.add_argument("--stage_cache", type=str, default=None,
+                        help="Directory caching the cleaned column after every stage (Parquet, needs pyarrow), so "
+                             "a rerun with a changed task configuration resumes from the deepest stage it shares.")
     args = parser.parse_args()
+    tasks = list(dict.fromkeys(args.task))
+    if len(tasks) > 1:
+        process_several_tasks(args, tasks)
+        return
+    args.task = tasks[0]
 
-    try:
-        df = pd.read_csv(args.input)
-    except Exception as e:
-        print(f"Error loading input file: {e}")
+    english_options, persian_options = preprocessor_options(args)
+    cleaned_file_path = os.path.join(args.output, f"cleaned_data_{args.task}")
+
+    checkpoint, progress = None, None
+    if args.chunksize:
+        try:
+            checkpoint, progress = open_checkpoint(args, cleaned_file_path, english_options, persian_options)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+    elif args.resume:
+        print("Error: --resume requires --chunksize.")
+        return
+    if args.profile and args.workers > 1:
+        print("Error: --profile requires --workers 1.")
         return
+    profilers = {} if args.profile else None
+    memory_limit = args.dedup_memory_mb * 2 ** 20
 
-    print("Loaded data:")
-    print(df)
+    with tempfile.TemporaryDirectory() as spill_directory:
+        # Fingerprints of the rows written so far: needed to deduplicate across chunks, and across
+        # input files when --dedup_state is given. A resumed run restores them from its checkpoint.
+        seen = None
+        if progress:
+            seen = FingerprintSet.load(checkpoint.state_directory("seen"), memory_limit=memory_limit)
+        elif args.chunksize or args.dedup_state:
+            seen = open_fingerprint_set(args.dedup_state, memory_limit, args.fingerprint_bits,
+                                        checkpoint.state_directory("seen") if checkpoint else spill_directory)
+        near_duplicates = None
+        if args.near_dedup_threshold is not None:
+            near_state = os.path.join(args.dedup_state, "near_duplicates") if args.dedup_state else None
+            near_spill_directory = (checkpoint.state_directory("near_duplicates") if checkpoint
+                                    else os.path.join(spill_directory, "near_duplicates"))
+            if progress:
+                near_duplicates = NearDuplicateFilter.load(near_spill_directory, memory_limit=memory_limit)
+            else:
+                near_duplicates = open_near_duplicate_filter(args.near_dedup_threshold, args.minhash_permutations,
+                                                             args.shingle_type, near_state, memory_limit,
+                                                             near_spill_directory)
 
-    try:
-        cleaned_df = process_text_data(df, args.task, column=args.column)
-        cleaned_file_path = os.path.join(args.output, f"cleaned_data_{args.task}")
-        save_cleaned_data(cleaned_df, cleaned_file_path)
-    except Exception as e:
-        print(f"Error during processing: {e}")
+        filter_stats = {}
+        if args.chunksize:
+            try:
+                process_in_chunks(args.input, args.task, cleaned_file_path, args.chunksize, column=args.column,
+                                  english_options=english_options, persian_options=persian_options,
+                                  workers=args.workers, seen=seen, near_duplicates=near_duplicates,
+                                  filter_stats=filter_stats, output_formats=args.output_format,
+                                  compression=args.compression, checkpoint=checkpoint, progress=progress,
+                                  profilers=profilers)
+            except Exception as e:
+                print(f"Error during processing: {e}")
+                return
+        else:
+            try:
+                df = pd.read_csv(args.input)
+            except Exception as e:
+                print(f"Error loading input file: {e}")
+                return
+
+            print("Loaded data:")
+            print(df)
+
+            try:
+                processors = build_processors(args.task, args.column, english_options, persian_options, args.workers)
+                cleaned_df = process_text_data(df, args.task, column=args.column, processors=processors, seen=seen,
+                                               near_duplicates=near_duplicates, filter_stats=filter_stats,
+                                               profilers=profilers)
+                print_unique_stats(processors)
+                print_pushdown_stats(processors)
+                print_text_cache_stats(processors)
+                print_stage_cache_stats(processors)
+                close_processors(processors)
+                save_cleaned_data(cleaned_df, cleaned_file_path, args.output_format, args.compression)
+            except Exception as e:
+                print(f"Error during processing: {e}")
+                return
+        print_filter_stats(filter_stats)
+        if profilers:
+            profile_path = args.profile_output or f"{cleaned_file_path}_profile.json"
+            print(format_profile(profilers))
+            save_profile(profilers, profile_path)
+            print(f"Profile report saved to {profile_path}")
 
+        if args.dedup_state:
+            seen.save(args.dedup_state)
+            if near_duplicates is not None:
+                near_duplicates.save(near_state)
+        if checkpoint is not None:
+            checkpoint.reset()
 
 if __name__ == "__main__":
     main()
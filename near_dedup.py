@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from checkpoint import write_json_atomic
+from dedup import FingerprintSet
+
+HASH_SHIFT = np.uint64(32)
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+
+def normalize_for_shingles(text):
+    """
+    Lowercase a text and reduce every run of punctuation, symbols and whitespace to one space, so
+    that punctuation and spacing variants of a sentence have the same shingles.
+    """
+    if not isinstance(text, str):
+        return ""
+    return NON_WORD_PATTERN.sub(" ", text.lower()).strip()
+
+
+def shingles(text, shingle_type="char", size=5):
+    """
+    Return the set of shingles of a normalized text: its substrings of `size` characters, or its
+    runs of `size` consecutive words. A text shorter than one shingle is its own single shingle.
+    """
+    if shingle_type == "word":
+        words = text.split()
+        if len(words) <= size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def optimal_bands(threshold, num_perm, false_positive_weight=0.5):
+    """
+    Choose the LSH banding (bands, rows per band) for a Jaccard similarity threshold.
+
+    Two texts with similarity s share at least one band with probability 1 - (1 - s^rows)^bands.
+    The banding minimizes the weighted probability mass of false positives (pairs below the
+    threshold that collide) and false negatives (pairs above it that do not).
+
+    Returns:
+        tuple: (bands, rows) with bands * rows <= num_perm.
+    """
+    similarities = np.linspace(0, 1, 1001)
+    step = similarities[1]
+    below = similarities <= threshold
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            collide = 1 - (1 - similarities ** rows) ** bands
+            false_positive = collide[below].sum() * step
+            false_negative = (1 - collide[~below]).sum() * step
+            error = false_positive_weight * false_positive + (1 - false_positive_weight) * false_negative
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def _mix64(values):
+    # splitmix64 finalizer: spreads the bits of the combined band values over the whole key.
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class NearDuplicateFilter:
+    """
+    Streaming near-duplicate removal with MinHash signatures and locality-sensitive hashing.
+
+    The columns of a row are normalized and cut into shingles (the shingles of each column are
+    hashed apart, so a pair is only similar when both sides are). A MinHash signature of
+    `num_perm` values estimates the Jaccard similarity of the shingle sets, and is split into
+    bands: rows sharing a band are near-duplicates. Only the band keys of the rows that were kept
+    are stored, as 64-bit fingerprints in a FingerprintSet, so each row is compared against the
+    kept rows in constant time and the state can spill to disk like the exact deduplication.
+    The first row of every cluster is kept.
+
+    Args:
+        threshold (float): Jaccard similarity above which rows are likely to be dropped.
+        num_perm (int): Number of MinHash permutations.
+        shingle_type (str): "char" or "word" shingles.
+        shingle_size (int): Characters (default 5) or words (default 1) per shingle.
+        seed (int): Seed of the permutations; signatures are only comparable with the same seed.
+        keys (FingerprintSet): Band keys of the rows kept so far; by default an empty in-memory set.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, shingle_type="char", shingle_size=None, seed=1, keys=None):
+        if shingle_type not in ("char", "word"):
+            raise ValueError("shingle_type must be 'char' or 'word'.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_type = shingle_type
+        self.shingle_size = shingle_size or (5 if shingle_type == "char" else 1)
+        self.seed = seed
+        self.bands, self.rows_per_band = optimal_bands(threshold, num_perm)
+        generator = np.random.RandomState(seed)
+        # Multiply-shift hashing: (a * x + b) >> 32 with an odd 64-bit `a` is a universal family
+        # and needs no modulo, which is the bulk of the signature cost.
+        self.a = generator.randint(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = generator.randint(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2)
+        self.keys = keys if keys is not None else FingerprintSet(bits=64)
+
+    def signatures(self, df):
+        """
+        Compute the MinHash signatures of the rows of a DataFrame (or Series).
+
+        Returns:
+            np.ndarray: uint32 array of shape (rows, num_perm).
+        """
+        if isinstance(df, pd.Series):
+            df = df.to_frame()
+        hashes = []
+        starts = []
+        for row in df.itertuples(index=False, name=None):
+            starts.append(len(hashes))
+            for column_index, value in enumerate(row):
+                text = normalize_for_shingles(value)
+                hashes.extend(
+                    zlib.crc32(shingle.encode("utf-8"), column_index)
+                    for shingle in shingles(text, self.shingle_type, self.shingle_size)
+                )
+        signatures = np.empty((len(starts), self.num_perm), dtype=np.uint32)
+        if not starts:
+            return signatures
+        hashes = np.array(hashes, dtype=np.uint64)
+        starts = np.array(starts, dtype=np.int64)
+        # One permutation at a time over the shingles of all rows; reduceat takes the minimum of
+        # each row's segment.
+        for permutation in range(self.num_perm):
+            permuted = (self.a[permutation] * hashes + self.b[permutation]) >> HASH_SHIFT
+            signatures[:, permutation] = np.minimum.reduceat(permuted, starts)
+        return signatures
+
+    def band_keys(self, signatures):
+        """
+        Hash every band of the signatures into a 64-bit key that also identifies the band.
+
+        Returns:
+            np.ndarray: uint64 array of shape (rows, bands).
+        """
+        bands = signatures[:, :self.bands * self.rows_per_band].reshape(-1, self.bands, self.rows_per_band)
+        keys = np.broadcast_to(_mix64(np.arange(1, self.bands + 1, dtype=np.uint64)), bands.shape[:2]).copy()
+        for position in range(self.rows_per_band):
+            keys = _mix64(keys ^ bands[:, :, position].astype(np.uint64))
+        # 0 marks an empty slot of the FingerprintSet.
+        keys[keys == 0] = 1
+        return keys
+
+    def filter(self, df, subset=None):
+        """
+        Drop the rows of `df` that are near-duplicates of a row kept earlier, in this call or a
+        previous one, and remember the band keys of the rows that are kept.
+        """
+        rows = df if subset is None else df[subset]
+        keys = self.band_keys(self.signatures(rows))
+        kept = ~self.keys.contains(keys.reshape(-1)).reshape(keys.shape).any(axis=1)
+
+        # Within the DataFrame, a row is dropped if it shares a band with an earlier kept row.
+        kept_keys = set()
+        for index, row_keys in enumerate(keys.tolist()):
+            if not kept[index]:
+                continue
+            if kept_keys.isdisjoint(row_keys):
+                kept_keys.update(row_keys)
+            else:
+                kept[index] = False
+        self.keys.add(keys[kept].reshape(-1))
+        return df[kept]
+
+    def save(self, directory):
+        """
+        Persist the parameters and the band keys to `directory`.
+        """
+        self.keys.save(directory)
+        self._save_parameters(directory)
+
+    def checkpoint(self, directory):
+        """
+        Record the parameters and the band keys durably without emptying the in-memory keys (see
+        `FingerprintSet.checkpoint`).
+        """
+        self.keys.checkpoint(directory)
+        self._save_parameters(directory)
+
+    def _save_parameters(self, directory):
+        parameters = {
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "shingle_type": self.shingle_type,
+            "shingle_size": self.shingle_size,
+            "seed": self.seed,
+        }
+        write_json_atomic(os.path.join(directory, "minhash.json"), parameters)
+
+    @classmethod
+    def load(cls, directory, memory_limit=256 * 2 ** 20):
+        with open(os.path.join(directory, "minhash.json"), encoding="utf-8") as f:
+            parameters = json.load(f)
+        return cls(keys=FingerprintSet.load(directory, memory_limit=memory_limit), **parameters)
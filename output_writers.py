@@ -0,0 +1,294 @@
+import os
+from openpyxl import Workbook
+from checkpoint import fsync_file
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+OUTPUT_FORMATS = ["csv", "parquet", "jsonl", "arrow", "xlsx"]
+# Rows of an Excel worksheet, header included.
+EXCEL_MAX_ROWS = 1048576
+EXCEL_BATCH_ROWS = 10000
+FILE_EXTENSIONS = {"csv": "csv", "parquet": "parquet", "jsonl": "jsonl", "arrow": "arrow", "xlsx": "xlsx"}
+
+
+def _require_pyarrow(output_format):
+    if pa is None:
+        raise ImportError(f"The {output_format} output format requires pyarrow (pip install pyarrow).")
+
+
+def _arrow_schema(df):
+    # A column that is empty or all missing in the first chunk would be typed as null; the cleaned
+    # columns hold text, so type it as string for the chunks that follow.
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    return pa.schema([
+        pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field for field in schema
+    ])
+
+
+class OutputWriter:
+    """
+    Write DataFrames one after the other to a single output file.
+
+    The file is created by the first `write`; every later call appends to it, so a chunked run
+    writes its output incrementally. Use it as a context manager or call `close` at the end.
+
+    Args:
+        path (str): Path of the output file.
+    """
+
+    # Whether `sync` and `resume` are supported, i.e. a partly written file can be continued.
+    resumable = False
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, df):
+        self._write(df)
+        self.started = True
+        self.rows += len(df)
+
+    def _write(self, df):
+        raise NotImplementedError
+
+    def sync(self):
+        """
+        Flush the file to disk and return its size in bytes.
+        """
+        raise ValueError(f"The {type(self).__name__} output cannot be checkpointed.")
+
+    def resume(self, size, rows):
+        """
+        Continue a file written by an earlier run: drop whatever follows its first `size` bytes
+        (the part of an interrupted chunk) and append after them.
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < size:
+            raise ValueError(f"{self.path} is shorter than its checkpoint; it cannot be resumed.")
+        os.truncate(self.path, size)
+        self.rows = rows
+        self.started = size > 0
+
+    def close(self):
+        pass
+
+
+class CsvWriter(OutputWriter):
+    resumable = True
+
+    def _write(self, df):
+        df.to_csv(self.path, mode="a" if self.started else "w", header=not self.started, index=False,
+                  encoding="utf-8")
+
+    def sync(self):
+        if not os.path.exists(self.path):
+            return 0
+        fsync_file(self.path)
+        return os.path.getsize(self.path)
+
+
+class JsonlWriter(OutputWriter):
+    """
+    One JSON object per row, with non-ASCII text written as is.
+    """
+
+    resumable = True
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.file = None
+
+    def _write(self, df):
+        if self.file is None:
+            self.file = open(self.path, "a" if self.started else "w", encoding="utf-8")
+        if len(df):
+            self.file.write(df.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n")
+
+    def sync(self):
+        if self.file is None:
+            return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.path.getsize(self.path)
+
+    def close(self):
+        if self.file is None and not self.started:
+            self.file = open(self.path, "w", encoding="utf-8")
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ParquetWriter(OutputWriter):
+    """
+    Every written DataFrame becomes one or more row groups of the Parquet file.
+
+    Args:
+        compression (str): Parquet codec ("snappy", "zstd", "gzip", "brotli", "lz4" or "none").
+    """
+
+    def __init__(self, path, compression="snappy"):
+        _require_pyarrow("parquet")
+        super().__init__(path)
+        self.compression = compression
+        self.writer = None
+        self.schema = None
+
+    def _write(self, df):
+        if self.writer is None:
+            self.schema = _arrow_schema(df)
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class ArrowWriter(OutputWriter):
+    """
+    Arrow IPC file format (Feather v2), one record batch per written DataFrame.
+    """
+
+    def __init__(self, path):
+        _require_pyarrow("arrow")
+        super().__init__(path)
+        self.sink = None
+        self.writer = None
+        self.schema = None
+
+    def _write(self, df):
+        if self.writer is None:
+            self.schema = _arrow_schema(df)
+            self.sink = pa.OSFile(self.path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+        self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            self.writer = None
+
+
+class ExcelWriter(OutputWriter):
+    """
+    Stream rows to an Excel workbook with openpyxl's write-only mode, so memory does not grow with
+    the number of rows. A sheet holds at most `max_rows` rows including its header; the following
+    rows go to a new sheet ("Sheet2", "Sheet3", ...) that repeats the header.
+
+    Args:
+        max_rows (int): Rows per sheet, by default the Excel limit of 1,048,576.
+    """
+
+    def __init__(self, path, max_rows=EXCEL_MAX_ROWS):
+        super().__init__(path)
+        self.max_rows = max_rows
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_rows = 0
+        self.header = None
+
+    def _new_sheet(self):
+        self.sheet = self.workbook.create_sheet(f"Sheet{len(self.workbook.worksheets) + 1}")
+        self.sheet.append(self.header)
+        self.sheet_rows = 1
+
+    def _write(self, df):
+        if self.header is None:
+            self.header = [str(column) for column in df.columns]
+        # Converted in slices so that large DataFrames are not copied as a whole; missing values
+        # become empty cells, as with DataFrame.to_excel.
+        for start in range(0, len(df), EXCEL_BATCH_ROWS):
+            batch = df.iloc[start:start + EXCEL_BATCH_ROWS]
+            for row in batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None):
+                if self.sheet is None or self.sheet_rows >= self.max_rows:
+                    self._new_sheet()
+                self.sheet.append(row)
+                self.sheet_rows += 1
+
+    def close(self):
+        if self.workbook is None:
+            return
+        if self.sheet is None and self.header is not None:
+            self._new_sheet()
+        if self.sheet is not None:
+            self.workbook.save(self.path)
+        self.workbook = None
+
+
+def write_excel(df, path, max_rows=EXCEL_MAX_ROWS):
+    """
+    Write a DataFrame to an Excel file with ExcelWriter, splitting it into several sheets if needed.
+    """
+    with ExcelWriter(path, max_rows=max_rows) as writer:
+        writer.write(df)
+
+
+WRITER_CLASSES = {
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+    "jsonl": JsonlWriter,
+    "arrow": ArrowWriter,
+    "xlsx": ExcelWriter,
+}
+
+
+def check_output_format(output_format):
+    """
+    Raise an error if `output_format` is unknown or its optional dependency is not installed.
+    """
+    if output_format not in FILE_EXTENSIONS:
+        raise ValueError(f"Unsupported output format '{output_format}'. Use one of {', '.join(OUTPUT_FORMATS)}.")
+    if output_format in ("parquet", "arrow"):
+        _require_pyarrow(output_format)
+
+
+def open_writer(save_path, output_format="csv", compression="snappy"):
+    """
+    Create the writer of an output format.
+
+    Args:
+        save_path (str): Output path without extension; the extension of the format is added.
+        output_format (str): One of OUTPUT_FORMATS.
+        compression (str): Codec of the Parquet output.
+
+    Returns:
+        OutputWriter: A writer whose `path` is the file being written.
+    """
+    check_output_format(output_format)
+    output_dir = os.path.dirname(save_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    path = f"{save_path}.{FILE_EXTENSIONS[output_format]}"
+    if output_format == "parquet":
+        return ParquetWriter(path, compression=None if compression == "none" else compression)
+    return WRITER_CLASSES[output_format](path)
+
+
+def is_resumable(output_format):
+    """
+    Whether a file of this format can be checkpointed and continued by a later run.
+    """
+    return WRITER_CLASSES[output_format].resumable
+
+
+def open_writers(save_path, output_formats=("csv",), compression="snappy"):
+    """
+    Create one writer per output format, after checking that every format can be written.
+    """
+    for output_format in output_formats:
+        check_output_format(output_format)
+    return [open_writer(save_path, output_format, compression) for output_format in output_formats]
@@ -0,0 +1,66 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+_worker_processor = None
+
+
+def _init_worker(processor_class, options):
+    # Runs once in every worker process: the models (spaCy, SpellChecker, parsivar) are loaded here
+    # and reused for every chunk the worker receives.
+    global _worker_processor
+    _worker_processor = processor_class(**options)
+
+
+def _process_chunk(chunk, row_filters=()):
+    return _worker_processor.process_column(chunk, row_filters=row_filters)
+
+
+class ParallelProcessor:
+    """
+    Run a preprocessor over a column in a pool of worker processes.
+
+    Every worker builds its own `processor_class(**options)` once, when the pool starts. A column
+    is split into contiguous chunks, the chunks are processed by the workers, and the results are
+    concatenated in their original order, so the output is the same as
+    `processor_class(**options).process_column(column)`.
+
+    Args:
+        processor_class (type): EnglishTextPreprocessor or PersianTextPreprocessor.
+        workers (int): Number of worker processes.
+        chunksize (int): Rows per chunk. By default the column is split into 4 chunks per worker.
+        **options: Keyword arguments of the preprocessor (task, ...).
+    """
+
+    def __init__(self, processor_class, workers, chunksize=None, **options):
+        self.processor_class = processor_class
+        self.workers = workers
+        self.chunksize = chunksize
+        self.options = options
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def process_column(self, column, profiler=None, row_filters=()):
+        if profiler is not None:
+            raise ValueError("Stages can only be profiled in the main process; run with a single worker.")
+        if isinstance(column, list):
+            column = pd.Series(column)
+        chunksize = self.chunksize or max(1, math.ceil(len(column) / (self.workers * 4)))
+        chunks = [column.iloc[start:start + chunksize] for start in range(0, len(column), chunksize)] or [column]
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                initargs=(self.processor_class, self.options))
+        # executor.map yields the results in the order of the chunks.
+        return pd.concat(list(self.executor.map(_process_chunk, chunks, [row_filters] * len(chunks))))
+
+    process_text = process_column
@@ -1,9 +1,8 @@
 import pandas as pd
-import emoji
 import unicodedata
 import re
 import jdatetime
-from parsivar import Normalizer, Tokenizer, FindStems
+from functools import partial
 from Dictionaries_Fa import (
     arabic_dict,
     num_dict,
@@ -12,6 +11,20 @@ from Dictionaries_Fa import (
     special_char_dict,
     month_dict
 )
+from dictionary_replacer import DictionaryReplacer
+from emoji_handler import EmojiHandler
+from spelling import SpellingCorrector, load_lexicon
+from stage_cache import StageCache
+from symspell import SymSpell
+from text_cache import TextCache, cache_namespace, dictionary_items
+from text_pipeline import (LOWERCASE, MIN_DUPLICATE_RATIO, SINGLE_SPACES, Stage, new_pushdown_stats, new_tree_stats,
+                           new_unique_stats, plan_stages, run_on_unique_values, run_stage_tree,
+                           run_stages_with_pushdown)
+
+SIGNS_AND_SYMBOLS_PATTERN = re.compile(r'([،؛؟٪…»«ـ!@#$%^&*()_+=\[\]{}|\\:;"\'<>,./؟])')
+# Tokens the spelling stage may correct: Persian/Arabic letters only, at least this long.
+PERSIAN_WORD_PATTERN = re.compile(r'[\u0600-\u06FF]+')
+SPELL_MIN_WORD_LENGTH = 3
 
 
 class ConvertPersianDate:
@@ -39,7 +52,9 @@ class ConvertPersianDate:
 
 
 class PersianTextPreprocessor:
-    def __init__(self, stopword_file=None, task="default"):
+    def __init__(self, stopword_file=None, task="default", spell_lexicon=None, spell_max_distance=1,
+                 spell_min_count=2, spell_cache_path=None, text_cache_path=None, text_cache_size=100000,
+                 text_cache_max_entries=None, min_duplicate_ratio=MIN_DUPLICATE_RATIO, stage_cache_path=None):
 
         self.arabic_dict = arabic_dict
         self.num_dict = num_dict
@@ -47,10 +62,30 @@ class PersianTextPreprocessor:
         self.sign_dict_fa_phase_two = sign_dict_fa_phase_two
         self.special_char_dict = special_char_dict
         self.month_dict = month_dict
+        self.emoji_handler = EmojiHandler("[EMOJI]", default_sentiment="positive")
+        # The ordered dictionaries are compiled once into single-pass replacers instead of one
+        # re.sub per key and per row.
+        self.alphabet_numbers_replacer = DictionaryReplacer([
+            self.sign_dict_fa_phase_one,
+            self.arabic_dict,
+            self.num_dict,
+            self.special_char_dict,
+        ])
+        self.signs_replacer = DictionaryReplacer([self.sign_dict_fa_phase_two])
         self.date_converter = ConvertPersianDate
-        self.normalizer = Normalizer(statistical_space_correction=True)
-        self.tokenizer = Tokenizer()
-        self.stemmer = FindStems()
+        # parsivar takes about a second to import; its tokenizer is only needed by the remove_stopwords
+        # stage, so it is loaded on first use, like the normalizer and stemmer (see the properties below).
+        self._normalizer = None
+        self._tokenizer = None
+        self._stemmer = None
+        # The check_spell stage needs a Persian frequency lexicon, e.g. the word counts of an already
+        # cleaned corpus (see WordCharacterCount.word_count). Without one the stage is skipped.
+        self.spell_engine = None
+        self.spelling_corrector = None
+        if spell_lexicon is not None:
+            self.spell_engine = SymSpell(max_distance=spell_max_distance)
+            self.spell_engine.add_words(load_lexicon(spell_lexicon, min_count=spell_min_count))
+            self.spelling_corrector = SpellingCorrector(self.spell_engine, cache_path=spell_cache_path)
         self.stopwords = set()
         if stopword_file:
             with open(stopword_file, "r", encoding="utf-8") as file:
@@ -220,7 +255,46 @@ class PersianTextPreprocessor:
             },
         }
 
+        self.task = task
         self.current_task_config = self.task_config.get(task, self.task_config["default"])
+        # Optional cache of cleaned rows shared between runs (sqlite at `text_cache_path`), see TextCache.
+        self.text_cache = None
+        self.text_cache_namespace = None
+        # Columns with at least this share of duplicate rows only clean their distinct values
+        # (None disables it); `unique_stats` counts the rows skipped and the time saved.
+        self.min_duplicate_ratio = min_duplicate_ratio
+        self.unique_stats = new_unique_stats()
+        # Rows that skipped the costly stages because a row filter drops them anyway.
+        self.pushdown_stats = new_pushdown_stats()
+        # Stage runs shared between the tasks of `process_tasks`.
+        self.tree_stats = new_tree_stats()
+        if text_cache_path is not None:
+            self.text_cache = TextCache(text_cache_path, memory_size=text_cache_size,
+                                        max_entries=text_cache_max_entries)
+        # Optional cache of the column after every stage (Parquet files in `stage_cache_path`), so a
+        # rerun with a changed configuration resumes from the deepest stage it shares, see StageCache.
+        self.stage_cache = StageCache(stage_cache_path) if stage_cache_path is not None else None
+
+    @property
+    def normalizer(self):
+        if self._normalizer is None:
+            from parsivar import Normalizer
+            self._normalizer = Normalizer(statistical_space_correction=True)
+        return self._normalizer
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from parsivar import Tokenizer
+            self._tokenizer = Tokenizer()
+        return self._tokenizer
+
+    @property
+    def stemmer(self):
+        if self._stemmer is None:
+            from parsivar import FindStems
+            self._stemmer = FindStems()
+        return self._stemmer
 
     def remove_stopwords(self, tokens):
         return [token for token in tokens if token not in self.stopwords]
@@ -271,19 +345,19 @@ class PersianTextPreprocessor:
         return text
 
     def remove_elements(self, text):
+        return self.clean_extra_spaces(self.remove_element_patterns(text)).lower()
+
+    def remove_element_patterns(self, text):
+        # None of the patterns contains whitespace, so the spaces are collapsed once afterwards.
         if isinstance(text, float):
             return ''
 
         text = re.sub(r'@\w+', '', text)  # Remove mentions
         text = re.sub(r'#\w+', '', text)  # Remove hashtags
         text = re.sub(r'@(\w+\.)*\w+', '', text)  # Remove mentions followed by a dot
-        text = re.sub(r'\s+', ' ', text)  # Remove multiple spaces
         text = re.sub(r'\b\d{1,3}(?:\.\d{1,3}){3}\b(?:\:\d+)?', '', text)  # Handle IP addresses with optional port numbers
-        text = text.replace('\n', ' ')  # Replace newline characters with a space
         text = re.sub(r'%[a-zA-Z]+', '', text) # Remove time-related patterns like %i:%m %p, %a, %b
         text = re.sub(r'&[a-z]+;', '', text) # Remove HTML or encoded characters
-        text = re.sub(r'\s+', ' ', text).strip() # Normalize spaces
-        text = text.lower()  # Convert all text to lowercase
         return text
 
     def handle_persian_punctuation(self, text):
@@ -292,21 +366,19 @@ class PersianTextPreprocessor:
         return text
 
     def clean_farsi_text_punctuation(self, text):
-        text = re.sub(r'\s+', ' ', text) # Replace multiple spaces with a single space
-        text = re.sub(r'\s+', ' ', text)  # Replace multiple spaces with a single space
+        return self.clean_extra_spaces(self.clean_punctuation_patterns(self.clean_extra_spaces(text)))
+
+    def clean_punctuation_patterns(self, text):
+        # The date pattern expects single spaces, so the spaces are collapsed before it.
         text = re.sub(r'\.(?=\S)', '. ', text)  # Ensure space after a period
         text = re.sub(r'\b\d{1,2} [A-Za-z]+ \d{4}\b', '', text)  # Remove dates (e.g., "1 July 1818")
-        text = re.sub(r'\s+', ' ', text)  # Replace multiple spaces with a single space
-        text = re.sub(r'\s+', ' ', text).strip()  # Final cleanup of extra spaces
         return text
 
     def remove_english_words(self, persian_text):
-        pattern = r'[a-zA-Z]'
-
-        cleaned_text = re.sub(pattern, '', persian_text)
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
+        return self.clean_extra_spaces(self.remove_english_letters(persian_text))
 
-        return cleaned_text
+    def remove_english_letters(self, text):
+        return re.sub(r'[a-zA-Z]', '', text)
 
     def remove_cyrillic(self, text):
         cyrillic_pattern = r'[\u0400-\u04FF\u0500-\u052F\u2DE0-\u2DFF\uA640-\uA69F]+'
@@ -314,19 +386,11 @@ class PersianTextPreprocessor:
         return cleaned_text
 
     def pre_process_alphabet_numbers(self, text):
-        text = text.lower()
-        dictionaries = [
-            self.sign_dict_fa_phase_one,
-            self.arabic_dict,
-            self.num_dict,
-            self.special_char_dict,
-        ]
-        for dictionary in dictionaries:
-            for key, value in dictionary.items():
-                text = re.sub(re.escape(key), value, text)
+        return self.replace_alphabet_numbers(text.lower())
 
-        signs_and_symbols = r'[،؛؟٪…»«ـ!@#$%^&*()_+=\[\]{}|\\:;"\'<>,./؟]'
-        text = re.sub(f'({signs_and_symbols})', r'\1 ', text) # Add space after each matched sign or symbol
+    def replace_alphabet_numbers(self, text):
+        text = self.alphabet_numbers_replacer.replace(text)
+        text = SIGNS_AND_SYMBOLS_PATTERN.sub(r'\1 ', text) # Add space after each matched sign or symbol
 
         return text
 
@@ -334,21 +398,16 @@ class PersianTextPreprocessor:
         return re.sub(r'\s+', ' ', text).strip()
 
     def pre_process_signs(self, text):
-        text = text.lower()
-        dictionaries = [
-            self.sign_dict_fa_phase_two,
-        ]
-        for dictionary in dictionaries:
-            for key, value in dictionary.items():
-                text = re.sub(re.escape(key), value, text)
-        return text
+        return self.signs_replacer.replace(text.lower())
 
     def remove_half_space(self, text):
-        pattern = r'(\u200C)(ای|دان|ها|می|تر|ترین)'
-        text = re.sub(pattern, r' \2', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = text.replace('\u200C', '')
-        return text
+        return self.remove_zero_width_non_joiners(self.clean_extra_spaces(self.separate_half_space_suffixes(text)))
+
+    def separate_half_space_suffixes(self, text):
+        return re.sub(r'(\u200C)(ای|دان|ها|می|تر|ترین)', r' \2', text)
+
+    def remove_zero_width_non_joiners(self, text):
+        return text.replace('\u200C', '')
 
     def remove_numbers_only_cells(self, text):
         stripped_text = re.sub(r'[\s,]+', '', text)
@@ -356,82 +415,245 @@ class PersianTextPreprocessor:
             return ''
         return text
 
-    def handle_emojis(self, text, strategy):
-        if not isinstance(text, str):
-            return text
+    def correct_spelling_column(self, column):
+        """
+        Correct the Persian words of a column that are missing from the spelling lexicon.
+
+        Each distinct unknown word is looked up once in the deletion index (and memoized across
+        calls); rows without a correction are returned unchanged.
+        """
+        vocabulary = set(" ".join(column).split())
+        unknown_words = [
+            word for word in vocabulary
+            if len(word) >= SPELL_MIN_WORD_LENGTH
+            and word not in self.spell_engine.words
+            and PERSIAN_WORD_PATTERN.fullmatch(word)
+        ]
+        corrections = {
+            word: correction
+            for word, correction in self.spelling_corrector.correct(unknown_words).items()
+            if correction
+        }
 
-        def remove_emojis(text):
-            return ''.join(char for char in text if char not in emoji.EMOJI_DATA)
+        if not corrections:
+            return column
 
-        def replace_emojis(text):
-            return ''.join(char if char not in emoji.EMOJI_DATA else "[EMOJI]" for char in text)
+        def correct_row(text):
+            tokens = text.split()
+            if corrections.keys().isdisjoint(tokens):
+                return text
+            return " ".join(corrections.get(token, token) for token in tokens)
 
-        def sentiment_emojis(text):
-            return ''.join(char if char not in emoji.EMOJI_DATA else " positive " for char in text)
+        return column.apply(correct_row)
 
-        emoji_strategies = {
-            "remove": remove_emojis,
-            "replace": replace_emojis,
-            "sentiment": sentiment_emojis,
-        }
-        result = emoji_strategies.get(strategy, lambda x: x)(text)
-        return result
+    def handle_emojis(self, text, strategy):
+        return self.emoji_handler.handle(text, strategy)
 
-    def process_text(self, column):
+    def build_stages(self, config=None, optimize=True):
+        """
+        Build the ordered list of stages enabled by a task configuration.
 
-        if isinstance(column, list):
-            column = pd.Series(column)
+        Stages that lowercase the text or collapse its whitespace on the way are split into their
+        own work and "<stage>_lowercase" / "<stage>_spaces" stages, and each stage declares the
+        normal forms it preserves and commutes with. With `optimize`, `plan_stages` then drops the
+        passes that cannot change the result, e.g. lowercasing text that is already lowercase.
+        """
+        if config is None:
+            config = self.current_task_config
+
+        lowercase = (LOWERCASE,)
+        # Stages whose patterns contain no whitespace: collapsing it before them changes nothing
+        # once it is collapsed again.
+        spacing = (SINGLE_SPACES,)
+
+        def spaces_stage(name="clean_extra_spaces"):
+            return Stage(name, self.clean_extra_spaces, keeps_filters=("only_numbers", "brackets"),
+                         normal_form=SINGLE_SPACES, preserves=lowercase, commutes_with=lowercase)
+
+        def lowercase_stage(name):
+            return Stage(name, self.to_lower_case, normal_form=LOWERCASE, preserves=spacing, commutes_with=spacing)
 
-        config = self.current_task_config
-        # print("Config:", self.current_task_config)
+        def replacer_stage(name, func, replacer):
+            return Stage(name, func, preserves=lowercase if replacer.keeps_lowercase() else (),
+                         commutes_with=spacing if replacer.ignores_spacing() else ())
 
-        column = column.apply(self.remove_cyrillic)
+        date_converter = self.date_converter()
+        stages = [Stage("remove_cyrillic", self.remove_cyrillic, preserves=lowercase, commutes_with=spacing)]
 
         if config["lowercase"]:
-            column = column.apply(self.to_lower_case)
+            stages.append(lowercase_stage("lowercase"))
 
         if config["remove_url_html"]:
-            column = column.apply(self.remove_url)
-            column = column.apply(self.remove_encoded_email_strings)
-            column = column.apply(self.remove_html_tags)
-            column = column.apply(self.remove_emails)
-
-        column = column.apply(lambda x: ConvertPersianDate().handle_persian_dates(x, convert_to_standard=True))
+            stages.append(Stage("remove_url", self.remove_url, preserves=lowercase, commutes_with=spacing))
+            # [^\x00-\x7F] also matches non-ASCII whitespace, which collapsing turns into spaces.
+            stages.append(Stage("remove_encoded_email_strings", self.remove_encoded_email_strings,
+                                preserves=lowercase))
+            stages.append(Stage("remove_html_tags", self.remove_html_tags, preserves=lowercase,
+                                commutes_with=spacing))
+            stages.append(Stage("remove_emails", self.remove_emails, preserves=lowercase))
+
+        stages.append(Stage("handle_persian_dates",
+                            partial(date_converter.handle_persian_dates, convert_to_standard=True),
+                            preserves=lowercase, commutes_with=spacing))
 
         if config["remove_elements"]:
-            column = column.apply(self.remove_elements)
+            stages.append(Stage("remove_elements", self.remove_element_patterns, preserves=lowercase,
+                                commutes_with=spacing))
+            stages.append(spaces_stage("remove_elements_spaces"))
+            stages.append(lowercase_stage("remove_elements_lowercase"))
         if config["apply_dictionary_replacements"]:
-            column = column.apply(self.pre_process_alphabet_numbers)
+            stages.append(lowercase_stage("apply_dictionary_replacements_lowercase"))
+            stages.append(replacer_stage("apply_dictionary_replacements", self.replace_alphabet_numbers,
+                                         self.alphabet_numbers_replacer))
         if config["apply_dictionary_replacements_signs"]:
-            column = column.apply(self.pre_process_signs)
+            stages.append(lowercase_stage("apply_dictionary_replacements_signs_lowercase"))
+            stages.append(replacer_stage("apply_dictionary_replacements_signs", self.signs_replacer.replace,
+                                         self.signs_replacer))
         if config['remove_english_words']:
-            column = column.apply(self.remove_english_words)
+            stages.append(Stage("remove_english_words", self.remove_english_letters, preserves=lowercase,
+                                commutes_with=spacing))
+            stages.append(spaces_stage("remove_english_words_spaces"))
         if config['handle_persian_punctuation']:
-            column = column.apply(self.handle_persian_punctuation)
+            stages.append(spaces_stage("handle_persian_punctuation"))
         if config["separate_cases"]:
-            column = column.apply(self.separate_cases)
+            stages.append(Stage("separate_cases", self.separate_cases, preserves=lowercase))
         if config["clean_punctuation"]:
-            column = column.apply(self.clean_farsi_text_punctuation)
+            stages.append(spaces_stage("clean_punctuation_spaces"))
+            stages.append(Stage("clean_punctuation", self.clean_punctuation_patterns, preserves=lowercase))
+            stages.append(spaces_stage("clean_punctuation_final_spaces"))
         if config["remove_numbers_only"]:
-            column = column.apply(self.remove_numbers_only_cells)
+            stages.append(Stage("remove_numbers_only", self.remove_numbers_only_cells,
+                                preserves=lowercase + spacing, commutes_with=spacing))
 
         handle_emojis_strategy = config.get("handle_emojis")
         if handle_emojis_strategy:
-            column = column.apply(lambda x: self.handle_emojis(x, handle_emojis_strategy))
+            # Emoji contain no whitespace; only the "replace" strategy inserts capitals.
+            stages.append(Stage("handle_emojis", partial(self.handle_emojis, strategy=handle_emojis_strategy),
+                                preserves=() if handle_emojis_strategy == "replace" else lowercase,
+                                commutes_with=spacing, key=f"handle_emojis:{handle_emojis_strategy}"))
 
         if config["normalize_text"]:
-            column = column.apply(self.pre_process_alphabet_numbers)
+            stages.append(lowercase_stage("normalize_text_lowercase"))
+            stages.append(replacer_stage("normalize_text", self.replace_alphabet_numbers,
+                                         self.alphabet_numbers_replacer))
         if config['remove_half_space']:
-            column = column.apply(self.remove_half_space)
+            stages.append(Stage("remove_half_space", self.separate_half_space_suffixes, preserves=lowercase,
+                                commutes_with=spacing))
+            stages.append(spaces_stage("remove_half_space_spaces"))
+            stages.append(Stage("remove_zero_width_non_joiners", self.remove_zero_width_non_joiners,
+                                preserves=lowercase, commutes_with=spacing))
         if config["remove_stopwords"]:
-            column = column.apply(lambda x: ' '.join(self.remove_stopwords(self.tokenizer.tokenize_words(x))))
+            # tokenize_words splits on whitespace, so the spacing of its input does not matter.
+            stages.append(Stage("remove_stopwords",
+                                lambda x: ' '.join(self.remove_stopwords(self.tokenizer.tokenize_words(x))),
+                                preserves=lowercase, commutes_with=spacing))
         # if config["apply_stemming"]:
-        #     column = column.apply(
-        #         lambda x: ' '.join(self.stemmer.convert_to_stem(token) for token in self.tokenizer.tokenize_words(x)))
-        # if config["apply_lemmatization"]:
-        #     column = column.apply(
-        #         lambda x: ' '.join(self.stemmer.convert_to_stem(token) for token in self.tokenizer.tokenize_words(x)))
+        #     stages.append(Stage("apply_stemming", lambda x: ' '.join(
+        #         self.stemmer.convert_to_stem(token) for token in self.tokenizer.tokenize_words(x))))
+        # Only Persian words are corrected, so signs and brackets survive the spelling stage and
+        # the rows the filters drop can skip it (see run_stages_with_pushdown).
+        if config["check_spell"] and self.spell_engine is not None:
+            stages.append(Stage("check_spell", self.correct_spelling_column, column_level=True,
+                                keeps_filters=("brackets", "only_signs"), commutes_with=spacing))
         if config["clean_extra_spaces"]:
-            column = column.apply(self.clean_extra_spaces)
+            stages.append(spaces_stage())
+
+        return plan_stages(stages) if optimize else stages
+
+    def cache_namespace(self):
+        """
+        Version of the cleaned text for the text cache: the task configuration, the dictionaries,
+        the stopwords and the spelling lexicon.
+        """
+        if self.text_cache_namespace is None:
+            self.text_cache_namespace = cache_namespace(
+                type(self).__name__, self.task, self.current_task_config,
+                [dictionary_items(dictionary) for dictionary in (
+                    self.sign_dict_fa_phase_one, self.arabic_dict, self.num_dict, self.special_char_dict,
+                    self.sign_dict_fa_phase_two)],
+                sorted(self.stopwords),
+                self.spell_engine.version if self.spell_engine is not None else None,
+            )
+        return self.text_cache_namespace
+
+    def stage_cache_namespace(self):
+        """
+        Version of what every stage depends on, for the stage cache: the dictionaries. The task
+        configuration is not part of it, since the keys of the stage cache cover the configuration
+        prefix up to each stage.
+        """
+        return cache_namespace(
+            type(self).__name__,
+            [dictionary_items(dictionary) for dictionary in (
+                self.sign_dict_fa_phase_one, self.arabic_dict, self.num_dict, self.special_char_dict,
+                self.sign_dict_fa_phase_two)],
+        )
+
+    def stage_version(self, stage):
+        """
+        Version of the resources a stage depends on besides those of `stage_cache_namespace`, for
+        the keys of the stage cache.
+        """
+        if stage.name == "remove_stopwords":
+            return sorted(self.stopwords)
+        if stage.name == "check_spell":
+            return self.spell_engine.version
+        return None
+
+    def process_text(self, column, fused=True, profiler=None, row_filters=()):
+        """
+        Clean a column with the stages of the task.
+
+        Args:
+            row_filters (list): RowFilter objects the caller applies to the cleaned column. The rows
+                they will drop may skip the spelling stage and come back partially cleaned, as
+                PrefilteredText; pass none to get every row fully cleaned.
+        """
+
+        if isinstance(column, list):
+            column = pd.Series(column)
+
+        def run(texts):
+            if self.stage_cache is not None:
+                # The stage outputs are cached fully cleaned, so row filters are not pushed down.
+                return self.stage_cache.run(texts, self.build_stages(), self.stage_cache_namespace(),
+                                            self.stage_version, profiler=profiler)
+            # The fused path runs every enabled stage on a row before moving to the next one,
+            # so the column is walked once instead of once per stage.
+            return run_stages_with_pushdown(texts, self.build_stages(), row_filters, fused=fused,
+                                            profiler=profiler, stats=self.pushdown_stats)
+
+        def clean(texts):
+            if self.text_cache is not None:
+                # A profiler only sees the texts missing from the cache.
+                return self.text_cache.map(texts, self.cache_namespace(), run)
+            return run(texts)
+
+        # A repetitive column is cleaned through its distinct values, see run_on_unique_values.
+        return run_on_unique_values(column, clean, self.min_duplicate_ratio, self.unique_stats)
+
+    def process_tasks(self, column, tasks, fused=True):
+        """
+        Clean a column with the stages of several tasks at once.
+
+        The stages the pipelines of the tasks start with in common run once, and the column only
+        branches where their configurations diverge (see run_stage_tree). The text cache and row
+        filters are not used here, since both are specific to a single task.
+
+        Args:
+            tasks (list): Names of tasks of `task_config`.
+
+        Returns:
+            dict: The cleaned column of every task.
+        """
+        if isinstance(column, list):
+            column = pd.Series(column)
+        pipelines = {task: self.build_stages(self.task_config.get(task, self.task_config["default"])) for task in tasks}
+
+        def clean(texts):
+            return run_stage_tree(texts, pipelines, fused=fused, stats=self.tree_stats)
+
+        return run_on_unique_values(column, clean, self.min_duplicate_ratio, self.unique_stats)
 
-        return column
+    # Same entry point name as EnglishTextPreprocessor, so callers can treat both alike.
+    process_column = process_text
@@ -0,0 +1,156 @@
+import heapq
+import json
+import time
+import numpy as np
+import pandas as pd
+
+# Upper bounds (seconds) of the per-row latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS = [1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1]
+LATENCY_LABELS = ["<1us", "<10us", "<100us", "<1ms", "<10ms", "<100ms", ">=100ms"]
+PREVIEW_CHARS = 80
+
+
+def _text_length(value):
+    return len(value) if isinstance(value, str) else 0
+
+
+def _json_value(value):
+    # Index labels are often numpy integers, which json cannot write.
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class StageStats:
+    """
+    Counters of one pipeline stage, added up over every column it ran on.
+    """
+
+    def __init__(self, name, column_level):
+        self.name = name
+        self.column_level = column_level
+        self.seconds = 0.0
+        self.rows = 0
+        self.changed = 0
+        self.chars_in = 0
+        self.chars_out = 0
+        self.histogram = [0] * len(LATENCY_LABELS)
+        # (seconds, row index, input preview) of the slowest rows, smallest first.
+        self.slowest = []
+
+    def report(self):
+        return {
+            "stage": self.name,
+            "column_level": self.column_level,
+            "seconds": self.seconds,
+            "rows": self.rows,
+            "rows_changed": self.changed,
+            "chars_in": self.chars_in,
+            "chars_out": self.chars_out,
+            # Column-level stages process the whole column at once, so they have no per-row latency.
+            "latency_histogram": None if self.column_level else dict(zip(LATENCY_LABELS, self.histogram)),
+            "slowest_rows": [
+                {"index": index, "seconds": seconds, "text": text}
+                for seconds, index, text in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+class StageProfiler:
+    """
+    Profile the stages of a pipeline, one stage at a time.
+
+    Passed to `run_stages` (or to `process_column` / `process_text` of a preprocessor), it runs
+    every stage on its own pass over the column and records its wall time, the rows it touched and
+    changed, the characters before and after it and, for row-level stages, the latency of every
+    row. Calls add up, e.g. over the chunks of a run. Without a profiler the pipeline runs as usual.
+
+    Args:
+        slowest (int): Number of slowest rows kept for each stage.
+    """
+
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        self.stages = {}
+
+    def run_stage(self, stage, column):
+        """
+        Run one Stage over a pandas Series and record its statistics.
+
+        Returns:
+            pd.Series: The output of the stage.
+        """
+        stats = self.stages.get(stage.name)
+        if stats is None:
+            stats = self.stages[stage.name] = StageStats(stage.name, stage.column_level)
+
+        if stage.column_level:
+            start = time.perf_counter()
+            output = stage.func(column)
+            stats.seconds += time.perf_counter() - start
+        else:
+            func = stage.func
+            clock = time.perf_counter
+            texts = column.tolist()
+            results = [None] * len(texts)
+            latencies = np.empty(len(texts))
+            start = clock()
+            for position, text in enumerate(texts):
+                row_start = clock()
+                results[position] = func(text)
+                latencies[position] = clock() - row_start
+            output = pd.Series(results, index=column.index, name=column.name, dtype=object)
+            stats.seconds += time.perf_counter() - start
+            for bucket, count in enumerate(np.bincount(np.searchsorted(LATENCY_BUCKETS, latencies, side="right"),
+                                                       minlength=len(LATENCY_LABELS))):
+                stats.histogram[bucket] += int(count)
+            for position in np.argsort(latencies)[::-1][:self.slowest]:
+                text = texts[position]
+                entry = (float(latencies[position]), _json_value(column.index[position]),
+                         text[:PREVIEW_CHARS] if isinstance(text, str) else None)
+                if len(stats.slowest) < self.slowest:
+                    heapq.heappush(stats.slowest, entry)
+                elif entry[0] > stats.slowest[0][0]:
+                    heapq.heapreplace(stats.slowest, entry)
+
+        before = column.tolist() if stage.column_level else texts
+        after = output.tolist()
+        stats.rows += len(before)
+        stats.changed += sum(1 for old, new in zip(before, after) if old is not new and old != new)
+        stats.chars_in += sum(map(_text_length, before))
+        stats.chars_out += sum(map(_text_length, after))
+        return output
+
+    def report(self):
+        return [stats.report() for stats in self.stages.values()]
+
+
+def profile_report(profilers):
+    """
+    Build the JSON report of several profiled pipelines.
+
+    Args:
+        profilers (dict): StageProfiler objects keyed by the column they profiled.
+    """
+    return {column: profiler.report() for column, profiler in profilers.items()}
+
+
+def save_profile(profilers, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile_report(profilers), f, ensure_ascii=False, indent=2)
+
+
+def format_profile(profilers):
+    """
+    Format the profiled stages as a table, slowest stage first within each column.
+    """
+    headers = ["column", "stage", "seconds", "share", "rows", "changed", "chars_in", "chars_out", "slowest_row_ms"]
+    rows = []
+    for column, profiler in profilers.items():
+        total = sum(stats.seconds for stats in profiler.stages.values()) or 1.0
+        for stats in sorted(profiler.stages.values(), key=lambda stats: stats.seconds, reverse=True):
+            slowest = f"{max(stats.slowest)[0] * 1000:.2f}" if stats.slowest else "-"
+            rows.append([column, stats.name, f"{stats.seconds:.3f}", f"{stats.seconds / total:.1%}", stats.rows,
+                         stats.changed, stats.chars_in, stats.chars_out, slowest])
+    widths = [max(len(str(value)) for value in [header] + [row[i] for row in rows]) for i, header in enumerate(headers)]
+    lines = ["  ".join(str(header).ljust(width) for header, width in zip(headers, widths))]
+    lines.extend("  ".join(str(value).ljust(width) for value, width in zip(row, widths)) for row in rows)
+    return "\n".join(lines)
@@ -0,0 +1,80 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+class RowFilter:
+    """
+    A named rule removing the rows whose text matches a regular expression.
+
+    Args:
+        name (str): Name of the filter, used in the drop statistics.
+        pattern (str): Regular expression, compiled once; a row is removed when it is found anywhere
+            in the text (anchor it with ^ and $ to match the whole text).
+    """
+
+    def __init__(self, name, pattern):
+        self.name = name
+        self.pattern = re.compile(pattern)
+
+    def __repr__(self):
+        return f"RowFilter({self.name!r})"
+
+    def mask(self, column):
+        """
+        Return a boolean array, True for the rows of `column` to remove. Missing and non-string
+        values never match.
+        """
+        if not pd.api.types.is_object_dtype(column) and not pd.api.types.is_string_dtype(column):
+            return np.zeros(len(column), dtype=bool)
+        return column.str.contains(self.pattern, na=False).to_numpy(dtype=bool)
+
+
+ROW_FILTERS = {
+    "only_numbers": RowFilter("only_numbers", r'^\d+$'),
+    "brackets": RowFilter("brackets", r'\[.*?\]'),
+    "only_signs": RowFilter("only_signs", r'^[^\w\u0600-\u06FF]+$'),
+}
+
+# Filters applied to the cleaned columns of each task, in order. A filter added to a task's list
+# runs in the same pass as the others.
+TASK_FILTERS = {
+    "default": ["only_numbers", "brackets", "only_signs"],
+    "translation": ["only_numbers", "brackets", "only_signs"],
+    "sentiment": ["only_numbers", "brackets", "only_signs"],
+    "ner": ["only_numbers", "brackets", "only_signs"],
+    "topic_modeling": ["only_numbers", "brackets", "only_signs"],
+    "spam_detection": ["only_numbers", "brackets", "only_signs"],
+    "summarization": ["only_numbers", "brackets", "only_signs"],
+}
+
+
+def task_filters(task):
+    return [ROW_FILTERS[name] for name in TASK_FILTERS[task]]
+
+
+def filter_rows(df, columns, filters, stats=None):
+    """
+    Remove the rows of `df` matched by any of `filters` in any of `columns`, building the result
+    only once.
+
+    Args:
+        df (pd.DataFrame): Rows to filter.
+        columns (list): Columns every filter is applied to.
+        filters (list): RowFilter objects.
+        stats (dict): Optional dictionary updated with the number of rows removed by each filter,
+            keyed by "<filter>:<column>". A row matched by several filters is counted once, for the
+            first filter and column in order, as if the filters ran one after the other.
+
+    Returns:
+        pd.DataFrame: The remaining rows.
+    """
+    keep = np.ones(len(df), dtype=bool)
+    for row_filter in filters:
+        for column in columns:
+            matched = row_filter.mask(df[column])
+            if stats is not None:
+                key = f"{row_filter.name}:{column}"
+                stats[key] = stats.get(key, 0) + int(np.count_nonzero(matched & keep))
+            keep &= ~matched
+    return df if keep.all() else df[keep]
@@ -0,0 +1,155 @@
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from spellchecker import __version__ as spellchecker_version
+
+# Tokens checked by the English spelling stage: words (with apostrophes) and sentence punctuation.
+TOKEN_PATTERN = re.compile(r"[\w']+|[.,!?;]")
+
+_worker_spellchecker = None
+
+
+def dictionary_version(spellchecker):
+    """
+    Identify the dictionary of a spelling engine, so cached corrections are only reused with the
+    engine, dictionary and edit distance that produced them.
+    """
+    if hasattr(spellchecker, "version"):
+        return spellchecker.version
+    word_frequency = spellchecker.word_frequency
+    return (
+        f"pyspellchecker-{spellchecker_version}"
+        f"-distance{spellchecker.distance}"
+        f"-{word_frequency.unique_words}-{word_frequency.total_words}"
+    )
+
+
+def load_lexicon(lexicon, min_count=1):
+    """
+    Load a word frequency lexicon.
+
+    Args:
+        lexicon (str or dict): Path to a CSV file with "Word" and "Frequency" columns, as written by
+            `WordCharacterCount.word_count`, or a dictionary mapping a word to its frequency.
+        min_count (int): Words seen fewer times are dropped; rare words of a corpus are often typos.
+
+    Returns:
+        dict: Mapping of a word to its frequency.
+    """
+    if isinstance(lexicon, str):
+        df = pd.read_csv(lexicon, usecols=["Word", "Frequency"], dtype={"Word": str}, keep_default_na=False)
+        lexicon = dict(zip(df["Word"], df["Frequency"]))
+    return {word: int(count) for word, count in lexicon.items() if word and count >= min_count}
+
+
+def _init_worker(spellchecker):
+    global _worker_spellchecker
+    _worker_spellchecker = spellchecker
+
+
+def _correct_chunk(words):
+    return [(word, _worker_spellchecker.correction(word)) for word in words]
+
+
+class CorrectionCache:
+    """
+    Persistent word -> correction cache stored in a sqlite database.
+
+    Args:
+        path (str): Path of the sqlite file; it is created if it does not exist.
+        version (str): Dictionary version the corrections belong to (see `dictionary_version`).
+            Entries written under another version are ignored.
+    """
+
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS corrections "
+            "(version TEXT, word TEXT, correction TEXT, PRIMARY KEY (version, word))"
+        )
+        self.connection.commit()
+
+    def get_many(self, words, batch_size=500):
+        """
+        Return a dictionary with the cached corrections of `words`. Words without a candidate are
+        cached with a correction of None.
+        """
+        words = list(words)
+        found = {}
+        for start in range(0, len(words), batch_size):
+            batch = words[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(
+                f"SELECT word, correction FROM corrections WHERE version = ? AND word IN ({placeholders})",
+                [self.version] + batch,
+            )
+            found.update(rows)
+        return found
+
+    def put_many(self, corrections):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO corrections (version, word, correction) VALUES (?, ?, ?)",
+            [(self.version, word, correction) for word, correction in corrections.items()],
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class SpellingCorrector:
+    """
+    Correct a vocabulary of misspelled words once, with an in-memory and optional on-disk cache.
+
+    Args:
+        spellchecker: The engine used for the corrections, a pyspellchecker SpellChecker or a
+            SymSpell index (anything with a `correction(word)` method).
+        workers (int): Number of worker processes for the words missing from the caches. Each
+            worker receives its own copy of the spellchecker; a SymSpell index saved to disk is
+            loaded from its file instead of being sent to the worker.
+        cache_path (str): Optional sqlite file keeping the corrections between runs.
+        chunksize (int): Number of words sent to a worker at a time.
+    """
+
+    def __init__(self, spellchecker, workers=1, cache_path=None, chunksize=64):
+        self.spellchecker = spellchecker
+        self.workers = workers
+        self.chunksize = chunksize
+        self.corrections = {}
+        self.cache = CorrectionCache(cache_path, dictionary_version(spellchecker)) if cache_path else None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "computed": 0}
+
+    def correct(self, words):
+        """
+        Return a dictionary mapping each of `words` to its correction, or to None when the
+        spellchecker has no candidate.
+        """
+        missing = [word for word in set(words) if word not in self.corrections]
+        self.stats["memory_hits"] += len(set(words)) - len(missing)
+
+        if missing and self.cache is not None:
+            cached = self.cache.get_many(missing)
+            self.corrections.update(cached)
+            self.stats["disk_hits"] += len(cached)
+            missing = [word for word in missing if word not in cached]
+
+        if missing:
+            computed = dict(self._compute(missing))
+            self.corrections.update(computed)
+            self.stats["computed"] += len(computed)
+            if self.cache is not None:
+                self.cache.put_many(computed)
+
+        return {word: self.corrections[word] for word in words}
+
+    def _compute(self, words):
+        if self.workers <= 1 or len(words) < 2 * self.chunksize:
+            return [(word, self.spellchecker.correction(word)) for word in words]
+
+        chunks = [words[start:start + self.chunksize] for start in range(0, len(words), self.chunksize)]
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.spellchecker,)) as executor:
+            return [pair for chunk in executor.map(_correct_chunk, chunks) for pair in chunk]
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import pandas as pd
+from checkpoint import config_hash
+from text_pipeline import run_stages
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Bumped when the key or file layout changes, so files of an older layout are never read.
+STAGE_CACHE_VERSION = 1
+
+
+def column_fingerprint(column):
+    """
+    Hash the values and the index of a column, so that a cached stage output is only reused for
+    the same input.
+    """
+    hashes = pd.util.hash_pandas_object(column, index=True).to_numpy()
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+
+def stage_keys(fingerprint, namespace, stages, version=None):
+    """
+    Return the cache key of the column after each stage.
+
+    The key of a stage chains the key of the previous one with the stage's key and the version of
+    the resources it depends on, so it covers the input and the whole configuration prefix up to
+    that stage, and nothing after it.
+
+    Args:
+        fingerprint (str): Fingerprint of the input column (see `column_fingerprint`).
+        namespace (str): Version of what every stage of the preprocessor depends on.
+        version (callable): Optional function returning the JSON-serializable version of the
+            resources of a stage (dictionaries, model, lexicon, ...), or None.
+    """
+    key = config_hash([STAGE_CACHE_VERSION, namespace, fingerprint])
+    keys = []
+    for stage in stages:
+        key = config_hash([key, stage.key, version(stage) if version is not None else None])
+        keys.append(key)
+    return keys
+
+
+class StageCache:
+    """
+    Cache of the column after every stage, one Parquet file per stage output.
+
+    A rerun whose configuration only changes a late stage (e.g. `remove_stopwords`) loads the
+    output of the deepest stage its configuration prefix shares with an earlier run, and only runs
+    the stages after it. Files are written atomically, so an interrupted run never leaves a
+    partial one behind; the directory can be deleted at any time to reclaim space.
+
+    Args:
+        directory (str): Directory of the cached files; it is created if it does not exist.
+    """
+
+    def __init__(self, directory):
+        if pa is None:
+            raise ImportError("The stage cache requires pyarrow (pip install pyarrow).")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.stats = {"columns": 0, "stages_reused": 0, "stages_run": 0, "files_written": 0}
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def load(self, key, column):
+        """
+        Return the cached output of `key` with the index and name of `column`, or None.
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        values = pq.read_table(path).column("text").to_pylist()
+        if len(values) != len(column):
+            return None
+        return pd.Series(values, index=column.index, name=column.name, dtype=object)
+
+    def save(self, key, column):
+        """
+        Store a stage output. Columns holding anything but text (e.g. missing values) are not
+        stored, since Parquet would not give them back as they are.
+        """
+        values = column.tolist()
+        if not all(type(value) is str for value in values):
+            return
+        path = self.path(key)
+        # Worker processes may share the directory, so each one writes its own temporary file.
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        pq.write_table(pa.table({"text": pa.array(values, type=pa.string())}), temporary_path)
+        os.replace(temporary_path, path)
+        self.stats["files_written"] += 1
+
+    def run(self, column, stages, namespace, version=None, profiler=None):
+        """
+        Run the stages over a column, starting from the deepest stage output already cached and
+        caching the output of every stage run.
+
+        Args:
+            namespace (str): Version of what every stage of the preprocessor depends on.
+            version (callable): Optional version of the resources of a stage, see `stage_keys`.
+            profiler (StageProfiler): Optional profiler of the stages that are run.
+
+        Returns:
+            pd.Series: The same result as `run_stages(column, stages)`.
+        """
+        keys = stage_keys(column_fingerprint(column), namespace, stages, version)
+        start = 0
+        for depth in range(len(stages), 0, -1):
+            cached = self.load(keys[depth - 1], column)
+            if cached is not None:
+                column, start = cached, depth
+                break
+        # Every stage runs on its own, so that its output can be cached.
+        for stage, key in zip(stages[start:], keys[start:]):
+            column = run_stages(column, [stage], profiler=profiler)
+            self.save(key, column)
+        self.stats["columns"] += 1
+        self.stats["stages_reused"] += start
+        self.stats["stages_run"] += len(stages) - start
+        return column
+
+    def info(self):
+        return dict(self.stats)
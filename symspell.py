@@ -0,0 +1,198 @@
+import os
+import pickle
+
+
+def _deletes(word, max_distance):
+    """
+    Return every string obtained by deleting up to `max_distance` characters from `word`, including `word`.
+    """
+    results = {word}
+    level = {word}
+    for _ in range(max_distance):
+        level = {candidate[:i] + candidate[i + 1:] for candidate in level for i in range(len(candidate))}
+        results |= level
+    return results
+
+
+def damerau_levenshtein(first, second, max_distance):
+    """
+    Optimal string alignment distance between two strings (insertions, deletions, substitutions and
+    transpositions of adjacent characters). Returns `max_distance + 1` as soon as the distance is
+    known to exceed `max_distance`.
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        current = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = 0 if first[i - 1] == second[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def _within_one(first, second):
+    """
+    Check whether two different strings are one insertion, deletion, substitution or adjacent
+    transposition apart, without filling a distance matrix.
+    """
+    if abs(len(first) - len(second)) > 1:
+        return False
+    i = 0
+    while i < len(first) and i < len(second) and first[i] == second[i]:
+        i += 1
+    if len(first) == len(second):
+        return first[i + 1:] == second[i + 1:] or (
+            i + 1 < len(first)
+            and first[i] == second[i + 1]
+            and first[i + 1] == second[i]
+            and first[i + 2:] == second[i + 2:]
+        )
+    if len(first) < len(second):
+        return first[i:] == second[i + 1:]
+    return first[i + 1:] == second[i:]
+
+
+class SymSpell:
+    """
+    Spelling correction with a precomputed symmetric-delete index.
+
+    Every dictionary word is indexed under the strings obtained by deleting up to `max_distance`
+    characters from its first `prefix_length` characters. A misspelled word only needs the same
+    deletes of its own prefix to find its candidates, which are then checked with the
+    Damerau-Levenshtein distance. The correction is the candidate with the smallest distance, then
+    the highest frequency, then the first in alphabetical order.
+
+    Args:
+        max_distance (int): Maximum edit distance of a correction.
+        prefix_length (int): Number of leading characters of a word that are indexed.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = {}
+        self.deletes = {}
+        self.path = None
+
+    @classmethod
+    def from_spellchecker(cls, spellchecker, prefix_length=7):
+        """
+        Build the index from the word frequency list of a pyspellchecker instance.
+        """
+        symspell = cls(max_distance=spellchecker.distance, prefix_length=prefix_length)
+        symspell.add_words(spellchecker.word_frequency.dictionary)
+        return symspell
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            symspell = pickle.load(f)
+        symspell.path = path
+        return symspell
+
+    @classmethod
+    def load_or_build(cls, spellchecker, path=None):
+        """
+        Load the index saved at `path`, or build it from `spellchecker` and save it there.
+        """
+        if path and os.path.exists(path):
+            return cls.load(path)
+        symspell = cls.from_spellchecker(spellchecker)
+        if path:
+            symspell.save(path)
+        return symspell
+
+    def save(self, path):
+        # The file must hold the index itself, not the path of the file it was loaded from
+        # (see __reduce_ex__), even when it is saved over that file.
+        self.path = None
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path = path
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["path"] = None
+        return state
+
+    def __reduce_ex__(self, protocol):
+        # Once the index is on disk, a copy sent to a worker process only carries the path.
+        if self.path is not None:
+            return SymSpell.load, (self.path,)
+        return super().__reduce_ex__(protocol)
+
+    @property
+    def version(self):
+        return (
+            f"symspell-distance{self.max_distance}-prefix{self.prefix_length}"
+            f"-{len(self.words)}-{sum(self.words.values())}"
+        )
+
+    def add_words(self, frequencies):
+        """
+        Add words to the index.
+
+        Args:
+            frequencies (dict): Mapping of a word to its frequency.
+        """
+        for word, count in frequencies.items():
+            if word in self.words:
+                self.words[word] += count
+                continue
+            self.words[word] = count
+            for delete in _deletes(word[:self.prefix_length], self.max_distance):
+                entry = self.deletes.get(delete)
+                # Most deletes belong to a single word; store a plain string until a second one arrives.
+                if entry is None:
+                    self.deletes[delete] = word
+                elif isinstance(entry, str):
+                    self.deletes[delete] = [entry, word]
+                else:
+                    entry.append(word)
+
+    def candidates(self, word):
+        """
+        Return the dictionary words within `max_distance` of `word`, grouped by distance.
+
+        Returns:
+            dict: Mapping of a distance to the list of candidates at that distance. Only the
+            smallest distance found is returned, since the correction never uses the others.
+        """
+        found = set()
+        for delete in _deletes(word[:self.prefix_length], self.max_distance):
+            entry = self.deletes.get(delete)
+            if entry is not None:
+                found.update((entry,) if isinstance(entry, str) else entry)
+        found.discard(word)
+        found = [candidate for candidate in found if abs(len(candidate) - len(word)) <= self.max_distance]
+
+        # Nearly all corrections are one edit away, and that check needs no distance matrix.
+        closest = [candidate for candidate in found if _within_one(word, candidate)]
+        if closest or self.max_distance <= 1:
+            return {1: closest} if closest else {}
+        by_distance = {}
+        for candidate in found:
+            distance = damerau_levenshtein(word, candidate, self.max_distance)
+            if distance <= self.max_distance:
+                by_distance.setdefault(distance, []).append(candidate)
+        return {min(by_distance): by_distance[min(by_distance)]} if by_distance else {}
+
+    def correction(self, word):
+        """
+        The most probable spelling of `word`, or None if no dictionary word is close enough.
+        """
+        word = word.lower()
+        if word in self.words:
+            return word
+        candidates = self.candidates(word)
+        if not candidates:
+            return None
+        closest = next(iter(candidates.values()))
+        return min(closest, key=lambda candidate: (-self.words[candidate], candidate))
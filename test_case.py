@@ -1,7 +1,25 @@
+import importlib.util
+import os
+import tempfile
 import unittest
+from unittest import mock
 import pandas as pd
+import main
 from english_text_preprocessor import EnglishTextPreprocessor
 from persian_text_preprocessor import PersianTextPreprocessor, ConvertPersianDate
+from checkpoint import Checkpoint
+from dedup import FingerprintSet, drop_duplicate_rows
+from dictionary_replacer import DictionaryReplacer, replace_sequentially
+from near_dedup import NearDuplicateFilter
+from output_writers import ExcelWriter, open_writer
+from parallel import ParallelProcessor
+from row_filters import filter_rows, task_filters
+from symspell import SymSpell
+from profiling import StageProfiler, profile_report
+from text_cache import TextCache
+from text_pipeline import (LOWERCASE, SINGLE_SPACES, PrefilteredText, Stage, new_pushdown_stats, new_tree_stats,
+                           new_unique_stats, plan_stages, run_on_unique_values, run_stage_tree, run_stages,
+                           run_stages_with_pushdown)
 
 
 class TestPersianTextPreprocessor(unittest.TestCase):
@@ -102,6 +120,222 @@ class TestPersianTextPreprocessor(unittest.TestCase):
         result = self.preprocessor.process_text(column)
         self.assertEqual(result.tolist(), expected)
 
+
+class TestTextCache(unittest.TestCase):
+    def test_warm_run_is_served_from_disk_cache(self):
+        column = pd.Series(["سلام دنیا!", "صبح بخیر", "سلام دنیا!", "کتاب ۱۲۳"], index=[3, 5, 9, 11])
+        expected = PersianTextPreprocessor(task="sentiment").process_text(column)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "texts.sqlite")
+            cold = PersianTextPreprocessor(task="sentiment", text_cache_path=path)
+            pd.testing.assert_series_equal(cold.process_text(column), expected)
+            self.assertEqual(cold.text_cache.stats["computed"], 3)
+            cold.text_cache.close()
+
+            warm = PersianTextPreprocessor(task="sentiment", text_cache_path=path)
+            pd.testing.assert_series_equal(warm.process_text(column), expected)
+            self.assertEqual(warm.text_cache.stats, {"memory_hits": 0, "disk_hits": 3, "computed": 0})
+            pd.testing.assert_series_equal(warm.process_text(column), expected)
+            self.assertEqual(warm.text_cache.stats["memory_hits"], 3)
+            warm.text_cache.close()
+
+            # Another task configuration is another namespace: nothing is reused.
+            other = PersianTextPreprocessor(task="ner", text_cache_path=path)
+            other.process_text(column)
+            self.assertEqual(other.text_cache.stats["computed"], 3)
+            other.text_cache.close()
+
+    def test_disk_tier_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TextCache(os.path.join(directory, "texts.sqlite"), memory_size=0, max_entries=10)
+            for start in range(0, 30, 5):
+                cache.map(pd.Series([f"text {i}" for i in range(start, start + 5)]), "ns", lambda texts: texts.str.upper())
+            self.assertLessEqual(cache.disk_entries, 10)
+            cache.stats = {"memory_hits": 0, "disk_hits": 0, "computed": 0}
+            result = cache.map(pd.Series(["text 29", "text 0"]), "ns", lambda texts: texts.str.upper())
+            self.assertEqual(result.tolist(), ["TEXT 29", "TEXT 0"])
+            self.assertEqual((cache.stats["disk_hits"], cache.stats["computed"]), (1, 1))
+            cache.close()
+
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_profiled_run_matches_and_counts_changes(self):
+        preprocessor = PersianTextPreprocessor(task="sentiment")
+        column = pd.Series(["سلام دنیا", "Hello <b>world</b>", "کتاب ۱۲۳ test@example.com"], index=[4, 8, 15])
+        profiler = StageProfiler(slowest=2)
+        result = preprocessor.process_text(column, profiler=profiler)
+        pd.testing.assert_series_equal(result, preprocessor.process_text(column), check_dtype=False)
+
+        report = {stage["stage"]: stage for stage in profile_report({"Persian": profiler})["Persian"]}
+        self.assertEqual(list(report), [stage.name for stage in preprocessor.build_stages()])
+        self.assertEqual(report["remove_html_tags"]["rows"], 3)
+        self.assertEqual(report["remove_html_tags"]["rows_changed"], 1)
+        self.assertEqual(report["remove_html_tags"]["chars_in"] - report["remove_html_tags"]["chars_out"], 7)
+        self.assertEqual(sum(report["remove_cyrillic"]["latency_histogram"].values()), 3)
+        self.assertEqual(len(report["remove_cyrillic"]["slowest_rows"]), 2)
+        self.assertTrue({row["index"] for row in report["remove_cyrillic"]["slowest_rows"]} <= {4, 8, 15})
+
+
+
+class TestUniqueValues(unittest.TestCase):
+    def test_repetitive_column_is_cleaned_through_its_distinct_values(self):
+        column = pd.Series(["OK", "Yes", "OK", "Thank you", "OK", "Yes"], index=[10, 11, 12, 13, 14, 15], name="English")
+        seen = []
+
+        def process(texts):
+            seen.append(len(texts))
+            return texts.str.lower()
+
+        stats = new_unique_stats()
+        result = run_on_unique_values(column, process, min_duplicate_ratio=0.5, stats=stats)
+        pd.testing.assert_series_equal(result, column.str.lower(), check_dtype=False)
+        self.assertEqual(seen, [3])
+        self.assertEqual((stats["rows"], stats["unique_rows"], stats["factorized_columns"]), (6, 3, 1))
+
+        run_on_unique_values(column.iloc[:3], process, min_duplicate_ratio=0.5, stats=stats)
+        self.assertEqual(seen, [3, 3])
+        self.assertEqual(stats["factorized_columns"], 1)
+
+    def test_persian_output_matches_whole_column_run(self):
+        column = pd.Series(["سلام دنیا!", "صبح بخیر", "سلام دنیا!", "سلام دنیا!", "کتاب ۱۲۳"])
+        unique = PersianTextPreprocessor(task="sentiment")
+        whole = PersianTextPreprocessor(task="sentiment", min_duplicate_ratio=None)
+        pd.testing.assert_series_equal(unique.process_text(column), whole.process_text(column))
+        self.assertEqual(unique.unique_stats["unique_rows"], 3)
+
+
+PLANNER_TEXTS = [
+    "  Hello\n\n<b>x\ny</b>  WORLD  ", "<a\n> @User #Tag 1.2.3.4:80 %a &amp; x", "HTTP://X.COM   Done",
+    "I'M   Here!!  😀  😡", "ᴬbc  Def", "a¨ b", "foo.bar  1 July 1818  end", "1\n2 July 2020", "a.\tb", "  ", "",
+    " سلام <a@b.com>", "سلام\xa0<a@b.com> و", "کتاب‌ها‌  می  ۱۴۰۰/۰۱/۰۱", "a . . . b", "Ι  ΣΑΣ", "@a.b.c  #x\n\n%d  &lt;",
+]
+TASKS = ["default", "translation", "sentiment", "ner", "topic_modeling", "spam_detection", "summarization"]
+
+
+class TestStagePlanner(unittest.TestCase):
+    def test_redundant_normalizations_are_dropped(self):
+        spaces = Stage("spaces", lambda x: " ".join(x.split()), normal_form=SINGLE_SPACES, preserves=(LOWERCASE,))
+        lower = Stage("lower", str.lower, normal_form=LOWERCASE, preserves=(SINGLE_SPACES,))
+        strip_tags = Stage("strip_tags", lambda x: x.replace("#", ""), preserves=(LOWERCASE,),
+                           commutes_with=(SINGLE_SPACES,))
+        upper_tags = Stage("upper_tags", lambda x: x.replace("#", "TAG"))
+        planned = plan_stages([lower, spaces, strip_tags, spaces, lower, upper_tags, lower])
+        self.assertEqual([stage.name for stage in planned], ["lower", "strip_tags", "spaces", "upper_tags", "lower"])
+
+    def test_persian_plan_matches_every_stage(self):
+        column = pd.Series(PLANNER_TEXTS)
+        for task in TASKS:
+            preprocessor = PersianTextPreprocessor(task=task)
+            planned = preprocessor.build_stages()
+            self.assertLess(len(planned), len(preprocessor.build_stages(optimize=False)))
+            pd.testing.assert_series_equal(run_stages(column, planned),
+                                           run_stages(column, preprocessor.build_stages(optimize=False)))
+
+    def test_english_plan_matches_every_stage(self):
+        column = pd.Series(PLANNER_TEXTS)
+        for task in TASKS:
+            preprocessor = EnglishTextPreprocessor(task=task)
+            pd.testing.assert_series_equal(run_stages(column, preprocessor.build_stages()),
+                                           run_stages(column, preprocessor.build_stages(optimize=False)))
+
+
+class TestPushdown(unittest.TestCase):
+    def test_filtered_rows_skip_the_costly_stages(self):
+        seen = []
+
+        def costly(column):
+            seen.extend(column)
+            return column.str.upper()
+
+        stages = [
+            Stage("strip", str.strip),
+            Stage("costly", costly, column_level=True, keeps_filters=("only_numbers",)),
+            Stage("spaces", lambda x: " ".join(x.split()), keeps_filters=("only_numbers", "brackets")),
+        ]
+        column = pd.Series([" 123 ", "hello  [x]", "world", "42"], index=[5, 6, 7, 8], name="text")
+        filters = task_filters("default")
+        stats = new_pushdown_stats()
+        result = run_stages_with_pushdown(column, stages, filters, stats=stats)
+        self.assertEqual(seen, ["hello  [x]", "world"])
+        self.assertIsInstance(result[5], PrefilteredText)
+        self.assertEqual((stats["skipped"], stats["filters"]), (2, {"only_numbers": 2}))
+
+        expected = run_stages(column, stages)
+        pd.testing.assert_frame_equal(filter_rows(result.to_frame(), ["text"], filters),
+                                      filter_rows(expected.to_frame(), ["text"], filters), check_dtype=False)
+
+    def test_prefiltered_text_is_not_cached(self):
+        cache = TextCache()
+        cache.map(pd.Series(["123", "abc"]), "ns", lambda texts: texts.map(
+            lambda text: PrefilteredText(text) if text.isdigit() else text.upper()))
+        self.assertEqual(len(cache.memory), 1)
+
+
+class TestStageTree(unittest.TestCase):
+    def test_shared_prefix_runs_once(self):
+        calls = []
+
+        def stage(name):
+            return Stage(name, lambda x: calls.append(name) or f"{x}{name}")
+
+        a, b, c, d = stage("a"), stage("b"), stage("c"), stage("d")
+        column = pd.Series(["x"], index=[3], name="text")
+        stats = new_tree_stats()
+        results = run_stage_tree(column, {"first": [a, b, c], "second": [a, b, d], "third": [a]}, stats=stats)
+        self.assertEqual({task: result[3] for task, result in results.items()},
+                         {"first": "xabc", "second": "xabd", "third": "xa"})
+        self.assertEqual(sorted(calls), ["a", "b", "c", "d"])
+        self.assertEqual(stats, {"stage_runs": 4, "stage_runs_saved": 3})
+
+    def test_persian_tasks_match_single_task_runs(self):
+        column = pd.Series(PLANNER_TEXTS * 2)
+        results = PersianTextPreprocessor().process_tasks(column, TASKS)
+        for task in TASKS:
+            pd.testing.assert_series_equal(results[task], PersianTextPreprocessor(task=task).process_text(column))
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "stage cache needs pyarrow")
+class TestStageCache(unittest.TestCase):
+    def test_rerun_resumes_from_the_deepest_shared_stage(self):
+        column = pd.Series(PLANNER_TEXTS * 2)
+        with tempfile.TemporaryDirectory() as directory:
+            first = PersianTextPreprocessor(task="sentiment", stage_cache_path=directory, min_duplicate_ratio=None)
+            expected = PersianTextPreprocessor(task="sentiment", min_duplicate_ratio=None).process_text(column)
+            pd.testing.assert_series_equal(first.process_text(column), expected)
+            self.assertEqual(first.stage_cache.info()["stages_reused"], 0)
+
+            # Only the last stages change, so the rerun loads the column after the shared ones.
+            rerun = PersianTextPreprocessor(task="sentiment", stage_cache_path=directory, min_duplicate_ratio=None)
+            rerun.current_task_config = dict(rerun.current_task_config, remove_stopwords=False)
+            reference = PersianTextPreprocessor(task="sentiment", min_duplicate_ratio=None)
+            reference.current_task_config = rerun.current_task_config
+            pd.testing.assert_series_equal(rerun.process_text(column), reference.process_text(column))
+            first_keys = [stage.key for stage in first.build_stages()]
+            rerun_keys = [stage.key for stage in rerun.build_stages()]
+            shared = next(depth for depth, (old, new) in enumerate(zip(first_keys, rerun_keys)) if old != new)
+            self.assertGreater(shared, 0)
+            self.assertEqual(rerun.stage_cache.info()["stages_reused"], shared)
+
+
+class TestLazyLoading(unittest.TestCase):
+    def test_models_are_loaded_only_by_tasks_that_use_them(self):
+        column = pd.Series(["Hello <b>world</b>!", "سلام دنیا"])
+        english = EnglishTextPreprocessor(task="translation")
+        english.process_column(column)
+        self.assertIsNone(english._nlp)
+        self.assertIsNone(english._spellchecker)
+
+        persian = PersianTextPreprocessor(task="translation")
+        persian.process_text(column)
+        self.assertIsNone(persian._tokenizer)
+        persian = PersianTextPreprocessor(task="default")
+        persian.process_text(column)
+        self.assertIsNotNone(persian._tokenizer)
+        self.assertIsNone(persian._normalizer)
+        self.assertIsNone(persian._stemmer)
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -213,6 +447,65 @@ class TestPersianTextPreprocessor(unittest.TestCase):
         result = self.preprocessor_default.handle_emojis(text, "sentiment")
         self.assertEqual(result, expected)
 
+    def test_handle_emojis_sequences(self):
+        text = "قلب ❤️ و خانواده 👨‍👩‍👧 و 👍🏽"
+        expected = "قلب [EMOJI] و خانواده [EMOJI] و [EMOJI]"
+        self.assertEqual(self.preprocessor_default.handle_emojis(text, "replace"), expected)
+        self.assertEqual(self.preprocessor_default.handle_emojis("بدون ایموجی", "remove"), "بدون ایموجی")
+
+    def test_process_text_fused_matches_stagewise(self):
+        column = pd.Series([
+            "این یک متن ۱۴۰۲/۰۵/۲۰ شامل 😊 و لینک https://example.com است.",
+            "سلام، جهان! <b>HTML</b> test@example.com @user #tag",
+            "۱۲۳۴ و abc... Привет\u200cها",
+            "12345",
+        ])
+        for task in self.preprocessor_default.task_config:
+            preprocessor = PersianTextPreprocessor(task=task)
+            fused = preprocessor.process_text(column)
+            stagewise = preprocessor.process_text(column, fused=False)
+            pd.testing.assert_series_equal(fused, stagewise)
+
+    def test_check_spell_with_lexicon(self):
+        lexicon = {"این": 20, "کتاب": 10, "خوب": 5, "است": 30}
+        preprocessor = PersianTextPreprocessor(task="translation", spell_lexicon=lexicon)
+        column = pd.Series(["این کتاپ خوب است", "این کتاب است"], index=[2, 4])
+        result = preprocessor.correct_spelling_column(column)
+        expected = pd.Series(["این کتاب خوب است", "این کتاب است"], index=[2, 4])
+        pd.testing.assert_series_equal(result, expected)
+        self.assertIn("check_spell", [stage.name for stage in preprocessor.build_stages()])
+        self.assertNotIn("check_spell", [stage.name for stage in self.preprocessor_default.build_stages()])
+
+    def test_parallel_processor_preserves_order(self):
+        column = pd.Series(["سلام ۱۲۳ 😊", "این یک تست است", "", "متن سوم https://example.com", "12345"],
+                           index=[10, 11, 12, 13, 14])
+        expected = PersianTextPreprocessor(task="translation").process_text(column)
+        with ParallelProcessor(PersianTextPreprocessor, workers=2, chunksize=2, task="translation") as processor:
+            result = processor.process_column(column)
+        pd.testing.assert_series_equal(result, expected)
+
+    def test_dictionary_replacer_matches_sequential_replacement(self):
+        preprocessor = self.preprocessor_default
+        dictionaries = [
+            preprocessor.sign_dict_fa_phase_one,
+            preprocessor.arabic_dict,
+            preprocessor.num_dict,
+            preprocessor.special_char_dict,
+        ]
+        replacer = DictionaryReplacer(dictionaries)
+        texts = [
+            "سلام، جهان! ۱۲۳۴ و abc",
+            "a.... b . . . c \\u200c d \\n e %d %s ___ ..",
+            "كيف حالك؟ ١٢٣ «نقل» قول…",
+            ",،.;:!?",
+        ]
+        for text in texts:
+            self.assertEqual(replacer.replace(text), replace_sequentially(text, dictionaries))
+
+        signs = [preprocessor.sign_dict_fa_phase_two]
+        for text in texts:
+            self.assertEqual(DictionaryReplacer(signs).replace(text), replace_sequentially(text, signs))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -258,6 +551,30 @@ class TestEnglishTextPreprocessor(unittest.TestCase):
         expected = "what is a test sentence ."
         self.assertEqual(result, expected)
 
+    def test_handle_emojis_sentiment_sequences(self):
+        input_text = "I ❤️ it 👍🏽 🙈"
+        result = self.preprocessor.handle_emojis(input_text, strategy="sentiment")
+        self.assertEqual(result, "I  positive  it  positive  ")
+
+    def test_correct_spelling_column_matches_row_correction(self):
+        column = pd.Series(["wht is a tst sentnce.", "a tst again", ""], index=[5, 6, 8])
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "spelling.sqlite")
+            preprocessor = EnglishTextPreprocessor(spelling_cache_path=cache_path)
+            result = preprocessor.correct_spelling_column(column)
+            pd.testing.assert_series_equal(result, column.apply(self.preprocessor.correct_spelling))
+            preprocessor.spelling_corrector.cache.close()
+
+            warm = EnglishTextPreprocessor(spelling_cache_path=cache_path)
+            pd.testing.assert_series_equal(warm.correct_spelling_column(column), result)
+            self.assertEqual(warm.spelling_corrector.stats["computed"], 0)
+            warm.spelling_corrector.cache.close()
+
+    def test_correct_spelling_symspell_backend(self):
+        preprocessor = EnglishTextPreprocessor(spelling_backend="symspell")
+        input_text = "wht is a tst sentnce."
+        self.assertEqual(preprocessor.correct_spelling(input_text), self.preprocessor.correct_spelling(input_text))
+
     def test_handle_emojis(self):
         input_text = "I am so happy 😊"
         result = self.preprocessor.handle_emojis(input_text, strategy="replace")
@@ -288,6 +605,25 @@ class TestEnglishTextPreprocessor(unittest.TestCase):
         expected = "This is a test. New line."
         self.assertEqual(result, expected)
 
+    def test_apply_dictionaries_matches_ordered_replace(self):
+        dictionaries = [
+            self.preprocessor.contractions_dict,
+            self.preprocessor.english_dict,
+            self.preprocessor.special_char_dict,
+        ]
+        texts = list(self.test_data.str.lower()) + [
+            "i can't've said it, cantve we? 'cause y'all won't.",
+            "a significant... ___ %d cause \n",
+        ]
+        for text in texts:
+            self.assertEqual(self.preprocessor.apply_dictionaries(text),
+                             self.preprocessor.apply_dictionaries(text, dictionaries))
+
+    def test_apply_dictionaries_word_boundary(self):
+        preprocessor = EnglishTextPreprocessor(contractions_word_boundary=True)
+        self.assertEqual(preprocessor.apply_dictionaries("a significant cant"), "a significant can not")
+        self.assertEqual(self.preprocessor.apply_dictionaries("a significant cant"), "a significan not can not")
+
     def test_remove_stopwords(self):
         tokens = ["this", "is", "a", "test"]
         result = self.preprocessor.remove_stopwords(tokens)
@@ -306,6 +642,22 @@ class TestEnglishTextPreprocessor(unittest.TestCase):
         expected = ["jump", "fast", "bad", "arrive", "go", "tall"]
         self.assertEqual(result, expected)
 
+    def test_lemmatize_column_matches_row_lemmatization(self):
+        column = pd.Series(["the children were running", "she arrived  later", ""], index=[3, 1, 7])
+        result = self.preprocessor.lemmatize_column(column)
+        expected = column.apply(lambda x: " ".join(self.preprocessor.apply_lemmatization(x.split())))
+        pd.testing.assert_series_equal(result, expected)
+
+    def test_lemmatize_column_cache_reports_hits(self):
+        preprocessor = EnglishTextPreprocessor(lemma_cache_size=10)
+        column = pd.Series(["the cats were running", "the cats were running"])
+        result = preprocessor.lemmatize_column(column)
+        expected = column.apply(lambda x: " ".join(self.preprocessor.apply_lemmatization(x.split())))
+        pd.testing.assert_series_equal(result, expected)
+        info = preprocessor.lemma_cache.info()
+        self.assertGreater(info["hits"], 0)
+        self.assertLessEqual(info["size"], 10)
+
     def test_process_column_default_task(self):
         result = self.preprocessor.process_column(self.test_data)
         expected = pd.Series([
@@ -390,5 +742,164 @@ class TestEnglishTextPreprocessor(unittest.TestCase):
         pd.testing.assert_series_equal(result, expected)
 
 
+class TestFingerprintSet(unittest.TestCase):
+    def test_drop_duplicate_rows_across_chunks_and_spills(self):
+        df = pd.DataFrame({"English": ["a", "b", "a", "c", "b", "d"] * 50 + ["e"],
+                           "Persian": ["x", "y", "x", "z", "w", "v"] * 50 + ["u"]})
+        with tempfile.TemporaryDirectory() as directory:
+            seen = FingerprintSet(memory_limit=64, spill_directory=directory, initial_capacity=4)
+            chunks = [drop_duplicate_rows(df.iloc[start:start + 7], seen) for start in range(0, len(df), 7)]
+            pd.testing.assert_frame_equal(pd.concat(chunks), df.drop_duplicates())
+            self.assertGreater(len(seen.runs), 0)
+
+            seen.save(os.path.join(directory, "state"))
+            restored = FingerprintSet.load(os.path.join(directory, "state"))
+            self.assertEqual(len(restored), len(df.drop_duplicates()))
+            self.assertTrue(drop_duplicate_rows(df, restored).empty)
+
+
+class TestSymSpell(unittest.TestCase):
+    def test_loaded_index_saves_the_index_itself(self):
+        symspell = SymSpell(max_distance=1)
+        symspell.add_words({"hello": 5, "world": 3, "help": 2})
+        with tempfile.TemporaryDirectory() as directory:
+            first_path = os.path.join(directory, "first.pkl")
+            symspell.save(first_path)
+
+            # Saved over the file it was loaded from.
+            SymSpell.load(first_path).save(first_path)
+            self.assertEqual(SymSpell.load(first_path).words, symspell.words)
+
+            # Saved to another path, which must not depend on the original file.
+            other_path = os.path.join(directory, "other.pkl")
+            SymSpell.load(first_path).save(other_path)
+            os.remove(first_path)
+            loaded = SymSpell.load(other_path)
+            self.assertEqual(loaded.words, symspell.words)
+            self.assertEqual(loaded.correction("helo"), "hello")
+
+
+class TestChunkedProcessing(unittest.TestCase):
+    def test_duplicates_across_chunks_match_whole_file(self):
+        # Chunks of two rows: every duplicate falls in another chunk than its first occurrence.
+        df = pd.DataFrame({"Persian": ["سلام دنیا", "صبح بخیر", "شب بخیر", "سلام دنیا", "روز خوب",
+                                       "صبح بخیر", "کتاب خوب", "شب بخیر"]})
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "input.csv")
+            df.to_csv(input_path, index=False)
+            save_path = os.path.join(directory, "cleaned")
+            main.process_in_chunks(input_path, "sentiment", save_path, 2, column="Persian")
+            expected = main.process_text_data(df.copy(), "sentiment", column="Persian")
+            pd.testing.assert_frame_equal(pd.read_csv(f"{save_path}.csv"), expected.reset_index(drop=True))
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_resumed_run_matches_uninterrupted_run(self):
+        df = pd.DataFrame({"Persian": ["سلام دنیا", "صبح بخیر", "سلام دنیا", "۱۲۳", "شب بخیر", "صبح بخیر",
+                                       "روز خوب", "شب بخیر", "کتاب خوب", "سلام دنیا"]})
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, "input.csv")
+            df.to_csv(input_path, index=False)
+            full_path = os.path.join(directory, "full")
+            main.process_in_chunks(input_path, "sentiment", full_path, 2, column="Persian",
+                                   output_formats=["csv", "jsonl"])
+
+            resumed_path = os.path.join(directory, "resumed")
+            checkpoint = Checkpoint(os.path.join(directory, "checkpoint"), {"task": "sentiment"})
+            process_text_data = main.process_text_data
+            calls = []
+
+            def crash_on_third_chunk(*args, **kwargs):
+                calls.append(1)
+                if len(calls) == 3:
+                    raise RuntimeError("interrupted")
+                return process_text_data(*args, **kwargs)
+
+            with mock.patch("main.process_text_data", side_effect=crash_on_third_chunk):
+                with self.assertRaises(RuntimeError):
+                    main.process_in_chunks(input_path, "sentiment", resumed_path, 2, column="Persian",
+                                           output_formats=["csv", "jsonl"], checkpoint=checkpoint)
+            progress = checkpoint.load()
+            self.assertEqual(progress["chunks"], 2)
+            main.process_in_chunks(input_path, "sentiment", resumed_path, 2, column="Persian",
+                                   output_formats=["csv", "jsonl"], checkpoint=checkpoint, progress=progress)
+
+            for extension in ["csv", "jsonl"]:
+                with open(f"{full_path}.{extension}", encoding="utf-8") as full, \
+                        open(f"{resumed_path}.{extension}", encoding="utf-8") as resumed:
+                    self.assertEqual(full.read(), resumed.read())
+
+
+class TestRowFilters(unittest.TestCase):
+    def test_filter_rows_single_pass_with_stats(self):
+        df = pd.DataFrame({"English": ["hello", "123", "[note] hi", "!!!", "42", None, "fine"],
+                           "Persian": ["سلام", "۱۲۳", "سلام", "خوب", "...", "خوب", "[x]"]})
+        stats = {}
+        result = filter_rows(df, ["English", "Persian"], task_filters("translation"), stats)
+        self.assertEqual(list(result.index), [0, 5])
+        self.assertEqual(stats, {"only_numbers:English": 2, "only_numbers:Persian": 0,
+                                 "brackets:English": 1, "brackets:Persian": 1,
+                                 "only_signs:English": 1, "only_signs:Persian": 0})
+
+
+class TestOutputWriters(unittest.TestCase):
+    def test_chunked_writes_round_trip(self):
+        df = pd.DataFrame({"English": ["hello world", "good morning", "fine", "bye"],
+                           "Persian": ["سلام دنیا", "صبح بخیر", "خوب", "خداحافظ"]})
+        readers = {"csv": pd.read_csv, "jsonl": lambda path: pd.read_json(path, lines=True)}
+        with tempfile.TemporaryDirectory() as directory:
+            for output_format, read in readers.items():
+                with open_writer(os.path.join(directory, "cleaned"), output_format) as writer:
+                    writer.write(df.iloc[:2])
+                    writer.write(df.iloc[2:])
+                self.assertEqual(writer.path, os.path.join(directory, f"cleaned.{output_format}"))
+                pd.testing.assert_frame_equal(read(writer.path), df, check_dtype=False)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "Parquet and Arrow outputs need pyarrow")
+    def test_arrow_formats_type_null_first_chunk_as_string(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        df = pd.DataFrame({"English": [None, None, "hello", "bye"], "Persian": ["سلام", "خوب", "دنیا", None]})
+        readers = {"parquet": pq.read_table, "arrow": lambda path: pa.ipc.open_file(path).read_all()}
+        with tempfile.TemporaryDirectory() as directory:
+            for output_format, read in readers.items():
+                with open_writer(os.path.join(directory, "cleaned"), output_format) as writer:
+                    writer.write(df.iloc[:2])
+                    writer.write(df.iloc[2:])
+                table = read(writer.path)
+                self.assertEqual(table.schema.field("English").type, pa.string())
+                pd.testing.assert_frame_equal(table.to_pandas(), df)
+
+    def test_excel_writer_rolls_over_to_new_sheets(self):
+        df = pd.DataFrame({"Word": ["a", "b", "c", "d", "e"], "Frequency": [5, 4, 3, 2, 1]})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "counts.xlsx")
+            with ExcelWriter(path, max_rows=3) as writer:
+                writer.write(df.iloc[:1])
+                writer.write(df.iloc[1:])
+            sheets = pd.read_excel(path, sheet_name=None)
+            self.assertEqual(list(sheets), ["Sheet1", "Sheet2", "Sheet3"])
+            pd.testing.assert_frame_equal(pd.concat(sheets.values(), ignore_index=True), df)
+
+
+class TestNearDuplicateFilter(unittest.TestCase):
+    def test_filter_keeps_first_of_each_cluster_across_chunks(self):
+        df = pd.DataFrame({
+            "English": ["the video formats are not installed on your computer",
+                        "The video formats are not installed on your computer!",
+                        "the audio codecs are not installed on your computer",
+                        "permission denied",
+                        "the video formats are  not installed, on your computer"],
+            "Persian": ["قالب‌های ویدئویی روی رایانه‌ی شما نصب نشده‌اند",
+                        "قالب‌های ویدئویی روی رایانه‌ی شما نصب نشده‌اند.",
+                        "کدک‌های صوتی روی رایانه‌ی شما نصب نشده‌اند",
+                        "مجوز رد شد",
+                        "قالب‌های ویدئویی روی رایانه‌ی شما نصب نشده‌اند"],
+        })
+        near_duplicates = NearDuplicateFilter(threshold=0.8)
+        kept = pd.concat([near_duplicates.filter(df.iloc[:3]), near_duplicates.filter(df.iloc[3:])])
+        self.assertEqual(list(kept.index), [0, 2, 3])
+
+
 if __name__ == "__main__":
     unittest.main()
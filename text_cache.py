@@ -0,0 +1,182 @@
+import hashlib
+import sqlite3
+import pandas as pd
+from caching import LRUCache
+from checkpoint import config_hash
+from text_pipeline import PrefilteredText
+
+# Bumped when the key or value layout changes, so entries of an older layout are never read.
+CACHE_FORMAT_VERSION = 1
+
+_MISSING = object()
+
+
+def cache_namespace(*parts):
+    """
+    Hash everything that determines the cleaned text besides the raw text itself (language, task,
+    task configuration, dictionary and model versions, ...). Changing any part starts a new
+    namespace, so stale entries are simply never looked up again.
+    """
+    return config_hash([CACHE_FORMAT_VERSION] + list(parts))
+
+
+def dictionary_items(dictionary):
+    """
+    List the items of a replacement dictionary in order, for `cache_namespace`: the order of the
+    keys matters to the replacements, so it must be part of the version.
+    """
+    return list(dictionary.items())
+
+
+class TextCache:
+    """
+    Content-addressed cache of cleaned text: a raw text and the namespace of the preprocessor that
+    cleans it map to the cleaned text.
+
+    Lookups go to an in-memory LRU tier first, then to an optional sqlite file shared between runs
+    (and between the worker processes of a run). Only the texts found in neither tier are cleaned,
+    each distinct text once.
+
+    Args:
+        path (str): Optional path of the sqlite file; it is created if it does not exist. Without
+            it the cache only lives in memory.
+        memory_size (int): Entries of the in-memory tier (None for unbounded, 0 to disable it).
+        max_entries (int): Optional limit on the entries of the sqlite file. When it is exceeded,
+            the least recently used entries are deleted down to 90% of the limit.
+    """
+
+    def __init__(self, path=None, memory_size=100000, max_entries=None):
+        self.path = path
+        self.memory = LRUCache(maxsize=memory_size)
+        self.max_entries = max_entries
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "computed": 0}
+        self.connection = None
+        self.clock = 0
+        self.disk_entries = 0
+        if path:
+            # WAL lets several worker processes read while one of them writes.
+            self.connection = sqlite3.connect(path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS texts (key BLOB PRIMARY KEY, value TEXT, last_used INTEGER)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS texts_last_used ON texts (last_used)")
+            self.connection.commit()
+            self.clock, self.disk_entries = self.connection.execute(
+                "SELECT COALESCE(MAX(last_used), 0), COUNT(*) FROM texts"
+            ).fetchone()
+
+    @staticmethod
+    def key(namespace, text):
+        return hashlib.blake2b(f"{namespace}\0{text}".encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def get_many(self, keys, batch_size=500):
+        """
+        Return a dictionary with the cleaned texts of `keys` found in the sqlite file, and mark them
+        as recently used.
+        """
+        if self.connection is None or not keys:
+            return {}
+        found = {}
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(f"SELECT key, value FROM texts WHERE key IN ({placeholders})", batch)
+            found.update(rows)
+        if found:
+            self.clock += 1
+            self.connection.executemany("UPDATE texts SET last_used = ? WHERE key = ?",
+                                        [(self.clock, key) for key in found])
+            self.connection.commit()
+        return found
+
+    def put_many(self, entries):
+        if self.connection is None or not entries:
+            return
+        self.clock += 1
+        before = self.connection.total_changes
+        self.connection.executemany("INSERT OR IGNORE INTO texts (key, value, last_used) VALUES (?, ?, ?)",
+                                    [(key, value, self.clock) for key, value in entries.items()])
+        self.disk_entries += self.connection.total_changes - before
+        self.connection.commit()
+        if self.max_entries is not None and self.disk_entries > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries of the sqlite file down to 90% of `max_entries`.
+        """
+        # Other processes may have added entries too, so count again before deleting.
+        self.disk_entries = self.connection.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+        excess = self.disk_entries - int(self.max_entries * 0.9)
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM texts WHERE key IN (SELECT key FROM texts ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self.connection.commit()
+            self.disk_entries -= excess
+
+    def map(self, column, namespace, process):
+        """
+        Clean a column through the cache.
+
+        Args:
+            column (pd.Series): Raw texts.
+            namespace (str): Namespace of the preprocessor (see `cache_namespace`).
+            process (callable): Cleans a Series of raw texts; called once with the distinct texts
+                missing from both tiers and with the non-string values, which are never cached.
+
+        Returns:
+            pd.Series: The cleaned column, with the index and name of `column`.
+        """
+        values = column.tolist()
+        cleaned = {}
+        missing = {}
+        for text in dict.fromkeys(value for value in values if isinstance(value, str)):
+            key = self.key(namespace, text)
+            value = self.memory.get(key, _MISSING)
+            if value is _MISSING:
+                missing[key] = text
+            else:
+                cleaned[text] = value
+        self.stats["memory_hits"] += len(cleaned)
+
+        for key, value in self.get_many(list(missing)).items():
+            text = missing.pop(key)
+            cleaned[text] = value
+            self.memory.put(key, value)
+            self.stats["disk_hits"] += 1
+
+        others = [index for index, value in enumerate(values) if not isinstance(value, str)]
+        if missing or others:
+            texts = list(missing.values())
+            results = process(pd.Series(texts + [values[index] for index in others], dtype=object)).tolist()
+            entries = {}
+            for key, text, value in zip(missing, texts, results):
+                cleaned[text] = value
+                # The partial text of rows skipped by predicate pushdown is not their cleaned text.
+                if isinstance(value, str) and not isinstance(value, PrefilteredText):
+                    self.memory.put(key, value)
+                    entries[key] = value
+            self.put_many(entries)
+            self.stats["computed"] += len(texts)
+            for index, value in zip(others, results[len(texts):]):
+                values[index] = value
+            others = set(others)
+            result = [values[index] if index in others else cleaned[value] for index, value in enumerate(values)]
+        else:
+            result = [cleaned[value] for value in values]
+        return pd.Series(result, index=column.index, name=column.name, dtype=object)
+
+    def info(self):
+        """
+        Return the hit counters of both tiers and the overall hit rate over distinct texts.
+        """
+        lookups = sum(self.stats.values())
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return dict(self.stats, hit_rate=hits / lookups if lookups else 0.0, disk_entries=self.disk_entries)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
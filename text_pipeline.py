@@ -0,0 +1,320 @@
+import time
+import numpy as np
+import pandas as pd
+
+# Duplicate ratio above which a column is cleaned through its distinct values only.
+MIN_DUPLICATE_RATIO = 0.2
+
+# Normal forms of the idempotent stages, used by `plan_stages`: lowercase text (str.lower) and text
+# whose whitespace runs are collapsed to single spaces and stripped at both ends.
+LOWERCASE = "lowercase"
+SINGLE_SPACES = "single_spaces"
+
+
+class Stage:
+    """
+    A single named step of a preprocessing pipeline.
+
+    Args:
+        name (str): Name of the step, used in reports and benchmarks.
+        func (callable): Function mapping one cleaned string to the next, or a whole pandas
+            Series to the next one for column-level stages.
+        column_level (bool): If True, `func` processes the whole column at once, e.g. to batch
+            rows through a model.
+        keeps_filters (tuple): Names of the row filters (see row_filters.py) the step preserves:
+            a text one of them matches is still matched by it after the step. Rows such a filter
+            will drop anyway can then skip the step (see `run_stages_with_pushdown`).
+        normal_form (str): Set on idempotent steps: the normal form (e.g. LOWERCASE) the step puts a
+            text in. Steps with the same normal form are interchangeable.
+        preserves (tuple): Normal forms the step keeps: if its input is in one of them, so is its
+            output.
+        commutes_with (tuple): Normal forms `g` the step commutes with up to a final `g`, i.e.
+            g(step(g(x))) == g(step(x)): putting its input in the normal form first does not change
+            the result once the output is normalized again.
+        key (str): Identifies the work of the step, by default its name: the pipelines of several
+            tasks share a run of the same steps (see `run_stage_tree`). Set it when the step's
+            behaviour depends on an option, e.g. the emoji strategy.
+    """
+
+    def __init__(self, name, func, column_level=False, keeps_filters=(), normal_form=None, preserves=(),
+                 commutes_with=(), key=None):
+        self.name = name
+        self.key = key or name
+        self.func = func
+        self.column_level = column_level
+        self.keeps_filters = tuple(keeps_filters)
+        self.normal_form = normal_form
+        self.preserves = tuple(preserves)
+        self.commutes_with = tuple(commutes_with)
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+def plan_stages(stages):
+    """
+    Remove the stages whose work is provably redundant from an ordered list of stages.
+
+    Two rules are applied, from the declarations of the stages (see Stage):
+
+    - a normalizing stage is dropped when a later stage puts the text in the same normal form
+      again and every stage in between commutes with that form, since the later stage makes up for
+      it (e.g. collapsing whitespace before a regular expression that ignores it);
+    - a normalizing stage is then dropped when its input is already in its normal form, i.e. an
+      earlier stage produced that form and every stage in between preserves it.
+
+    Returns:
+        list: The remaining stages, in order. They give the same result as `stages`.
+    """
+    stages = list(stages)
+    # Right to left, so that the later stage a dropped one relies on is always kept.
+    for position in range(len(stages) - 1, -1, -1):
+        form = stages[position].normal_form
+        if form is None:
+            continue
+        for later in stages[position + 1:]:
+            if later.normal_form == form:
+                del stages[position]
+                break
+            if form not in later.commutes_with:
+                break
+
+    planned = []
+    forms = set()
+    for stage in stages:
+        if stage.normal_form is not None and stage.normal_form in forms:
+            continue
+        planned.append(stage)
+        forms = {form for form in forms if form in stage.preserves}
+        if stage.normal_form is not None:
+            forms.add(stage.normal_form)
+    return planned
+
+
+def fuse_stages(stages):
+    """
+    Compile a list of row-level stages into one callable that runs every stage back-to-back on a single row.
+    """
+    funcs = tuple(stage.func for stage in stages)
+
+    def run(text):
+        for func in funcs:
+            text = func(text)
+        return text
+
+    return run
+
+
+def run_stages(column, stages, fused=True, profiler=None):
+    """
+    Run the stages over a pandas Series.
+
+    Args:
+        column (pd.Series): Column of texts to clean.
+        stages (list): Ordered list of Stage objects.
+        fused (bool): If True, consecutive row-level stages are fused and run in a single pass over
+            the column. If False, make one pass per stage (the reference behaviour).
+        profiler (StageProfiler): Optional profiler recording the statistics of every stage; the
+            stages then run one pass each, whatever `fused` is.
+
+    Returns:
+        pd.Series: The cleaned column.
+    """
+    if profiler is not None:
+        for stage in stages:
+            column = profiler.run_stage(stage, column)
+        return column
+    if not fused:
+        for stage in stages:
+            column = stage.func(column) if stage.column_level else column.apply(stage.func)
+        return column
+
+    row_stages = []
+    for stage in stages:
+        if not stage.column_level:
+            row_stages.append(stage)
+            continue
+        if row_stages:
+            column = column.apply(fuse_stages(row_stages))
+            row_stages = []
+        column = stage.func(column)
+    if row_stages:
+        column = column.apply(fuse_stages(row_stages))
+    return column
+
+
+def new_tree_stats():
+    return {"stage_runs": 0, "stage_runs_saved": 0}
+
+
+def run_stage_tree(column, pipelines, fused=True, stats=None):
+    """
+    Run the pipelines of several tasks over the same column, sharing the stages they have in common.
+
+    The pipelines are merged into a tree: a prefix of stages with the same keys runs once, and the
+    column only branches where the pipelines diverge. Each pipeline gives the same result as
+    `run_stages(column, stages)`.
+
+    Args:
+        pipelines (dict): Ordered lists of Stage objects keyed by task.
+        stats (dict): Optional counters (see `new_tree_stats`): the stages run and the runs saved by
+            sharing them.
+
+    Returns:
+        dict: The cleaned column of every task.
+    """
+    results = {}
+
+    def run(column, branches, depth):
+        groups = {}
+        for task, stages in branches:
+            if len(stages) == depth:
+                results[task] = column
+            else:
+                groups.setdefault(stages[depth].key, []).append((task, stages))
+        for group in groups.values():
+            first = group[0][1]
+            end = depth + 1
+            while all(len(stages) > end and stages[end].key == first[end].key for _, stages in group):
+                end += 1
+            if stats is not None:
+                stats["stage_runs"] += end - depth
+                stats["stage_runs_saved"] += (len(group) - 1) * (end - depth)
+            run(run_stages(column, first[depth:end], fused=fused), group, end)
+
+    run(column, list(pipelines.items()), 0)
+    return {task: results[task] for task in pipelines}
+
+
+def new_unique_stats():
+    return {"columns": 0, "factorized_columns": 0, "rows": 0, "unique_rows": 0, "seconds": 0.0,
+            "seconds_saved": 0.0}
+
+
+def run_on_unique_values(column, process, min_duplicate_ratio=MIN_DUPLICATE_RATIO, stats=None):
+    """
+    Clean a column through its distinct values when it is repetitive enough.
+
+    The column is factorized into its distinct values and integer codes. If the share of duplicate
+    rows is at least `min_duplicate_ratio`, `process` only cleans the distinct values and the full
+    column is rebuilt through the codes; otherwise it cleans the column as is. Both give the same
+    result, since every stage cleans a row independently of the others.
+
+    Args:
+        column (pd.Series): Raw texts.
+        process (callable): Cleans a Series of texts, into a Series or a dict of Series (e.g. one
+            per task, see `run_stage_tree`).
+        min_duplicate_ratio (float): Duplicate ratio from which only the distinct values are
+            cleaned; None always cleans the whole column.
+        stats (dict): Optional counters (see `new_unique_stats`) updated with the rows and
+            distinct rows seen, the time spent and an estimate of the time saved, i.e. the time
+            the skipped duplicates would have taken at the same speed per row.
+
+    Returns:
+        pd.Series: The cleaned column, with the index and name of `column` (a dict of them if
+        `process` returns a dict).
+    """
+    if min_duplicate_ratio is None or len(column) == 0:
+        return process(column)
+    codes, uniques = pd.factorize(column, use_na_sentinel=False)
+    duplicate_ratio = 1 - len(uniques) / len(column)
+    start = time.perf_counter()
+    if duplicate_ratio < min_duplicate_ratio:
+        result = process(column)
+    else:
+        def expand(cleaned):
+            return pd.Series(cleaned.to_numpy(dtype=object)[codes], index=column.index, name=column.name,
+                             dtype=object)
+
+        result = process(pd.Series(uniques, dtype=object))
+        result = {key: expand(value) for key, value in result.items()} if isinstance(result, dict) else expand(result)
+    elapsed = time.perf_counter() - start
+    if stats is not None:
+        stats["columns"] += 1
+        stats["rows"] += len(column)
+        stats["unique_rows"] += len(uniques)
+        stats["seconds"] += elapsed
+        if duplicate_ratio >= min_duplicate_ratio:
+            stats["factorized_columns"] += 1
+            stats["seconds_saved"] += elapsed / len(uniques) * (len(column) - len(uniques))
+    return result
+
+
+class PrefilteredText(str):
+    """
+    Partially cleaned text of a row that a row filter will drop, returned in place of its cleaned
+    text: it still matches the filter, so the row is dropped as usual, and it is never cached.
+    """
+
+    __slots__ = ()
+
+
+def new_pushdown_stats():
+    return {"rows": 0, "skipped": 0, "stage_runs_skipped": 0, "filters": {}, "stages": []}
+
+
+def pushdown_split(stages, row_filters):
+    """
+    Find where the row filters can be evaluated early.
+
+    The split is the first column-level stage, the costly ones (spelling, spaCy). A filter is
+    pushed down to it if every stage from there on preserves it, so a row it matches at that
+    point is certainly dropped at the end.
+
+    Returns:
+        tuple: The position of the split and the filters evaluated there (None and an empty list
+        when there is nothing to push down).
+    """
+    position = next((index for index, stage in enumerate(stages) if stage.column_level), None)
+    if position is None:
+        return None, []
+    filters = [row_filter for row_filter in row_filters
+               if all(row_filter.name in stage.keeps_filters for stage in stages[position:])]
+    return (position, filters) if filters else (None, [])
+
+
+def run_stages_with_pushdown(column, stages, row_filters, fused=True, profiler=None, stats=None):
+    """
+    Run the stages over a pandas Series, letting the rows that `row_filters` will drop skip the
+    costly stages.
+
+    The cheap stages before the split found by `pushdown_split` run on every row; the filters
+    pushed down are then evaluated on the partially cleaned text, and only the rows they do not
+    match go through the remaining stages. The matched rows get their partial text as a
+    PrefilteredText, which the same filters drop afterwards.
+
+    Args:
+        row_filters (list): RowFilter objects the caller applies to the cleaned column.
+        stats (dict): Optional counters (see `new_pushdown_stats`): rows seen, rows that skipped
+            the costly stages, stage runs avoided, rows per filter and the stages skipped.
+
+    Returns:
+        pd.Series: The cleaned column.
+    """
+    position, filters = pushdown_split(stages, row_filters)
+    if position is None:
+        return run_stages(column, stages, fused=fused, profiler=profiler)
+
+    column = run_stages(column, stages[:position], fused=fused, profiler=profiler)
+    dropped = np.zeros(len(column), dtype=bool)
+    for row_filter in filters:
+        matched = row_filter.mask(column) & ~dropped
+        if stats is not None:
+            stats["filters"][row_filter.name] = stats["filters"].get(row_filter.name, 0) + int(matched.sum())
+        dropped |= matched
+    if stats is not None:
+        skipped = int(dropped.sum())
+        stats["rows"] += len(column)
+        stats["skipped"] += skipped
+        stats["stage_runs_skipped"] += skipped * (len(stages) - position)
+        stats["stages"] = [stage.name for stage in stages[position:]]
+    if not dropped.any():
+        return run_stages(column, stages[position:], fused=fused, profiler=profiler)
+
+    values = column.to_numpy(dtype=object).copy()
+    values[dropped] = [PrefilteredText(text) for text in values[dropped]]
+    if not dropped.all():
+        kept = run_stages(column[~dropped], stages[position:], fused=fused, profiler=profiler)
+        values[~dropped] = kept.to_numpy(dtype=object)
+    return pd.Series(values, index=column.index, name=column.name, dtype=object)
+